@@ -38,6 +38,17 @@ class Settings(BaseSettings):
     # AI Service Priority (openai, huggingface, or both)
     primary_ai_service: str = Field(default="openai", alias="PRIMARY_AI_SERVICE")
     
+    # Enhance chatbot questions at temperature 0 so identical prompts can be served from cache
+    chatbot_deterministic_questions: bool = Field(default=False, alias="CHATBOT_DETERMINISTIC_QUESTIONS")
+    
+    # Generate welcome messages with the LLM instead of the static per-module greetings
+    chatbot_dynamic_welcome: bool = Field(default=False, alias="CHATBOT_DYNAMIC_WELCOME")
+    
+    # Client-side limits for chatbot LLM calls
+    llm_concurrency: int = Field(default=20, alias="LLM_CONCURRENCY")
+    llm_requests_per_minute: int = Field(default=500, alias="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: int = Field(default=90000, alias="LLM_TOKENS_PER_MINUTE")
+    
     # Application
     environment: str = Field(default="development", alias="ENVIRONMENT")
     debug: bool = Field(default=False, alias="DEBUG")
@@ -48,6 +59,9 @@ class Settings(BaseSettings):
     upload_dir: str = Field(default="./uploads", alias="UPLOAD_DIR")
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     
+    # Worker processes for PDF exports (reportlab layout is CPU-bound)
+    export_pdf_workers: int = Field(default=2, alias="EXPORT_PDF_WORKERS")
+    
     # Hugging Face API Key
     hf_api_token: str = Field(default="", alias="HF_API_TOKEN")
     hf_model_name: str = Field(default="", alias="HF_MODEL_NAME")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Utility script to regenerate enhanced chatbot questions through the OpenAI Batch API.
+
+Run it after editing a module's system prompt or questions. Results are written under
+UPLOAD_DIR/enhanced_questions, where running app workers pick them up without a restart.
+"""
+
+import asyncio
+import logging
+
+from services.chatbot_service import chatbot_service
+
+logger = logging.getLogger(__name__)
+
+async def main():
+    """Main function for batch question enhancement."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Batch Question Enhancement Utility")
+    parser.add_argument("--module-id", action="append", help="Module to enhance (repeatable, default: all)")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Seconds between batch status checks")
+    
+    args = parser.parse_args()
+    
+    # Setup logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    module_ids = args.module_id or list(chatbot_service.modules)
+    for module_id in module_ids:
+        try:
+            enhanced = await chatbot_service.enhance_module_batch(module_id, poll_interval=args.poll_interval)
+            logger.info(f"✅ Enhanced {len(enhanced)} questions for {module_id}")
+        except Exception as e:
+            logger.error(f"❌ Failed to enhance questions for {module_id}: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -49,10 +49,10 @@ def validate_hf_spaces_config():
         "README.md"
     ]
     
-    missing_files = []
-    for file in required_files:
-        if not Path(file).exists():
-            missing_files.append(file)
+    # One directory scan instead of a stat() per required file
+    with os.scandir(".") as entries:
+        present = {entry.name for entry in entries}
+    missing_files = [file for file in required_files if file not in present]
     
     if missing_files:
         print(f"❌ Missing required files: {missing_files}")
@@ -6,7 +6,8 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 import logging
 
@@ -14,6 +15,8 @@ from database import async_engine, create_tables, get_async_db
 from routers import auth as auth_router, projects as projects_router, phases as phases_router, exports as exports_router
 from routers import assistant as assistant_router, huggingface as huggingface_router, ai_status as ai_status_router
 from config import settings
+from services.chatbot_service import chatbot_service
+from services.export_service import shutdown_pdf_pool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +63,12 @@ async def lifespan(app: FastAPI):
             else:
                 # For local development, fail fast
                 raise db_error
+        
+        # Modules still load lazily on first use if this fails
+        try:
+            await chatbot_service.preload()
+        except Exception as preload_error:
+            logger.warning(f"⚠️  Could not preload chatbot modules: {preload_error}")
                 
     except Exception as e:
         logger.error(f"❌ Startup error: {e}")
@@ -74,6 +83,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Unified Assistant backend...")
+    shutdown_pdf_pool()
 
 
 # Create FastAPI app
@@ -81,7 +91,8 @@ app = FastAPI(
     title="Unified Assistant API",
     description="AI-powered document creation platform with 14-phase workflows",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -93,6 +104,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (summaries, module lists) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -7,6 +7,7 @@ from sqlalchemy import (
     Column, Integer, String, Text, DateTime, Boolean, 
     ForeignKey, Enum, Float, JSON, Index, UniqueConstraint
 )
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 import uuid
 import enum
@@ -271,12 +272,14 @@ class ConversationMemory(Base):
     # Conversation context
     conversation_history: Mapped[List[dict]] = mapped_column(JSON, default=list)  # List of message objects
     context_summary: Mapped[str] = mapped_column(Text, default="")  # AI-generated context summary
+    last_summarized_message_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)  # Newest message folded into context_summary
     user_profile: Mapped[dict] = mapped_column(JSON, default=dict)  # Extracted user information
     conversation_state: Mapped[dict] = mapped_column(JSON, default=dict)  # Current conversation state
     
     # Memory management
     memory_tokens: Mapped[int] = mapped_column(Integer, default=0)  # Token count for memory management
-    last_updated: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Messages stored for this memory
+    last_updated: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # Stamped by the database
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # Relationships
@@ -288,6 +291,7 @@ class ConversationMemory(Base):
         Index("idx_conversation_session", "session_id"),
         Index("idx_conversation_module", "module_id"),
         Index("idx_conversation_user", "user_id"),  # Add user index
+        UniqueConstraint("project_id", "session_id", "module_id", "user_id", name="uq_conversation_memory_scope"),  # One memory per session module and user
     )
 
 
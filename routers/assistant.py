@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
-from database import get_async_db
+from database import get_async_db, AsyncSessionLocal
 from models import Project, GPTModeSession, ProjectMemory, ProjectSummary
 from dependencies import get_current_active_user, check_project_access
 from pydantic import BaseModel
@@ -9,11 +10,18 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 import uuid
 import logging
+import orjson
 from services.chatbot_service import chatbot_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+
+def _sse(data: Any, event: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Event, serializing its payload with orjson like the JSON responses."""
+    frame = b"data: " + orjson.dumps(data) + b"\n\n"
+    return b"event: " + event.encode() + b"\n" + frame if event else frame
+
 class StartModeRequest(BaseModel):
     mode_name: str
 
@@ -70,18 +78,18 @@ async def get_module_info(module_id: str):
         if module_id not in chatbot_service.modules:
             raise HTTPException(status_code=404, detail="Module not found")
         
-        module = chatbot_service.modules[module_id]
+        module = await chatbot_service.load_module(module_id)
         questions = chatbot_service.get_module_questions(module_id)
         
         return {
             "module_id": module_id,
-            "name": module["name"],
-            "description": module["description"],
+            "name": module.name,
+            "description": module.description,
             "question_count": len(questions),
             "questions": questions,
-            "has_system_prompt": bool(module["system_prompt"]),
-            "has_output_template": bool(module["output_template"]),
-            "has_rag_content": bool(module["rag_content"])
+            "has_system_prompt": bool(module.system_prompt),
+            "has_output_template": bool(module.output_template),
+            "has_rag_content": bool(module.rag_blob)
         }
     except HTTPException:
         raise
@@ -113,7 +121,7 @@ async def start_mode_session(
         # Find the module ID based on mode name
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == req.mode_name:
+            if module.name == req.mode_name:
                 module_id = mid
                 break
         
@@ -186,7 +194,7 @@ async def get_next_question(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == mode_name:
+            if module.name == mode_name:
                 module_id = mid
                 break
         
@@ -202,7 +210,8 @@ async def get_next_question(
         question_data = await chatbot_service.get_next_question(
             module_id, 
             session.current_question, 
-            session.answers
+            session.answers,
+            session_id=str(session.id)
         )
         
         # Add module information
@@ -217,6 +226,60 @@ async def get_next_question(
         logger.error(f"Error in get_next_question: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to get next question: {str(e)}")
 
+@router.get("/projects/{project_id}/modes/{mode_name}/next-question/stream")
+async def stream_next_question(
+    project_id: str,
+    mode_name: str,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_active_user)
+):
+    """Stream the next enhanced question for a mode session as Server-Sent Events."""
+    try:
+        if db is None:
+            raise HTTPException(status_code=500, detail="Database connection error")
+            
+        # Find the module ID
+        module_id = None
+        for mid, module in chatbot_service.modules.items():
+            if module.name == mode_name:
+                module_id = mid
+                break
+        
+        if not module_id:
+            raise HTTPException(status_code=404, detail=f"Mode '{mode_name}' not found")
+        
+        result = await db.execute(select(GPTModeSession).where(GPTModeSession.project_id == project_id, GPTModeSession.mode_name == mode_name))
+        session = result.scalar_one_or_none()
+        if not session:
+            raise HTTPException(status_code=404, detail="Mode session not found")
+        
+        current_question = session.current_question
+        answers = dict(session.answers or {})
+        total_questions = len(chatbot_service.get_module_questions(module_id))
+        
+        async def event_stream():
+            async for delta in chatbot_service.stream_next_question(module_id, current_question, answers):
+                yield _sse({'delta': delta})
+            done = current_question >= total_questions
+            final = {
+                "done": done,
+                "module_id": module_id,
+                "module_name": mode_name,
+                "total_questions": total_questions
+            }
+            if not done:
+                final["question_number"] = current_question
+                final["validation_rules"] = chatbot_service._get_validation_rules(module_id, current_question)
+            yield _sse(final, "end")
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in stream_next_question: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to stream next question: {str(e)}")
+
 @router.post("/projects/{project_id}/modes/{mode_name}/answer")
 async def submit_answer(
     project_id: str,
@@ -233,7 +296,7 @@ async def submit_answer(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == mode_name:
+            if module.name == mode_name:
                 module_id = mid
                 break
         
@@ -267,7 +330,8 @@ async def submit_answer(
             next_question_data = await chatbot_service.get_next_question(
                 module_id, 
                 session.current_question, 
-                session.answers
+                session.answers,
+                session_id=str(session.id)
             )
             
             next_question_data["module_id"] = module_id
@@ -301,7 +365,8 @@ async def submit_answer(
         next_question_data = await chatbot_service.get_next_question(
             module_id, 
             session.current_question, 
-            session.answers
+            session.answers,
+            session_id=str(session.id)
         )
         
         next_question_data["module_id"] = module_id
@@ -331,7 +396,7 @@ async def get_mode_summary(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == mode_name:
+            if module.name == mode_name:
                 module_id = mid
                 break
         
@@ -358,6 +423,58 @@ async def get_mode_summary(
         logger.error(f"Error in get_mode_summary: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to get mode summary: {str(e)}")
 
+@router.get("/projects/{project_id}/modes/{mode_name}/summary/stream")
+async def stream_mode_summary(
+    project_id: str,
+    mode_name: str,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_active_user)
+):
+    """Stream the summary for a mode session as Server-Sent Events, saving it once complete."""
+    try:
+        if db is None:
+            raise HTTPException(status_code=500, detail="Database connection error")
+        
+        # Find the module ID
+        module_id = None
+        for mid, module in chatbot_service.modules.items():
+            if module.name == mode_name:
+                module_id = mid
+                break
+        
+        if not module_id:
+            raise HTTPException(status_code=404, detail=f"Mode '{mode_name}' not found")
+            
+        result = await db.execute(select(GPTModeSession).where(GPTModeSession.project_id == project_id, GPTModeSession.mode_name == mode_name))
+        session = result.scalar_one_or_none()
+        if not session:
+            raise HTTPException(status_code=404, detail="Mode session not found")
+        
+        session_id = session.id
+        answers = dict(session.answers or {})
+        
+        async def event_stream():
+            async for chunk in chatbot_service.stream_module_summary(module_id, answers):
+                if "delta" in chunk:
+                    yield _sse({'delta': chunk['delta']})
+                    continue
+                # The request's session is closed once streaming starts, save with a fresh one
+                if not chunk.get("partial"):
+                    async with AsyncSessionLocal() as save_db:
+                        saved = await save_db.get(GPTModeSession, session_id)
+                        if saved:
+                            saved.checkpoint_json = chunk
+                            await save_db.commit()
+                yield _sse(chunk, "end")
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in stream_mode_summary: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to stream mode summary: {str(e)}")
+
 @router.post("/projects/{project_id}/modes/{mode_name}/complete")
 async def complete_module(
     project_id: str,
@@ -374,7 +491,7 @@ async def complete_module(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == mode_name:
+            if module.name == mode_name:
                 module_id = mid
                 break
         
@@ -403,8 +520,8 @@ async def complete_module(
         if next_module_id:
             next_module_info = {
                 "module_id": next_module_id,
-                "name": chatbot_service.modules[next_module_id]["name"],
-                "description": chatbot_service.modules[next_module_id]["description"]
+                "name": chatbot_service.modules[next_module_id].name,
+                "description": chatbot_service.modules[next_module_id].description
             }
         
         return {
@@ -445,7 +562,7 @@ async def get_project_progress(
         completed_modules = 0
         
         for module_id, module_info in chatbot_service.modules.items():
-            session = next((s for s in sessions if s.mode_name == module_info["name"]), None)
+            session = next((s for s in sessions if s.mode_name == module_info.name), None)
             
             if session:
                 questions = chatbot_service.get_module_questions(module_id)
@@ -457,8 +574,8 @@ async def get_project_progress(
                 
                 progress_data.append({
                     "module_id": module_id,
-                    "name": module_info["name"],
-                    "description": module_info["description"],
+                    "name": module_info.name,
+                    "description": module_info.description,
                     "current_question": session.current_question,
                     "total_questions": len(questions),
                     "progress_percentage": round(progress_percentage, 1),
@@ -468,8 +585,8 @@ async def get_project_progress(
             else:
                 progress_data.append({
                     "module_id": module_id,
-                    "name": module_info["name"],
-                    "description": module_info["description"],
+                    "name": module_info.name,
+                    "description": module_info.description,
                     "current_question": 0,
                     "total_questions": len(chatbot_service.get_module_questions(module_id)),
                     "progress_percentage": 0,
@@ -507,7 +624,7 @@ async def skip_question(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == mode_name:
+            if module.name == mode_name:
                 module_id = mid
                 break
         
@@ -545,7 +662,8 @@ async def skip_question(
         next_question_data = await chatbot_service.get_next_question(
             module_id, 
             session.current_question, 
-            session.answers
+            session.answers,
+            session_id=str(session.id)
         )
         
         next_question_data["module_id"] = module_id
@@ -576,7 +694,7 @@ async def get_question_validation_rules(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == mode_name:
+            if module.name == mode_name:
                 module_id = mid
                 break
         
@@ -648,6 +766,69 @@ async def get_combined_summary(
         logger.error(f"Error generating combined summary: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to generate combined summary: {str(e)}")
 
+@router.post("/projects/{project_id}/combined-summary/stream")
+async def stream_combined_summary(
+    project_id: str, 
+    completed_modules: dict = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_active_user)
+):
+    """Stream a combined summary for all completed modules as Server-Sent Events, saving it once complete."""
+    try:
+        if db is None:
+            raise HTTPException(status_code=500, detail="Database connection error")
+        
+        # Check project access
+        result = await db.execute(select(Project).where(Project.id == project_id, Project.is_active == True))
+        project = result.scalar_one_or_none()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        
+        async def event_stream():
+            parts = []
+            try:
+                async for delta in chatbot_service.stream_combined_summary(completed_modules):
+                    parts.append(delta)
+                    yield _sse({'delta': delta})
+            except Exception as e:
+                # Don't save error text or a truncated summary as the project's combined summary
+                yield _sse({
+                    "success": False,
+                    "project_id": project_id,
+                    "partial": bool(parts),
+                    "error": f"Failed to generate combined summary: {str(e)}"
+                }, "end")
+                return
+            
+            # The request's session is closed once streaming starts, save with a fresh one
+            project_summary = ProjectSummary(
+                id=str(uuid.uuid4()),
+                project_id=project_id,
+                summary_type="combined",
+                module_answers=completed_modules,
+                combined_summary="".join(parts),
+                modules_processed=len(completed_modules)
+            )
+            async with AsyncSessionLocal() as save_db:
+                save_db.add(project_summary)
+                await save_db.commit()
+            
+            final = {
+                "success": True,
+                "project_id": project_id,
+                "modules_processed": len(completed_modules),
+                "summary_id": project_summary.id
+            }
+            yield _sse(final, "end")
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming combined summary: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to stream combined summary: {str(e)}")
+
 @router.get("/projects/{project_id}/summaries")
 async def get_project_summaries(
     project_id: str,
@@ -753,7 +934,7 @@ async def start_conversational_chat(
         # Find the module ID based on mode name
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == req.mode_name:
+            if module.name == req.mode_name:
                 module_id = mid
                 break
         
@@ -821,7 +1002,7 @@ async def send_chat_message(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == session.mode_name:
+            if module.name == session.mode_name:
                 module_id = mid
                 break
         
@@ -893,7 +1074,7 @@ async def get_chat_summary(
         # Find the module ID
         module_id = None
         for mid, module in chatbot_service.modules.items():
-            if module["name"] == session.mode_name:
+            if module.name == session.mode_name:
                 module_id = mid
                 break
         
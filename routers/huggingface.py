@@ -22,6 +22,7 @@ class TextGenerationRequest(BaseModel):
     max_length: int = 2048
     temperature: float = 0.7
     use_local: bool = False
+    system_prompt: Optional[str] = None
 
 
 class EmbeddingRequest(BaseModel):
@@ -81,7 +82,8 @@ async def generate_text(
             model_name=request.model_name,
             max_length=request.max_length,
             temperature=request.temperature,
-            use_local=request.use_local
+            use_local=request.use_local,
+            system_prompt=request.system_prompt
         )
         
         return {
@@ -175,7 +177,7 @@ async def hf_health_check():
     try:
         status = hf_service.get_service_status()
         return {
-            "status": "healthy" if (status["client_initialized"] or status["local_model_loaded"]) else "unhealthy",
+            "status": "healthy" if (status["client_initialized"] or status["local_model_available"]) else "unhealthy",
             "service": "huggingface",
             "details": status
         }
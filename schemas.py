@@ -1,6 +1,7 @@
 """
 Pydantic schemas for request/response models.
 """
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, EmailStr, ConfigDict
@@ -9,6 +10,11 @@ from enum import Enum
 from models import UserRole, ProjectRole, PhaseStatus, ExportStatus, ExportFormat
 
 
+class ORMModel(BaseModel):
+    """Base for response schemas populated from SQLAlchemy ORM objects."""
+    model_config = ConfigDict(from_attributes=True)
+
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -24,9 +30,7 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
 
 
-class UserResponse(UserBase):
-    model_config = ConfigDict(from_attributes=True)
-    
+class UserResponse(UserBase, ORMModel):
     id: str
     role: UserRole
     is_active: bool
@@ -45,7 +49,9 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
-class TokenData(BaseModel):
+@dataclass(slots=True, frozen=True)
+class TokenData:
+    """Decoded JWT claims; internal only, so no pydantic validation is needed."""
     user_id: Optional[str] = None
 
 
@@ -64,18 +70,14 @@ class ProjectUpdate(BaseModel):
     description: Optional[str] = None
 
 
-class ProjectMemberResponse(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    
+class ProjectMemberResponse(ORMModel):
     id: str
     user: UserResponse
     role: ProjectRole
     invited_at: datetime
 
 
-class ProjectResponse(ProjectBase):
-    model_config = ConfigDict(from_attributes=True)
-    
+class ProjectResponse(ProjectBase, ORMModel):
     id: str
     owner: UserResponse
     members: List[ProjectMemberResponse]
@@ -84,9 +86,7 @@ class ProjectResponse(ProjectBase):
     updated_at: datetime
 
 
-class ProjectCreateResponse(ProjectBase):
-    model_config = ConfigDict(from_attributes=True)
-    
+class ProjectCreateResponse(ProjectBase, ORMModel):
     id: str
     owner: UserResponse
     is_active: bool
@@ -117,9 +117,7 @@ class PhaseUpdate(BaseModel):
     prompt_template: Optional[str] = None
 
 
-class PhaseDraftResponse(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    
+class PhaseDraftResponse(ORMModel):
     id: str
     version: int
     content: str
@@ -128,9 +126,7 @@ class PhaseDraftResponse(BaseModel):
     created_at: datetime
 
 
-class PhaseResponse(PhaseBase):
-    model_config = ConfigDict(from_attributes=True)
-    
+class PhaseResponse(PhaseBase, ORMModel):
     id: str
     project_id: str
     phase_number: int
@@ -161,9 +157,7 @@ class ExportRequest(BaseModel):
     format: ExportFormat
 
 
-class ExportTaskResponse(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    
+class ExportTaskResponse(ORMModel):
     id: str
     project_id: str
     format: ExportFormat
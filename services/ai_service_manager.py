@@ -2,7 +2,8 @@
 AI Service Manager - Manages multiple AI services with OpenAI as primary.
 """
 import logging
-from typing import Dict, List, Optional, Any
+import re
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Any, Union
 from config import settings
 
 from services.openai_service import OpenAIService
@@ -17,10 +18,31 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\S+")
+
+
+def _word_count(text: str) -> int:
+    """Count whitespace-separated words without materializing the token list."""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+
+def _fallback_analysis(content: str) -> Dict[str, Any]:
+    """Analysis returned whenever content analysis fails; built fresh so callers may mutate it."""
+    return {
+        "key_points": [],
+        "topics": [],
+        "complexity_level": "medium",
+        "word_count": _word_count(content),
+        "summary": "Analysis failed"
+    }
+
 
 class AIServiceManager:
     """Manages multiple AI services with OpenAI as the primary service."""
     
+    # Bound once so the request-path error handlers skip the logger attribute lookup
+    _err = logger.error
+    
     def __init__(self):
         self.openai_service = None
         self.huggingface_service = None
@@ -32,7 +54,7 @@ class AIServiceManager:
                 self.openai_service = OpenAIService()
                 logger.info("OpenAI service initialized successfully")
             except Exception as e:
-                logger.error(f"Failed to initialize OpenAI service: {e}")
+                logger.error("Failed to initialize OpenAI service: %s", e)
         else:
             logger.warning("OpenAI API key not configured")
         
@@ -42,11 +64,98 @@ class AIServiceManager:
                 self.huggingface_service = HuggingFaceService()
                 logger.info("Hugging Face service initialized successfully")
             except Exception as e:
-                logger.error(f"Failed to initialize Hugging Face service: {e}")
+                logger.error("Failed to initialize Hugging Face service: %s", e)
         elif not HUGGINGFACE_AVAILABLE:
             logger.warning("Hugging Face service not available - dependencies not installed")
         
-        logger.info(f"AI Service Manager initialized with primary service: {self.primary_service}")
+        # Resolve service selection once; methods pick a handler by name in O(1)
+        self._generate_dispatch = {}
+        self._stream_dispatch = {}
+        self._embed_dispatch = {}
+        self._analyze_dispatch = {}
+        if self.openai_service:
+            self._generate_dispatch["openai"] = self._generate_with_openai
+            self._stream_dispatch["openai"] = self.openai_service.stream_content
+            self._embed_dispatch["openai"] = self.openai_service.create_embedding
+            self._analyze_dispatch["openai"] = self.openai_service.analyze_content_structure
+        if self.huggingface_service:
+            self._generate_dispatch["huggingface"] = self._generate_with_huggingface
+            self._stream_dispatch["huggingface"] = self._stream_with_huggingface
+            self._embed_dispatch["huggingface"] = self.huggingface_service.create_embedding
+            self._analyze_dispatch["huggingface"] = self._analyze_with_huggingface
+        
+        logger.info("AI Service Manager initialized with primary service: %s", self.primary_service)
+    
+    async def _generate_with_openai(
+        self,
+        prompt: str,
+        context: str,
+        temperature: float,
+        max_tokens: int,
+        cache_key: Optional[str] = None
+    ) -> str:
+        return await self.openai_service.generate_content(
+            prompt=prompt,
+            context=context,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            cache_key=cache_key
+        )
+    
+    async def _generate_with_huggingface(
+        self,
+        prompt: str,
+        context: str,
+        temperature: float,
+        max_tokens: int,
+        cache_key: Optional[str] = None
+    ) -> str:
+        return await self.huggingface_service.generate_text(
+            prompt=prompt,
+            max_length=max_tokens,
+            temperature=temperature
+        )
+    
+    async def _stream_with_huggingface(
+        self,
+        prompt: str,
+        context: str,
+        temperature: float,
+        max_tokens: int,
+        cache_key: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        # The Hugging Face client doesn't stream, so the whole text is one chunk
+        yield await self._generate_with_huggingface(prompt, context, temperature, max_tokens)
+    
+    async def _analyze_with_huggingface(self, content: str) -> dict:
+        # Basic analysis for Hugging Face
+        return {
+            "key_points": [],
+            "topics": [],
+            "complexity_level": "medium",
+            "word_count": _word_count(content),
+            "summary": "Analysis via Hugging Face"
+        }
+    
+    def generate(
+        self,
+        prompt: str,
+        *,
+        context: str = "",
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        service: str = "auto",
+        cache_key: Optional[str] = None,
+        stream: bool = False
+    ) -> Union[Awaitable[str], AsyncIterator[str]]:
+        """Single entry point for text generation.
+        
+        Await the result for the full text, or with stream=True iterate it with ``async for``
+        to receive chunks as they are generated.
+        """
+        if stream:
+            return self.stream_content(prompt, context, temperature, max_tokens, service, cache_key)
+        return self.generate_content(prompt, context, temperature, max_tokens, service, cache_key)
     
     async def generate_content(
         self,
@@ -54,46 +163,67 @@ class AIServiceManager:
         context: str = "",
         temperature: float = 0.7,
         max_tokens: int = 2000,
-        service: str = "auto"
+        service: str = "auto",
+        cache_key: Optional[str] = None
     ) -> str:
-        """Generate content using the appropriate AI service."""
+        """Generate content using the appropriate AI service.
+        
+        Prompts that share a long static prefix should pass the same cache_key so the
+        provider can route them to the same prompt cache.
+        """
         try:
-            # Determine which service to use
             if service == "auto":
+                handler = self._generate_dispatch.get(self.primary_service)
                 service = self.primary_service
-            elif service == "openai" and self.openai_service:
-                service = "openai"
-            elif service == "huggingface" and self.huggingface_service:
-                service = "huggingface"
             else:
-                # Fallback to available service
-                if self.openai_service:
-                    service = "openai"
-                elif self.huggingface_service:
-                    service = "huggingface"
-                else:
+                service = service.lower()
+                # Fallback to the first available service (OpenAI preferred)
+                handler = self._generate_dispatch.get(service) or next(
+                    iter(self._generate_dispatch.values()), None
+                )
+                if handler is None:
                     raise Exception("No AI service available")
             
-            # Generate content using selected service
-            if service == "openai" and self.openai_service:
-                return await self.openai_service.generate_content(
-                    prompt=prompt,
-                    context=context,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-            elif service == "huggingface" and self.huggingface_service:
-                return await self.huggingface_service.generate_text(
-                    prompt=prompt,
-                    max_length=max_tokens,
-                    temperature=temperature
-                )
+            if handler is None:
+                raise Exception(f"Service '{service}' not available")
+            
+            return await handler(prompt, context, temperature, max_tokens, cache_key)
+                
+        except Exception as e:
+            self._err("Content generation error: %s", e)
+            raise
+    
+    async def stream_content(
+        self,
+        prompt: str,
+        context: str = "",
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        service: str = "auto",
+        cache_key: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream generated content as it is produced, with the same service selection as generate_content."""
+        try:
+            if service == "auto":
+                handler = self._stream_dispatch.get(self.primary_service)
+                service = self.primary_service
             else:
+                service = service.lower()
+                handler = self._stream_dispatch.get(service) or next(
+                    iter(self._stream_dispatch.values()), None
+                )
+                if handler is None:
+                    raise Exception("No AI service available")
+            
+            if handler is None:
                 raise Exception(f"Service '{service}' not available")
+            
+            async for delta in handler(prompt, context, temperature, max_tokens, cache_key):
+                yield delta
                 
         except Exception as e:
-            logger.error(f"Content generation error: {e}")
-            raise Exception(f"Failed to generate content: {str(e)}")
+            self._err("Content streaming error: %s", e)
+            raise
     
     async def generate_text(
         self,
@@ -102,17 +232,17 @@ class AIServiceManager:
         temperature: float = 0.7,
         service: str = "auto"
     ) -> Dict[str, str]:
-        """Generate text using the appropriate AI service. Alias for generate_content."""
+        """Generate text using the appropriate AI service, wrapped as {"text": ...} and never raising."""
         try:
-            content = await self.generate_content(
-                prompt=prompt,
+            content = await self.generate(
+                prompt,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 service=service
             )
             return {"text": content}
         except Exception as e:
-            logger.error(f"Text generation error: {e}")
+            self._err("Text generation error: %s", e)
             return {"text": "I apologize, but I'm having trouble generating a response right now. Please try again."}
 
     async def create_embedding(
@@ -122,27 +252,21 @@ class AIServiceManager:
     ) -> List[float]:
         """Create embedding using the appropriate AI service."""
         try:
-            # Determine which service to use
             if service == "auto":
                 # Prefer OpenAI for embeddings
-                if self.openai_service:
-                    service = "openai"
-                elif self.huggingface_service:
-                    service = "huggingface"
-                else:
+                handler = next(iter(self._embed_dispatch.values()), None)
+                if handler is None:
                     raise Exception("No AI service available")
-            
-            # Create embedding using selected service
-            if service == "openai" and self.openai_service:
-                return await self.openai_service.create_embedding(text)
-            elif service == "huggingface" and self.huggingface_service:
-                return await self.huggingface_service.create_embedding(text)
             else:
-                raise Exception(f"Service '{service}' not available")
+                handler = self._embed_dispatch.get(service.lower())
+                if handler is None:
+                    raise Exception(f"Service '{service}' not available")
+            
+            return await handler(text)
                 
         except Exception as e:
-            logger.error(f"Embedding creation error: {e}")
-            raise Exception(f"Failed to create embedding: {str(e)}")
+            self._err("Embedding creation error: %s", e)
+            raise
     
     async def analyze_content_structure(
         self,
@@ -151,35 +275,20 @@ class AIServiceManager:
     ) -> dict:
         """Analyze content structure using the appropriate AI service."""
         try:
-            # OpenAI has better structure analysis, prefer it
-            if service == "auto" and self.openai_service:
-                service = "openai"
-            elif service == "auto" and self.huggingface_service:
-                service = "huggingface"
-            
-            if service == "openai" and self.openai_service:
-                return await self.openai_service.analyze_content_structure(content)
-            elif service == "huggingface" and self.huggingface_service:
-                # Basic analysis for Hugging Face
-                return {
-                    "key_points": [],
-                    "topics": [],
-                    "complexity_level": "medium",
-                    "word_count": len(content.split()),
-                    "summary": "Analysis via Hugging Face"
-                }
+            if service == "auto":
+                # OpenAI has better structure analysis, prefer it
+                handler = next(iter(self._analyze_dispatch.values()), None)
             else:
+                handler = self._analyze_dispatch.get(service.lower())
+            
+            if handler is None:
                 raise Exception(f"Service '{service}' not available")
+            
+            return await handler(content)
                 
         except Exception as e:
-            logger.error(f"Content analysis error: {e}")
-            return {
-                "key_points": [],
-                "topics": [],
-                "complexity_level": "medium",
-                "word_count": len(content.split()),
-                "summary": "Analysis failed"
-            }
+            self._err("Content analysis error: %s", e)
+            return _fallback_analysis(content)
     
     def get_service_status(self) -> Dict[str, Any]:
         """Get status of all AI services."""
@@ -1,39 +1,656 @@
 """
 Chatbot service for GPT FINAL FLOW modules with sequential questioning and module transitions.
 """
+import copy
 import json
 import os
 import logging
 import asyncio
 import time
-from typing import Dict, List, Optional, Any, Tuple
+import hashlib
+import re
+import sys
+import types
+import random
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Any, Tuple, AsyncIterator, Mapping, Union
 from pathlib import Path
-from openai import OpenAI
+from functools import lru_cache
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError
+from langchain_community.embeddings import OpenAIEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
 from services.ai_service_manager import ai_service_manager
 from services.conversation_service import ConversationService
 from services.langchain_conversation_service import LangChainConversationService
 
+# Optional import - keep RAG text zstd-compressed in memory when available
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Optional import - exact token counts for the context budget
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Optional import - HTTP/2 needs the h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+_EMAIL_RE = re.compile(r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
+
+# Whole-word edit intent, so e.g. "modification" or "changes" in an answer don't trigger it
+_EDIT_RE = re.compile(r"\b(?:edit|update|change|modify|summary)\b", re.IGNORECASE)
+
+_BASE_RULES = types.MappingProxyType({
+    "required": True,
+    "min_length": 3,
+    "max_length": 1000,
+    "allow_skip": True,
+    "skip_message": "You can skip this question if you're not sure or want to come back later."
+})
+
+# Per-call tail of the question-enhancement prompt: (RAG block, context block, question)
+_ENHANCE_TAIL_TEMPLATE = (
+    "%s%sCurrent question to enhance: %s\n\n"
+    "Please enhance this question to be more engaging, specific, and helpful. "
+    "Make it conversational and encouraging. Return only the enhanced question, nothing else."
+)
+
+# Closing instructions of the module summary prompt, after the per-call answers
+_SUMMARY_SUFFIX = (
+    "Fill in the template with the user's actual answers. Keep it concise and professional. "
+    "Use the exact structure and emojis from the template."
+)
+
+# "Q1: " ... "Q100: " labels for numbering answers in summary prompts
+_Q_PREFIXES = tuple(f"Q{i}: " for i in range(1, 101))
+
+# Openers for the transition to the next question; no LLM call between questions
+_TRANSITION_OPENERS = ("Perfect! ", "Great! Now, ", "Excellent! ", "Got it! ", "Thanks! ")
+
+# Fixed parts of the combined summary prompt, around the per-module summaries
+_COMBINED_HEADER = (
+    "You are an expert business strategist. Below are summaries from different modules of a business development process.\n"
+    "Please create a comprehensive, well-structured summary that ties everything together.\n"
+    "\n"
+    "Module Summaries:"
+)
+_COMBINED_FOOTER = (
+    "Please create a comprehensive summary that:\n"
+    "1. Synthesizes all the information into a cohesive business strategy\n"
+    "2. Highlights key insights and actionable recommendations\n"
+    "3. Shows how all the pieces work together\n"
+    "4. Is written in a professional, engaging tone\n"
+    "5. Is structured with clear sections and bullet points where appropriate\n"
+    "6. Includes a table of contents for easy navigation\n"
+    "\n"
+    "Format the response as a complete business strategy document with:\n"
+    "- Executive Summary\n"
+    "- Key Findings from Each Module\n"
+    "- Strategic Recommendations\n"
+    "- Action Plan\n"
+    "- Next Steps\n"
+    "\n"
+    "Make it comprehensive and actionable for business owners."
+)
+
+# Question keywords that select custom validation, checked in priority order
+_RULE_KEYWORDS = (
+    ("email", frozenset({"email"})),
+    ("price", frozenset({"price", "cost"})),
+    ("age", frozenset({"age"})),
+    ("name", frozenset({"name"})),
+)
+
+# Validation rules per question tag, layered over the shared base rules
+_RULES_BY_TAG: Dict[Optional[str], Dict[str, Any]] = {
+    None: {**_BASE_RULES},
+    "email": {**_BASE_RULES, "type": "email", "pattern": _EMAIL_RE.pattern},
+    "price": {**_BASE_RULES, "type": "number", "min_value": 0},
+    "age": {**_BASE_RULES, "type": "number", "min_value": 13, "max_value": 120},
+    "name": {**_BASE_RULES, "min_length": 2, "max_length": 100},
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _classify_question(question: str) -> Optional[str]:
+    """Return the validation tag for a question based on the whole words it contains."""
+    words = frozenset(_WORD_RE.findall(question.lower()))
+    for tag, keywords in _RULE_KEYWORDS:
+        if words & keywords:
+            return tag
+    return None
+
+
+def _module_config(config: Dict[str, Any]) -> Mapping[str, Any]:
+    """Freeze a module config, interning its questions once at import."""
+    config["questions"] = tuple(sys.intern(q) for q in config["questions"])
+    return types.MappingProxyType(config)
+
+
+# Module order and their specific questions
+_MODULE_CONFIGS: Mapping[str, Mapping[str, Any]] = types.MappingProxyType({
+    "1_The Offer Clarifier GPT": _module_config({
+        "name": "Offer Clarifier GPT",
+        "description": "Define your product or service clearly",
+        "questions": (
+            "What is your product, service, or offer called?",
+            "What is the #1 outcome or transformation your customer gets from this offer?",
+            "What are 3–5 key features or deliverables included?",
+            "How is the offer delivered? (Live, digital, coaching, physical, etc.)",
+            "What format is it in? (Course, membership, service, SaaS, etc.)",
+            "What's the price or pricing model?",
+            "What makes your offer different from others like it? (USP)",
+            "Who is this offer for? Describe your ideal customer.",
+            "What 2–3 big problems does this offer solve for them?"
+        ),
+        "system_prompt_file": "System Prompt/The Offer Clarifier.txt",
+        "output_template_file": "Output template/✅ OFFER CLARIFIER – OUTCOME SUMMARY REPORT For Frsutrated Freddie.txt",
+        "rag_files": ()
+    }),
+    "2_Avatar Creator and Empathy Map GPT": _module_config({
+        "name": "Avatar Creator and Empathy Map GPT",
+        "description": "Build a complete customer avatar step-by-step",
+        "questions": (
+            "Who is your ideal customer? (Think about someone you've helped before or would love to work with)",
+            "What name would you like to give this customer avatar? (e.g., 'Freelancer Fran' or 'Agency Eric')",
+            "What's their age range? (e.g., '25–35' or '40–50')",
+            "What's their job or profession? (Are they self-employed, business owner, teacher, consultant, etc.?)",
+            "Where do they live or work? (Big city, small town, suburban area? Work from home or office?)",
+            "Roughly how much do they earn per year? (e.g., 'under $50K,' '$75–100K,' or '6 figures')",
+            "Are they married or single? Kids? (Family structure helps tailor your message)",
+            "What brands, influencers, or content do they follow? (e.g., Gary Vee, Shark Tank, Etsy, Jenna Kutcher)",
+            "Where do they get information? (Blogs, YouTube, webinars, events, social media?)",
+            "What's a quote or phrase they might say? (Something that captures their mindset)",
+            "What are their biggest frustrations or fears? (What problems are they facing?)",
+            "What are their wants, dreams, or goals? (Personal, financial, or lifestyle goals?)",
+            "What values matter to them? (Quality, freedom, trust, family, efficiency, etc.?)",
+            "Why would they buy from you? (What makes your product/service a 'yes' for them?)",
+            "What objections might stop them from buying? (Price, lack of trust, uncertainty?)",
+            "Are they the decision-maker? (Do they buy for themselves or need someone else's buy-in?)",
+            "What is their life like before finding your product/service? (Describe their current state)",
+            "What is life like after they use your product/service? (Describe their new state)",
+            "What emotional transformation do they experience? (From: frustrated, stuck, confused To: empowered, confident, excited)"
+        ),
+        "system_prompt_file": "System Prompt/Avatar Creator and Empathy Map GPT.txt",
+        "output_template_file": "Output template/Customer Avatar_ Stuck Steve.txt",
+        "rag_files": ("RAG/DM-Copy-Hack-Customer-Avatar.txt",)
+    }),
+    "3_Before State Research GPT": _module_config({
+        "name": "Before State Research GPT",
+        "description": "Research and enhance the customer's before state",
+        "questions": (
+            "What specific pain points does your avatar experience daily?",
+            "What are their biggest frustrations with current solutions?",
+            "What fears or concerns hold them back from taking action?",
+            "What does their typical day look like when struggling with this problem?",
+            "What emotions do they feel when facing this challenge?",
+            "What have they tried before that didn't work?",
+            "What are the consequences of not solving this problem?",
+            "What triggers make this problem feel urgent?",
+            "What does success look like to them right now?",
+            "What resources or support do they currently lack?"
+        ),
+        "system_prompt_file": "System Prompt/Before State Research GPT.txt",
+        "output_template_file": "Output template/Customer Avatar_ Stuck Steve - Enhanced Before and After.txt",
+        "rag_files": ("RAG/Avatar Creation Guide.txt",)
+    }),
+    "4_After State Research GPT": _module_config({
+        "name": "After State Research GPT",
+        "description": "Research and enhance the customer's after state",
+        "questions": (
+            "What would be the ideal outcome for your avatar?",
+            "How would their daily life change after using your solution?",
+            "What new opportunities would open up for them?",
+            "What emotions would they feel after achieving success?",
+            "What would their new routine look like?",
+            "How would their relationships improve?",
+            "What financial benefits would they experience?",
+            "What would their new level of confidence look like?",
+            "What goals would they be able to achieve?",
+            "How would their self-image change?"
+        ),
+        "system_prompt_file": "System Prompt/After State Enhancement GPT.txt",
+        "output_template_file": "Output template/🌞 After State – Stuck Steve (Expanded Narrative).txt",
+        "rag_files": ("RAG/Avatar Creation Guide.txt",)
+    }),
+    "5_Avatar Validator GPT": _module_config({
+        "name": "Avatar Validator GPT",
+        "description": "Validate and refine the customer avatar",
+        "questions": (
+            "Does this avatar represent your most profitable customer type?",
+            "Are there any gaps in the avatar profile that need filling?",
+            "What aspects of the avatar could be more specific?",
+            "How well does this avatar align with your offer?",
+            "What objections might this avatar have that we haven't addressed?",
+            "Are there any conflicting traits in the avatar profile?",
+            "How realistic is this avatar based on your experience?",
+            "What additional research would strengthen this avatar?",
+            "How does this avatar compare to your actual customers?",
+            "What would make this avatar even more compelling?"
+        ),
+        "system_prompt_file": "System Prompt/Avatar Validator GPT.txt",
+        "output_template_file": None,
+        "rag_files": ("RAG/Avatar Creation Guide.txt",)
+    }),
+    "6_TriggerGPT": _module_config({
+        "name": "TriggerGPT",
+        "description": "Discover what triggers your perfect customer to need your service",
+        "questions": (
+            "What life events might trigger your avatar to seek a solution?",
+            "What business challenges could prompt them to take action?",
+            "What emotional states would make them more receptive?",
+            "What external pressures might influence their decision?",
+            "What timing factors are important for your avatar?",
+            "What content would resonate with them during these triggers?",
+            "What entry point offers would work best for each trigger?",
+            "How urgent are these triggers for your avatar?",
+            "What objections might arise during trigger moments?",
+            "How can you create urgency around these triggers?"
+        ),
+        "system_prompt_file": "System Prompt/TriggerGPT.txt",
+        "output_template_file": "Output template/Frustrated Freddie - Trigger GPT.txt",
+        "rag_files": (
+            "RAG/Brainstorming Your Triggering Events.txt",
+            "RAG/Identifying The Triggering Events.txt",
+            "RAG/PSS-Workbook_MOD 3 - Identifying The Triggering Event.txt",
+            "RAG/PSS-WS-03-03-TypeOfTriggeringEvents.txt",
+            "RAG/PSS-WS-03-04-HowtoRankYourTriggeringEvents.txt"
+        )
+    }),
+    "7_EPO Builder GPT - Copy": _module_config({
+        "name": "EPO Builder GPT",
+        "description": "Build effective entry point offers",
+        "questions": (
+            "What is the main problem your entry point offer will solve?",
+            "What format will work best for your avatar? (PDF, video, webinar, etc.)",
+            "What specific value will this offer provide?",
+            "How will you deliver this offer?",
+            "What's the ideal length or duration for this offer?",
+            "What call-to-action will you use?",
+            "How will you follow up after the offer?",
+            "What objections might arise with this offer?",
+            "How will you measure the success of this offer?",
+            "What's the next step after someone consumes this offer?"
+        ),
+        "system_prompt_file": "System Prompt/EPO Builder GPT.txt",
+        "output_template_file": None,
+        "rag_files": ("RAG/drive-download-20250614T003233Z-1-001.txt",)
+    }),
+    "8_SCAMPER Synthesizer": _module_config({
+        "name": "SCAMPER Synthesizer",
+        "description": "Use SCAMPER technique to generate creative ideas",
+        "questions": (
+            "What could you SUBSTITUTE in your current approach?",
+            "What could you COMBINE with your existing solution?",
+            "What could you ADAPT from other industries?",
+            "What could you MODIFY or MAGNIFY in your offer?",
+            "What could you PUT TO OTHER USES?",
+            "What could you ELIMINATE from your current process?",
+            "What could you REVERSE or REARRANGE?",
+            "How could you make your solution more accessible?",
+            "What new delivery methods could you explore?",
+            "How could you create more value with less effort?"
+        ),
+        "system_prompt_file": "System Prompt/SCAMPER Synthesizer.txt",
+        "output_template_file": "Output template/🧠 EDDIE's Dead Lead Revival Kit.txt",
+        "rag_files": ("RAG/scamper.txt",)
+    }),
+    "9_Wildcard Idea Bot": _module_config({
+        "name": "Wildcard Idea Bot",
+        "description": "Generate wild and creative ideas",
+        "questions": (
+            "What's the most outrageous idea you could try?",
+            "What would you do if money and time were unlimited?",
+            "What's something completely opposite to your current approach?",
+            "What would your avatar's dream solution look like?",
+            "What's an idea that seems impossible but would be amazing?",
+            "What would you do if you had to start over completely?",
+            "What's an idea that combines two completely different things?",
+            "What would you do if you had to solve this in 24 hours?",
+            "What's an idea that would make your competitors jealous?",
+            "What would you do if you had unlimited resources?"
+        ),
+        "system_prompt_file": "System Prompt/Wildcard Idea Bot GPT.txt",
+        "output_template_file": "Output template/Wildcard Idea Bot - Frustrated Freddie.txt",
+        "rag_files": ()
+    }),
+    "10_Concept Crafter GPT": _module_config({
+        "name": "Concept Crafter GPT",
+        "description": "Craft compelling concepts and ideas",
+        "questions": (
+            "What's the core concept behind your best idea?",
+            "How can you make this concept more compelling?",
+            "What story can you tell around this concept?",
+            "How can you make this concept more relatable?",
+            "What emotions should this concept evoke?",
+            "How can you make this concept more memorable?",
+            "What metaphors or analogies work for this concept?",
+            "How can you simplify this concept?",
+            "What makes this concept unique?",
+            "How can you test this concept quickly?"
+        ),
+        "system_prompt_file": "System Prompt/Concept Crafter Bot (1).txt",
+        "output_template_file": None,
+        "rag_files": ()
+    }),
+    "11_Hook & Headline GPT": _module_config({
+        "name": "Hook & Headline GPT",
+        "description": "Create compelling hooks and headlines",
+        "questions": (
+            "What's the main benefit your avatar wants?",
+            "What's their biggest pain point?",
+            "What would make them stop scrolling?",
+            "What's the most surprising thing about your solution?",
+            "What's a common misconception in your industry?",
+            "What's the transformation they're seeking?",
+            "What's the cost of inaction?",
+            "What's the most emotional aspect of their problem?",
+            "What's the quickest win they could get?",
+            "What's the most compelling proof you have?"
+        ),
+        "system_prompt_file": "System Prompt/Hook & Headline GPT.txt",
+        "output_template_file": None,
+        "rag_files": ()
+    }),
+    "12_Campaign Concept Generator GPT": _module_config({
+        "name": "Campaign Concept Generator GPT",
+        "description": "Generate complete campaign concepts",
+        "questions": (
+            "What's the main objective of this campaign?",
+            "Who is the primary target audience?",
+            "What's the key message you want to convey?",
+            "What channels will you use for this campaign?",
+            "What's the timeline for this campaign?",
+            "What's the budget for this campaign?",
+            "What metrics will you use to measure success?",
+            "What's the call-to-action for this campaign?",
+            "What's the unique angle for this campaign?",
+            "How will you follow up after the campaign?"
+        ),
+        "system_prompt_file": "System Prompt/Campaign Concept Generator GPT.txt",
+        "output_template_file": "Output template/Campaign Strategy Report for Frustrated Freddie_ The Eureka Ideation Machine.txt",
+        "rag_files": ()
+    }),
+    "13_Ideation Injection Bot": _module_config({
+        "name": "Ideation Injection Bot",
+        "description": "Inject additional creative ideas",
+        "questions": (
+            "What's one idea you haven't tried yet?",
+            "What's something your competitors are doing that you could improve?",
+            "What's a trend you could leverage?",
+            "What's a customer request you haven't fulfilled?",
+            "What's a problem you've noticed that no one is solving?",
+            "What's a skill or resource you have that you're not using?",
+            "What's a partnership opportunity you could explore?",
+            "What's a new market you could enter?",
+            "What's a product extension you could create?",
+            "What's a process you could automate or improve?"
+        ),
+        "system_prompt_file": "System Prompt/Idea Injection Bot.txt",
+        "output_template_file": None,
+        "rag_files": ()
+    })
+})
+
+
+if ZSTD_AVAILABLE:
+    _RAG_COMPRESSOR = zstandard.ZstdCompressor(level=10)
+    _RAG_DECOMPRESSOR = zstandard.ZstdDecompressor()
+
+
+@lru_cache(maxsize=2)
+def _decompress_rag(blob: bytes) -> str:
+    """Decompress a module's RAG text, keeping the last couple around for bursts of questions."""
+    return _RAG_DECOMPRESSOR.decompress(blob).decode("utf-8")
+
+
+@lru_cache(maxsize=4)
+def _build_summary_prefix(name: str, output_template: str, rag_blob) -> str:
+    """Build a module's summary prompt up to its answers; everything here is module-invariant."""
+    rag_text = _decompress_rag(rag_blob) if isinstance(rag_blob, bytes) else rag_blob
+    rag_part = ("Additional context:\n" + rag_text + "\n\n") if rag_text else ""
+    return (
+        f"You are an expert AI assistant. The user has completed {name}.\n\n"
+        f"{rag_part}"
+        "IMPORTANT: Generate a summary that EXACTLY follows this template format:\n\n"
+        f"{output_template}\n\n"
+        "User's answers:"
+    )
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """Load the tokenizer on first use rather than at import (it may fetch its BPE file)."""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _count_tokens(text: str) -> int:
+    """Count prompt tokens, estimating ~4 characters per token without tiktoken."""
+    if TIKTOKEN_AVAILABLE:
+        try:
+            return len(_token_encoding().encode(text))
+        except Exception:
+            pass
+    return len(text) // 4
+
+
+class _RateLimiter:
+    """Leaky-bucket limiter that spaces calls evenly at max_rate per time_period seconds."""
+    
+    def __init__(self, max_rate: int, time_period: float = 60.0):
+        self._interval = time_period / max_rate
+        self._next_slot = 0.0
+    
+    async def __aenter__(self):
+        # Reserve a slot before awaiting; the event loop serialises this bookkeeping
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _TokenBucket:
+    """Token bucket holding up to a minute's token budget, refilled continuously."""
+    
+    def __init__(self, tokens_per_minute: int):
+        self._capacity = float(tokens_per_minute)
+        self._rate = tokens_per_minute / 60.0
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: int):
+        # A request larger than the whole bucket waits for a full bucket rather than forever
+        tokens = min(float(tokens), self._capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self._rate)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait before retrying, from a Retry-After header in seconds."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _owned_by_process_user(*paths: Path) -> bool:
+    """True if every path belongs to the user running this process (always true without uids)."""
+    if not hasattr(os, "getuid"):
+        return True
+    uid = os.getuid()
+    return all(path.stat().st_uid == uid for path in paths)
+
+
+def _advise_sequential(fd: int):
+    """Hint the kernel to read the whole file ahead, where posix_fadvise is available."""
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+
+
+def _read_module_file(task: Tuple[str, str, Path]) -> Optional[str]:
+    """Read one module file, returning None (and logging) if it is missing or unreadable."""
+    module_id, kind, path = task
+    if not path.exists():
+        return None
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            _advise_sequential(fd)
+            # One read of the whole file, decoded in a single pass
+            return os.read(fd, os.fstat(fd).st_size).decode("utf-8")
+        finally:
+            os.close(fd)
+    except Exception as e:
+        logger.warning(f"Could not load {kind} file {path.name} for {module_id}: {e}")
+        return None
+
+
+@dataclass(slots=True, frozen=True)
+class ModuleInfo:
+    """A module's static metadata, available without reading any of its files."""
+    module_id: str
+    name: str
+    description: str
+    questions: Tuple[str, ...]
+    system_prompt_file: Optional[str]
+    output_template_file: Optional[str]
+    rag_files: Tuple[str, ...]
+    # Validation rule tag per question, see _RULES_BY_TAG
+    rule_tags: Tuple[Optional[str], ...]
+
+
+@dataclass(slots=True, frozen=True)
+class LoadedModule(ModuleInfo):
+    """A module with its system prompt, output template and RAG content loaded."""
+    system_prompt: str
+    output_template: str
+    # zstd-compressed bytes when zstandard is installed, read through _rag_text
+    rag_blob: Union[str, bytes]
+    static_prefix: str
+    # static_prefix with % escaped, followed by _ENHANCE_TAIL_TEMPLATE
+    prompt_template: str
+
 
 class ChatbotService:
     """Service for managing GPT FINAL FLOW chatbot interactions."""
     
+    # Exact-match cache for deterministic question enhancements
+    _ENHANCE_CACHE_SIZE = 2048
+    _ENHANCE_CACHE_TTL = 86400
+    
+    # Previous-answer context budget: beyond it, only the most recent answers are sent
+    # verbatim and older ones are replaced by a cached summary
+    _CONTEXT_TOKEN_BUDGET = 2000
+    _CONTEXT_RECENT_ANSWERS = 8
+    _CONTEXT_SUMMARY_CACHE_SIZE = 1024
+    
+    # Sessions with background question enhancements, and how long an idle one is kept
+    _PREFETCH_SESSIONS = 256
+    _PREFETCH_TTL = 3600
+    
+    # Attempts per LLM call when rate limited or the API errors out
+    _LLM_MAX_ATTEMPTS = 5
+    
+    # Number of RAG chunks (~500 tokens each) sent with each question enhancement
+    _RAG_TOP_K = 4
+    
+    # Welcome message for the first module whose name contains the keyword
+    _WELCOME_MESSAGES = (
+        ("Offer Clarifier", "Hi 👋 I'm here to help you clarify your business offer! Let's get started!"),
+        ("Avatar", "Hi 👋 I'm here to help you create your customer avatar! Let's get started!"),
+        ("Trigger", "Hi 👋 I'm here to help you identify your customer triggers! Let's get started!"),
+        ("EPO", "Hi 👋 I'm here to help you build your EPO! Let's get started!"),
+        ("SCAMPER", "Hi 👋 I'm here to help you synthesize ideas with SCAMPER! Let's get started!"),
+        ("Concept", "Hi 👋 I'm here to help you craft your concept! Let's get started!"),
+        ("Hook", "Hi 👋 I'm here to help you create compelling hooks! Let's get started!"),
+        ("Campaign", "Hi 👋 I'm here to help you generate campaign concepts! Let's get started!"),
+        ("Ideation", "Hi 👋 I'm here to help you with ideation! Let's get started!")
+    )
+    _DEFAULT_WELCOME = "Hi 👋 I'm here to help you with your business strategy! Let's get started!"
+    
+    # Clarification replies by validate_answer code; {message} is the validation message
+    _CLARIFICATION_TEMPLATES = {
+        "skip_not_allowed": "This one can't be skipped, I'm afraid. {question}",
+        "required": "I'll need an answer for this one. {question}",
+        "conversational": "Happy to keep going! To move forward, could you answer this: {question}",
+        "too_short": "Could you add a little more detail? {question}",
+        "too_long": "That's a lot of great detail! Could you shorten it a little? {message}",
+        "invalid_email": "That doesn't look like a valid email address. Could you double-check it?",
+        "invalid_number": "Could you answer with just a number? {question}",
+        "below_min": "{message} {question}",
+        "above_max": "{message} {question}"
+    }
+    
+    # Generated module and combined summaries, keyed by a digest of their inputs
+    _SUMMARY_CACHE_SIZE = 512
+    
     def __init__(self):
+        self._setup()
+        logger.info(f"ChatbotService initialized with {len(self.modules)} modules")
+    
+    def _setup(self):
+        """Set up clients, paths and module metadata."""
         # Use the AI service manager for OpenAI operations
         self.ai_manager = ai_service_manager
         
         # Initialize conversation service for advanced memory management
-        self.conversation_service = ConversationService()
+        self.conversation_service = ConversationService(questions_loader=self.get_module_questions)
         
         # Initialize LangChain conversation service for RAG and memory
         self.langchain_service = LangChainConversationService()
         
-        # Keep direct OpenAI client for backward compatibility
+        # Direct async OpenAI client with a pooled keep-alive session, shared by all requests
         try:
-            self.client = OpenAI(api_key=settings.openai_api_key)
+            self.client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                http_client=httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    limits=httpx.Limits(max_keepalive_connections=50)
+                )
+            )
             if not settings.openai_api_key:
                 logger.warning("OpenAI API key not configured. Some features may not work.")
         except Exception as e:
@@ -44,383 +661,286 @@ class ChatbotService:
         if not self.gpt_flow_path.exists():
             logger.error("GPT FINAL FLOW directory not found!")
             raise FileNotFoundError("GPT FINAL FLOW directory not found")
-            
-        self.modules = self._load_modules()
-        logger.info(f"ChatbotService initialized with {len(self.modules)} modules")
         
-    def _load_modules(self) -> Dict[str, Dict[str, Any]]:
-        """Load all GPT FINAL FLOW modules with their prompts and questions."""
-        modules = {}
-        
-        # Define module order and their specific questions
-        module_configs = {
-            "1_The Offer Clarifier GPT": {
-                "name": "Offer Clarifier GPT",
-                "description": "Define your product or service clearly",
-                "questions": [
-                    "What is your product, service, or offer called?",
-                    "What is the #1 outcome or transformation your customer gets from this offer?",
-                    "What are 3–5 key features or deliverables included?",
-                    "How is the offer delivered? (Live, digital, coaching, physical, etc.)",
-                    "What format is it in? (Course, membership, service, SaaS, etc.)",
-                    "What's the price or pricing model?",
-                    "What makes your offer different from others like it? (USP)",
-                    "Who is this offer for? Describe your ideal customer.",
-                    "What 2–3 big problems does this offer solve for them?"
-                ],
-                "system_prompt_file": "System Prompt/The Offer Clarifier.txt",
-                "output_template_file": "Output template/✅ OFFER CLARIFIER – OUTCOME SUMMARY REPORT For Frsutrated Freddie.txt",
-                "rag_files": []
-            },
-            "2_Avatar Creator and Empathy Map GPT": {
-                "name": "Avatar Creator and Empathy Map GPT",
-                "description": "Build a complete customer avatar step-by-step",
-                "questions": [
-                    "Who is your ideal customer? (Think about someone you've helped before or would love to work with)",
-                    "What name would you like to give this customer avatar? (e.g., 'Freelancer Fran' or 'Agency Eric')",
-                    "What's their age range? (e.g., '25–35' or '40–50')",
-                    "What's their job or profession? (Are they self-employed, business owner, teacher, consultant, etc.?)",
-                    "Where do they live or work? (Big city, small town, suburban area? Work from home or office?)",
-                    "Roughly how much do they earn per year? (e.g., 'under $50K,' '$75–100K,' or '6 figures')",
-                    "Are they married or single? Kids? (Family structure helps tailor your message)",
-                    "What brands, influencers, or content do they follow? (e.g., Gary Vee, Shark Tank, Etsy, Jenna Kutcher)",
-                    "Where do they get information? (Blogs, YouTube, webinars, events, social media?)",
-                    "What's a quote or phrase they might say? (Something that captures their mindset)",
-                    "What are their biggest frustrations or fears? (What problems are they facing?)",
-                    "What are their wants, dreams, or goals? (Personal, financial, or lifestyle goals?)",
-                    "What values matter to them? (Quality, freedom, trust, family, efficiency, etc.?)",
-                    "Why would they buy from you? (What makes your product/service a 'yes' for them?)",
-                    "What objections might stop them from buying? (Price, lack of trust, uncertainty?)",
-                    "Are they the decision-maker? (Do they buy for themselves or need someone else's buy-in?)",
-                    "What is their life like before finding your product/service? (Describe their current state)",
-                    "What is life like after they use your product/service? (Describe their new state)",
-                    "What emotional transformation do they experience? (From: frustrated, stuck, confused To: empowered, confident, excited)"
-                ],
-                "system_prompt_file": "System Prompt/Avatar Creator and Empathy Map GPT.txt",
-                "output_template_file": "Output template/Customer Avatar_ Stuck Steve.txt",
-                "rag_files": ["RAG/DM-Copy-Hack-Customer-Avatar.txt"]
-            },
-            "3_Before State Research GPT": {
-                "name": "Before State Research GPT",
-                "description": "Research and enhance the customer's before state",
-                "questions": [
-                    "What specific pain points does your avatar experience daily?",
-                    "What are their biggest frustrations with current solutions?",
-                    "What fears or concerns hold them back from taking action?",
-                    "What does their typical day look like when struggling with this problem?",
-                    "What emotions do they feel when facing this challenge?",
-                    "What have they tried before that didn't work?",
-                    "What are the consequences of not solving this problem?",
-                    "What triggers make this problem feel urgent?",
-                    "What does success look like to them right now?",
-                    "What resources or support do they currently lack?"
-                ],
-                "system_prompt_file": "System Prompt/Before State Research GPT.txt",
-                "output_template_file": "Output template/Customer Avatar_ Stuck Steve - Enhanced Before and After.txt",
-                "rag_files": ["RAG/Avatar Creation Guide.txt"]
-            },
-            "4_After State Research GPT": {
-                "name": "After State Research GPT",
-                "description": "Research and enhance the customer's after state",
-                "questions": [
-                    "What would be the ideal outcome for your avatar?",
-                    "How would their daily life change after using your solution?",
-                    "What new opportunities would open up for them?",
-                    "What emotions would they feel after achieving success?",
-                    "What would their new routine look like?",
-                    "How would their relationships improve?",
-                    "What financial benefits would they experience?",
-                    "What would their new level of confidence look like?",
-                    "What goals would they be able to achieve?",
-                    "How would their self-image change?"
-                ],
-                "system_prompt_file": "System Prompt/After State Enhancement GPT.txt",
-                "output_template_file": "Output template/🌞 After State – Stuck Steve (Expanded Narrative).txt",
-                "rag_files": ["RAG/Avatar Creation Guide.txt"]
-            },
-            "5_Avatar Validator GPT": {
-                "name": "Avatar Validator GPT",
-                "description": "Validate and refine the customer avatar",
-                "questions": [
-                    "Does this avatar represent your most profitable customer type?",
-                    "Are there any gaps in the avatar profile that need filling?",
-                    "What aspects of the avatar could be more specific?",
-                    "How well does this avatar align with your offer?",
-                    "What objections might this avatar have that we haven't addressed?",
-                    "Are there any conflicting traits in the avatar profile?",
-                    "How realistic is this avatar based on your experience?",
-                    "What additional research would strengthen this avatar?",
-                    "How does this avatar compare to your actual customers?",
-                    "What would make this avatar even more compelling?"
-                ],
-                "system_prompt_file": "System Prompt/Avatar Validator GPT.txt",
-                "output_template_file": None,
-                "rag_files": ["RAG/Avatar Creation Guide.txt"]
-            },
-            "6_TriggerGPT": {
-                "name": "TriggerGPT",
-                "description": "Discover what triggers your perfect customer to need your service",
-                "questions": [
-                    "What life events might trigger your avatar to seek a solution?",
-                    "What business challenges could prompt them to take action?",
-                    "What emotional states would make them more receptive?",
-                    "What external pressures might influence their decision?",
-                    "What timing factors are important for your avatar?",
-                    "What content would resonate with them during these triggers?",
-                    "What entry point offers would work best for each trigger?",
-                    "How urgent are these triggers for your avatar?",
-                    "What objections might arise during trigger moments?",
-                    "How can you create urgency around these triggers?"
-                ],
-                "system_prompt_file": "System Prompt/TriggerGPT.txt",
-                "output_template_file": "Output template/Frustrated Freddie - Trigger GPT.txt",
-                "rag_files": [
-                    "RAG/Brainstorming Your Triggering Events.txt",
-                    "RAG/Identifying The Triggering Events.txt",
-                    "RAG/PSS-Workbook_MOD 3 - Identifying The Triggering Event.txt",
-                    "RAG/PSS-WS-03-03-TypeOfTriggeringEvents.txt",
-                    "RAG/PSS-WS-03-04-HowtoRankYourTriggeringEvents.txt"
-                ]
-            },
-            "7_EPO Builder GPT - Copy": {
-                "name": "EPO Builder GPT",
-                "description": "Build effective entry point offers",
-                "questions": [
-                    "What is the main problem your entry point offer will solve?",
-                    "What format will work best for your avatar? (PDF, video, webinar, etc.)",
-                    "What specific value will this offer provide?",
-                    "How will you deliver this offer?",
-                    "What's the ideal length or duration for this offer?",
-                    "What call-to-action will you use?",
-                    "How will you follow up after the offer?",
-                    "What objections might arise with this offer?",
-                    "How will you measure the success of this offer?",
-                    "What's the next step after someone consumes this offer?"
-                ],
-                "system_prompt_file": "System Prompt/EPO Builder GPT.txt",
-                "output_template_file": None,
-                "rag_files": ["RAG/drive-download-20250614T003233Z-1-001.txt"]
-            },
-            "8_SCAMPER Synthesizer": {
-                "name": "SCAMPER Synthesizer",
-                "description": "Use SCAMPER technique to generate creative ideas",
-                "questions": [
-                    "What could you SUBSTITUTE in your current approach?",
-                    "What could you COMBINE with your existing solution?",
-                    "What could you ADAPT from other industries?",
-                    "What could you MODIFY or MAGNIFY in your offer?",
-                    "What could you PUT TO OTHER USES?",
-                    "What could you ELIMINATE from your current process?",
-                    "What could you REVERSE or REARRANGE?",
-                    "How could you make your solution more accessible?",
-                    "What new delivery methods could you explore?",
-                    "How could you create more value with less effort?"
-                ],
-                "system_prompt_file": "System Prompt/SCAMPER Synthesizer.txt",
-                "output_template_file": "Output template/🧠 EDDIE's Dead Lead Revival Kit.txt",
-                "rag_files": ["RAG/scamper.txt"]
-            },
-            "9_Wildcard Idea Bot": {
-                "name": "Wildcard Idea Bot",
-                "description": "Generate wild and creative ideas",
-                "questions": [
-                    "What's the most outrageous idea you could try?",
-                    "What would you do if money and time were unlimited?",
-                    "What's something completely opposite to your current approach?",
-                    "What would your avatar's dream solution look like?",
-                    "What's an idea that seems impossible but would be amazing?",
-                    "What would you do if you had to start over completely?",
-                    "What's an idea that combines two completely different things?",
-                    "What would you do if you had to solve this in 24 hours?",
-                    "What's an idea that would make your competitors jealous?",
-                    "What would you do if you had unlimited resources?"
-                ],
-                "system_prompt_file": "System Prompt/Wildcard Idea Bot GPT.txt",
-                "output_template_file": "Output template/Wildcard Idea Bot - Frustrated Freddie.txt",
-                "rag_files": []
-            },
-            "10_Concept Crafter GPT": {
-                "name": "Concept Crafter GPT",
-                "description": "Craft compelling concepts and ideas",
-                "questions": [
-                    "What's the core concept behind your best idea?",
-                    "How can you make this concept more compelling?",
-                    "What story can you tell around this concept?",
-                    "How can you make this concept more relatable?",
-                    "What emotions should this concept evoke?",
-                    "How can you make this concept more memorable?",
-                    "What metaphors or analogies work for this concept?",
-                    "How can you simplify this concept?",
-                    "What makes this concept unique?",
-                    "How can you test this concept quickly?"
-                ],
-                "system_prompt_file": "System Prompt/Concept Crafter Bot (1).txt",
-                "output_template_file": None,
-                "rag_files": []
-            },
-            "11_Hook & Headline GPT": {
-                "name": "Hook & Headline GPT",
-                "description": "Create compelling hooks and headlines",
-                "questions": [
-                    "What's the main benefit your avatar wants?",
-                    "What's their biggest pain point?",
-                    "What would make them stop scrolling?",
-                    "What's the most surprising thing about your solution?",
-                    "What's a common misconception in your industry?",
-                    "What's the transformation they're seeking?",
-                    "What's the cost of inaction?",
-                    "What's the most emotional aspect of their problem?",
-                    "What's the quickest win they could get?",
-                    "What's the most compelling proof you have?"
-                ],
-                "system_prompt_file": "System Prompt/Hook & Headline GPT.txt",
-                "output_template_file": None,
-                "rag_files": []
-            },
-            "12_Campaign Concept Generator GPT": {
-                "name": "Campaign Concept Generator GPT",
-                "description": "Generate complete campaign concepts",
-                "questions": [
-                    "What's the main objective of this campaign?",
-                    "Who is the primary target audience?",
-                    "What's the key message you want to convey?",
-                    "What channels will you use for this campaign?",
-                    "What's the timeline for this campaign?",
-                    "What's the budget for this campaign?",
-                    "What metrics will you use to measure success?",
-                    "What's the call-to-action for this campaign?",
-                    "What's the unique angle for this campaign?",
-                    "How will you follow up after the campaign?"
-                ],
-                "system_prompt_file": "System Prompt/Campaign Concept Generator GPT.txt",
-                "output_template_file": "Output template/Campaign Strategy Report for Frustrated Freddie_ The Eureka Ideation Machine.txt",
-                "rag_files": []
-            },
-            "13_Ideation Injection Bot": {
-                "name": "Ideation Injection Bot",
-                "description": "Inject additional creative ideas",
-                "questions": [
-                    "What's one idea you haven't tried yet?",
-                    "What's something your competitors are doing that you could improve?",
-                    "What's a trend you could leverage?",
-                    "What's a customer request you haven't fulfilled?",
-                    "What's a problem you've noticed that no one is solving?",
-                    "What's a skill or resource you have that you're not using?",
-                    "What's a partnership opportunity you could explore?",
-                    "What's a new market you could enter?",
-                    "What's a product extension you could create?",
-                    "What's a process you could automate or improve?"
-                ],
-                "system_prompt_file": "System Prompt/Idea Injection Bot.txt",
-                "output_template_file": None,
-                "rag_files": []
-            }
+        # Module metadata is available immediately, prompt/template/RAG files load on first use
+        self._configs = self._present_module_configs()
+        self.modules = {
+            module_id: self._module_metadata(module_id, config)
+            for module_id, config in self._configs.items()
         }
+        self._loaded: Dict[str, LoadedModule] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
         
-        for module_id, config in module_configs.items():
-            module_path = self.gpt_flow_path / module_id
-            if module_path.exists():
-                # Load system prompt
-                system_prompt = ""
-                if config["system_prompt_file"]:
-                    prompt_file = module_path / config["system_prompt_file"]
-                    if prompt_file.exists():
-                        try:
-                            with open(prompt_file, 'r', encoding='utf-8') as f:
-                                system_prompt = f.read()
-                        except Exception as e:
-                            logger.warning(f"Could not load system prompt for {module_id}: {e}")
-                
-                # Load output template
-                output_template = ""
-                if config["output_template_file"]:
-                    template_file = module_path / config["output_template_file"]
-                    if template_file.exists():
-                        try:
-                            with open(template_file, 'r', encoding='utf-8') as f:
-                                output_template = f.read()
-                        except Exception as e:
-                            logger.warning(f"Could not load output template for {module_id}: {e}")
-                
-                # Load RAG files
-                rag_content = []
-                for rag_file in config["rag_files"]:
-                    rag_path = module_path / rag_file
-                    if rag_path.exists():
-                        try:
-                            with open(rag_path, 'r', encoding='utf-8') as f:
-                                rag_content.append(f.read())
-                        except Exception as e:
-                            logger.warning(f"Could not load RAG file {rag_file} for {module_id}: {e}")
-                
-                modules[module_id] = {
-                    **config,
-                    "system_prompt": system_prompt,
-                    "output_template": output_template,
-                    "rag_content": rag_content,
-                    "module_id": module_id
-                }
+        # module_id -> the module after it in the flow (None for the last one)
+        module_ids = list(self.modules)
+        self._next_module: Dict[str, Optional[str]] = dict(zip(module_ids, module_ids[1:] + [None]))
+        
+        # module_id -> (mtime of the persisted file, question index -> enhanced question
+        # from enhance_module_batch), re-read when another process rewrites the file
+        self._enhanced_questions: Dict[str, Tuple[int, Dict[int, str]]] = {}
+        
+        # Bound in-flight LLM calls and their rate so prefetch/batch fan-out doesn't trip 429s
+        self._llm_sem = asyncio.Semaphore(settings.llm_concurrency)
+        self._rate_limiter = _RateLimiter(settings.llm_requests_per_minute, 60.0)
+        self._token_bucket = _TokenBucket(settings.llm_tokens_per_minute)
+        
+        # "module_id:session_id" -> (last used, question index -> background enhancement task),
+        # least recently used first
+        self._prefetch: "OrderedDict[str, Tuple[float, Dict[int, asyncio.Task]]]" = OrderedDict()
+        self._prefetch_sem = asyncio.Semaphore(10)
+        
+        # Per-module RAG vector indexes, built on first use; so is the embeddings client,
+        # so a missing API key only disables retrieval instead of failing at import
+        self._embeddings: Optional[OpenAIEmbeddings] = None
+        self._rag_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
+        self._rag_index_tasks: Dict[str, asyncio.Task] = {}
         
-        return modules
+        # digest of module + older answers -> summary used in place of those answers
+        self._context_summaries: Dict[str, str] = {}
+        
+        # prompt digest -> (monotonic timestamp, enhanced question)
+        self._enhance_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        
+        # input digest -> generated module summary dict or combined summary text
+        self._summary_cache: Dict[str, Any] = {}
+        
+        # Welcome greetings resolved per module once; the LLM is only used when opted in
+        self._welcome_templates = {
+            module_id: self._static_welcome(module.name) for module_id, module in self.modules.items()
+        }
+        self.dynamic_welcome = settings.chatbot_dynamic_welcome
+        
+    async def preload(self):
+        """Load every module's files up front, so no request waits on the first read of its module."""
+        modules = await self._load_modules_async()
+        for module_id, module in modules.items():
+            self._loaded.setdefault(module_id, module)
+        logger.info(f"ChatbotService preloaded {len(modules)} modules")
+    
+    async def _load_modules_async(self) -> Dict[str, LoadedModule]:
+        """Load every module's files concurrently."""
+        loaded = await asyncio.gather(*(self._read_module(module_id) for module_id in self._configs))
+        return dict(zip(self._configs, loaded))
+    
+    async def load_module(self, module_id: str) -> LoadedModule:
+        """Return a module with its system prompt, output template and RAG content loaded."""
+        return await self._ensure_loaded(module_id)
+    
+    async def _ensure_loaded(self, module_id: str) -> LoadedModule:
+        """Load a module's files the first time it is used; concurrent callers share one load."""
+        module = self._loaded.get(module_id)
+        if module is not None:
+            return module
+        if module_id not in self.modules:
+            raise ValueError(f"Module {module_id} not found")
+        
+        lock = self._load_locks.setdefault(module_id, asyncio.Lock())
+        async with lock:
+            module = self._loaded.get(module_id)
+            if module is None:
+                module = await self._read_module(module_id)
+                self._loaded[module_id] = module
+        return module
+    
+    async def _read_module(self, module_id: str) -> LoadedModule:
+        """Read one module's files concurrently off the event loop and build its loaded dict."""
+        config = self._configs[module_id]
+        module_path = self.gpt_flow_path / module_id
+        
+        tasks = []
+        if config["system_prompt_file"]:
+            tasks.append((module_id, "system_prompt", module_path / config["system_prompt_file"]))
+        if config["output_template_file"]:
+            tasks.append((module_id, "output_template", module_path / config["output_template_file"]))
+        for rag_file in config["rag_files"]:
+            tasks.append((module_id, "rag", module_path / rag_file))
+        
+        results = await asyncio.gather(*(asyncio.to_thread(_read_module_file, task) for task in tasks))
+        
+        contents: Dict[str, List[str]] = {}
+        for (_, kind, _), text in zip(tasks, results):
+            if text is not None:
+                contents.setdefault(kind, []).append(text)
+        
+        system_prompt = "".join(contents.get("system_prompt", []))
+        
+        # RAG text is only needed for retrieval and summaries, so it stays compressed in memory
+        rag_blob = "\n".join(contents.get("rag", []))
+        if rag_blob and ZSTD_AVAILABLE:
+            rag_blob = _RAG_COMPRESSOR.compress(rag_blob.encode("utf-8"))
+        
+        # The system prompt is identical across a module's questions and goes first so
+        # provider-side prefix caching can reuse it; retrieved RAG chunks go in the tail
+        static_prefix = "You are an expert AI assistant following this system prompt:\n\n" + system_prompt
+        
+        info = self.modules[module_id]
+        return LoadedModule(
+            **{field.name: getattr(info, field.name) for field in fields(ModuleInfo)},
+            system_prompt=system_prompt,
+            output_template="".join(contents.get("output_template", [])),
+            rag_blob=rag_blob,
+            static_prefix=static_prefix,
+            prompt_template=static_prefix.replace("%", "%%") + "\n\n" + _ENHANCE_TAIL_TEMPLATE
+        )
+    
+    def _present_module_configs(self) -> Dict[str, Mapping[str, Any]]:
+        """Return the configs of the modules whose directory exists, in module order."""
+        return {
+            module_id: config
+            for module_id, config in _MODULE_CONFIGS.items()
+            if (self.gpt_flow_path / module_id).exists()
+        }
+    
+    def _module_metadata(self, module_id: str, config: Mapping[str, Any]) -> ModuleInfo:
+        """Build the file-free part of a module: its config, questions and rule tags."""
+        return ModuleInfo(
+            module_id=module_id,
+            name=config["name"],
+            description=config["description"],
+            questions=config["questions"],
+            system_prompt_file=config["system_prompt_file"],
+            output_template_file=config["output_template_file"],
+            rag_files=config["rag_files"],
+            rule_tags=tuple(_classify_question(q) for q in config["questions"])
+        )
+    
+    def _rag_text(self, module: LoadedModule) -> str:
+        """Return a loaded module's RAG text, decompressing it if it is held compressed."""
+        rag_blob = module.rag_blob
+        return _decompress_rag(rag_blob) if isinstance(rag_blob, bytes) else rag_blob
+    
+    async def _get_rag_index(self, module: LoadedModule) -> Optional[FAISS]:
+        """Return the module's RAG vector index, building it once per process."""
+        module_id = module.module_id
+        task = self._rag_index_tasks.get(module_id)
+        if task is None:
+            task = asyncio.create_task(self._build_rag_index(module))
+            self._rag_index_tasks[module_id] = task
+        return await task
+    
+    def _get_embeddings(self) -> OpenAIEmbeddings:
+        """Return the embeddings client for RAG indexes, creating it on first use."""
+        if self._embeddings is None:
+            self._embeddings = OpenAIEmbeddings(model=settings.embedding_model, openai_api_key=settings.openai_api_key)
+        return self._embeddings
+    
+    async def _build_rag_index(self, module: LoadedModule) -> Optional[FAISS]:
+        """Chunk and embed the module's RAG text, reusing an index persisted for identical content."""
+        module_id = module.module_id
+        digest = hashlib.blake2b(
+            (settings.embedding_model + "\0" + self._rag_text(module)).encode("utf-8"), digest_size=16
+        ).hexdigest()
+        # load_local unpickles index.pkl, so the index lives in the app's own directory
+        # and is only loaded if this user wrote it
+        index_dir = Path(settings.upload_dir) / "rag_index" / digest
+        index_files = (index_dir, index_dir / "index.faiss", index_dir / "index.pkl")
+        
+        try:
+            if all(path.exists() for path in index_files):
+                if _owned_by_process_user(*index_files):
+                    return await asyncio.to_thread(
+                        FAISS.load_local, str(index_dir), self._get_embeddings(), allow_dangerous_deserialization=True
+                    )
+                logger.warning(f"Ignoring RAG index {index_dir} not owned by this user")
+            
+            chunks = self._rag_splitter.split_text(self._rag_text(module))
+            index = await FAISS.afrom_texts(chunks, self._get_embeddings())
+            await asyncio.to_thread(index_dir.mkdir, mode=0o700, parents=True, exist_ok=True)
+            await asyncio.to_thread(index.save_local, str(index_dir))
+            logger.info(f"Built RAG index for {module_id} with {len(chunks)} chunks")
+            return index
+        except Exception as e:
+            logger.warning(f"Could not build RAG index for {module_id}, sending full RAG text: {e}")
+            return None
+    
+    async def _retrieve_rag(self, module: LoadedModule, question: str, context: str = "") -> str:
+        """Return the RAG chunks most relevant to the question, or the full RAG text if retrieval is unavailable."""
+        if not module.rag_blob:
+            return ""
+        
+        index = await self._get_rag_index(module)
+        if index is None:
+            return self._rag_text(module)
+        
+        try:
+            docs = await index.asimilarity_search(question + "\n" + context, k=self._RAG_TOP_K)
+            return "\n\n".join(doc.page_content for doc in docs)
+        except Exception as e:
+            logger.warning(f"RAG retrieval failed for {module.module_id}: {e}")
+            return self._rag_text(module)
     
     def get_available_modules(self) -> List[Dict[str, Any]]:
         """Get list of available modules."""
         return [
             {
                 "id": module_id,
-                "name": module["name"],
-                "description": module["description"],
-                "question_count": len(module["questions"])
+                "name": module.name,
+                "description": module.description,
+                "question_count": len(module.questions)
             }
             for module_id, module in self.modules.items()
         ]
     
-    def get_module_questions(self, module_id: str) -> List[str]:
-        """Get questions for a specific module."""
-        if module_id not in self.modules:
+    def get_module_questions(self, module_id: str) -> Tuple[str, ...]:
+        """Get questions for a specific module (the module's own tuple, no copy is made)."""
+        module = self.modules.get(module_id)
+        if module is None:
             raise ValueError(f"Module {module_id} not found")
-        return self.modules[module_id]["questions"]
+        return module.questions
     
     async def get_next_question(
         self, 
         module_id: str, 
         current_question: int, 
-        previous_answers: Dict[str, str] = None
+        previous_answers: Dict[str, str] = None,
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """Get the next question for a module with context."""
         if module_id not in self.modules:
             raise ValueError(f"Module {module_id} not found")
         
-        module = self.modules[module_id]
-        questions = module["questions"]
+        module = await self._ensure_loaded(module_id)
+        questions = module.questions
+        
+        prefetch_key = f"{module_id}:{session_id}" if session_id else None
         
         if current_question >= len(questions):
+            if prefetch_key:
+                self._drop_prefetch(prefetch_key)
             return {
                 "done": True,
-                "message": f"All questions for {module['name']} have been answered!",
+                "message": f"All questions for {module.name} have been answered!",
                 "module_complete": True
             }
         
         # Build context from previous answers
-        context = ""
-        if previous_answers:
-            context = "Previous answers:" + chr(10)
-            for q_num, answer in previous_answers.items():
-                if answer and answer.strip():  # Only include non-empty answers
-                    context += f"Q{q_num}: {answer}" + chr(10)
+        context = await self._build_context(module_id, previous_answers)
         
         # Get the current question
         question = questions[current_question]
         
         # Generate enhanced question using GPT if system prompt is available
-        if module["system_prompt"]:
+        if module.system_prompt:
+            batched = await self._batched_questions(module)
+            
+            pending = self._take_prefetched(prefetch_key, current_question) if prefetch_key else None
+            
+            # Enhance the following question in the background while the user answers this one,
+            # with every answer given so far as its context
+            next_question = current_question + 1
+            if prefetch_key and next_question < len(questions) and next_question not in batched:
+                self._start_prefetch(prefetch_key, {
+                    next_question: asyncio.create_task(
+                        self._prefetch_question(module, questions[next_question], context)
+                    )
+                })
             try:
-                enhanced_question = await self._enhance_question(
-                    module["system_prompt"],
-                    question,
-                    context,
-                    module["rag_content"]
-                )
+                if current_question in batched:
+                    enhanced_question = batched[current_question]
+                elif pending is not None:
+                    enhanced_question = await pending
+                else:
+                    enhanced_question = await self._enhance_question(module, question, context)
             except Exception as e:
                 logger.warning(f"Could not enhance question: {e}")
                 enhanced_question = question
@@ -431,72 +951,121 @@ class ChatbotService:
             "question_number": current_question,
             "question": enhanced_question,
             "total_questions": len(questions),
-            "module_name": module["name"],
+            "module_name": module.name,
             "done": False,
             "can_skip": True,  # Allow skipping questions
             "validation_rules": self._get_validation_rules(module_id, current_question)
         }
     
+    async def stream_next_question(
+        self,
+        module_id: str,
+        current_question: int,
+        previous_answers: Dict[str, str] = None
+    ) -> AsyncIterator[str]:
+        """Yield the enhanced next question as it is generated; yields nothing once the module is complete."""
+        if module_id not in self.modules:
+            raise ValueError(f"Module {module_id} not found")
+        
+        module = await self._ensure_loaded(module_id)
+        questions = module.questions
+        if current_question >= len(questions):
+            return
+        
+        question = questions[current_question]
+        if not module.system_prompt:
+            yield question
+            return
+        
+        async for chunk in self._enhance_question_stream(
+            module, question, await self._build_context(module_id, previous_answers)
+        ):
+            yield chunk
+    
+    async def _build_context(self, module_id: str, previous_answers: Optional[Dict[str, str]]) -> str:
+        """Format previous answers as context, summarizing the oldest ones once they outgrow the token budget."""
+        context = self._build_answer_context(previous_answers)
+        if not context or _count_tokens(context) <= self._CONTEXT_TOKEN_BUDGET:
+            return context
+        
+        answers = [(q_num, answer) for q_num, answer in previous_answers.items() if answer and answer.strip()]
+        older = answers[:-self._CONTEXT_RECENT_ANSWERS]
+        recent_context = self._build_answer_context(dict(answers[-self._CONTEXT_RECENT_ANSWERS:]))
+        if not older:
+            return context
+        
+        older_block = "\n".join(f"Q{q_num}: {answer}" for q_num, answer in older)
+        key = hashlib.blake2b(f"{module_id}\0{older_block}".encode("utf-8"), digest_size=16).hexdigest()
+        summary = self._context_summaries.get(key)
+        if summary is None:
+            try:
+                summary = await self._generate_limited(
+                    prompt=(
+                        "Summarize these answers from a business questionnaire in a few short bullet points, "
+                        "keeping names, numbers and concrete facts:\n\n" + older_block
+                    ),
+                    temperature=0.3,
+                    max_tokens=300,
+                    service="openai"
+                )
+            except Exception as e:
+                logger.warning(f"Could not summarize earlier answers, sending only recent ones: {e}")
+                return recent_context
+            if len(self._context_summaries) >= self._CONTEXT_SUMMARY_CACHE_SIZE:
+                self._context_summaries.pop(next(iter(self._context_summaries)))
+            self._context_summaries[key] = summary
+        
+        return "Summary of earlier answers:\n" + summary + "\n" + recent_context
+    
+    def _build_answer_context(self, previous_answers: Optional[Dict[str, str]]) -> str:
+        """Format the non-empty previous answers as prompt context."""
+        if not previous_answers:
+            return ""
+        lines = ["Previous answers:"]
+        # Only include non-empty answers
+        lines.extend(f"Q{q_num}: {answer}" for q_num, answer in previous_answers.items() if answer and answer.strip())
+        return "\n".join(lines) + "\n" if len(lines) > 1 else ""
+    
     def _get_validation_rules(self, module_id: str, question_index: int) -> Dict[str, Any]:
         """Get validation rules for a specific question."""
-        module = self.modules[module_id]
-        questions = module["questions"]
+        rule_tags = self.modules[module_id].rule_tags
         
-        if question_index >= len(questions):
+        if question_index >= len(rule_tags):
             return {}
         
-        question = questions[question_index]
-        
-        # Define validation rules based on question content
-        validation_rules = {
-            "required": True,
-            "min_length": 3,
-            "max_length": 1000,
-            "allow_skip": True,
-            "skip_message": "You can skip this question if you're not sure or want to come back later."
-        }
-        
-        # Custom validation rules based on question type
-        if "email" in question.lower():
-            validation_rules["type"] = "email"
-            validation_rules["pattern"] = r"^[^\s@]+@[^\s@]+\.[^\s@]+$"
-        elif "price" in question.lower() or "cost" in question.lower():
-            validation_rules["type"] = "number"
-            validation_rules["min_value"] = 0
-        elif "age" in question.lower():
-            validation_rules["type"] = "number"
-            validation_rules["min_value"] = 13
-            validation_rules["max_value"] = 120
-        elif "name" in question.lower():
-            validation_rules["min_length"] = 2
-            validation_rules["max_length"] = 100
-        
-        return validation_rules
+        return _RULES_BY_TAG[rule_tags[question_index]]
     
     def validate_answer(self, module_id: str, question_index: int, answer: str) -> Dict[str, Any]:
-        """Validate an answer against the question's validation rules."""
+        """Validate an answer against the question's validation rules.
+        
+        The result's "code" is stable and identifies which check failed, "message" is for display.
+        """
         validation_rules = self._get_validation_rules(module_id, question_index)
+        answer = answer.strip() if answer else ""
         
         # Check if answer is empty (skip case)
-        if not answer or not answer.strip():
+        if not answer:
             if validation_rules.get("allow_skip", True):
                 return {
                     "valid": True,
                     "skipped": True,
+                    "code": "skipped",
                     "message": "Question skipped successfully."
                 }
             else:
                 return {
                     "valid": False,
                     "skipped": False,
+                    "code": "skip_not_allowed",
                     "message": "This question cannot be skipped."
                 }
         
         # Check required field
-        if validation_rules.get("required", True) and not answer.strip():
+        if validation_rules.get("required", True) and not answer:
             return {
                 "valid": False,
                 "skipped": False,
+                "code": "required",
                 "message": "This question is required."
             }
         
@@ -508,106 +1077,156 @@ class ChatbotService:
             "thank you", "good", "great", "fine", "alright", "okay", "sure"
         ]
         
-        answer_lower = answer.strip().lower()
+        answer_lower = answer.lower()
         is_conversational = any(keyword in answer_lower for keyword in conversational_keywords)
         
-        if is_conversational and len(answer.strip()) < 20:  # Short conversational responses
+        if is_conversational and len(answer) < 20:  # Short conversational responses
             return {
                 "valid": False,
                 "skipped": False,
+                "code": "conversational",
                 "message": "Please provide a specific answer to the question."
             }
         
         # Check length
-        if len(answer.strip()) < validation_rules.get("min_length", 5):  # Increased minimum length
+        if len(answer) < validation_rules.get("min_length", 5):  # Increased minimum length
             return {
                 "valid": False,
                 "skipped": False,
+                "code": "too_short",
                 "message": f"Answer must be at least {validation_rules.get('min_length', 5)} characters long."
             }
         
-        if len(answer.strip()) > validation_rules.get("max_length", 1000):
+        if len(answer) > validation_rules.get("max_length", 1000):
             return {
                 "valid": False,
                 "skipped": False,
+                "code": "too_long",
                 "message": f"Answer must be no more than {validation_rules.get('max_length', 1000)} characters long."
             }
         
         # Check type-specific validation
         if validation_rules.get("type") == "email":
-            import re
-            email_pattern = validation_rules.get("pattern", r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
-            if not re.match(email_pattern, answer.strip()):
+            if not _EMAIL_RE.match(answer):
                 return {
                     "valid": False,
                     "skipped": False,
+                    "code": "invalid_email",
                     "message": "Please enter a valid email address."
                 }
         
         elif validation_rules.get("type") == "number":
             try:
-                value = float(answer.strip())
+                value = float(answer)
                 if "min_value" in validation_rules and value < validation_rules["min_value"]:
                     return {
                         "valid": False,
                         "skipped": False,
+                        "code": "below_min",
                         "message": f"Value must be at least {validation_rules['min_value']}."
                     }
                 if "max_value" in validation_rules and value > validation_rules["max_value"]:
                     return {
                         "valid": False,
                         "skipped": False,
+                        "code": "above_max",
                         "message": f"Value must be no more than {validation_rules['max_value']}."
                     }
             except ValueError:
                 return {
                     "valid": False,
                     "skipped": False,
+                    "code": "invalid_number",
                     "message": "Please enter a valid number."
                 }
         
         return {
             "valid": True,
             "skipped": False,
+            "code": "valid",
             "message": "Answer is valid."
         }
     
+    def _build_enhance_prompt(
+        self, module: LoadedModule, question: str, context: str = "", rag_context: str = ""
+    ) -> str:
+        """Build the question-enhancement prompt from the module's preformatted template."""
+        # Only the tail varies per call, the module's static prefix stays byte-identical
+        return module.prompt_template % self._enhance_tail_args(question, context, rag_context)
+    
+    def _build_enhance_tail(self, question: str, context: str = "", rag_context: str = "") -> str:
+        """Build the per-call part of the question-enhancement prompt."""
+        return _ENHANCE_TAIL_TEMPLATE % self._enhance_tail_args(question, context, rag_context)
+    
+    def _enhance_tail_args(self, question: str, context: str, rag_context: str) -> Tuple[str, str, str]:
+        """Wrap the RAG and previous-answer blocks for the prompt tail, leaving out empty ones."""
+        return (
+            ("Additional context from RAG files:\n" + rag_context + "\n\n") if rag_context else "",
+            ("Context from previous answers:\n" + context + "\n\n") if context else "",
+            question
+        )
+    
+    def _cached_enhancement(self, key: str) -> Optional[str]:
+        """Return a fresh cached enhancement for a prompt digest, if any."""
+        cached = self._enhance_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self._ENHANCE_CACHE_TTL:
+            self._enhance_cache.move_to_end(key)
+            return cached[1]
+        return None
+    
+    def _store_enhancement(self, key: str, enhanced: str):
+        """Cache an enhancement under its prompt digest, evicting the least recently used entry."""
+        self._enhance_cache[key] = (time.monotonic(), enhanced)
+        self._enhance_cache.move_to_end(key)
+        if len(self._enhance_cache) > self._ENHANCE_CACHE_SIZE:
+            self._enhance_cache.popitem(last=False)
+    
     async def _enhance_question(
         self, 
-        system_prompt: str, 
+        module: LoadedModule, 
         question: str, 
-        context: str = "", 
-        rag_content: list = None
+        context: str = ""
     ) -> str:
         try:
-            # Build the prompt parts safely
-            prompt_parts = [
-                "You are an expert AI assistant following this system prompt:",
-                "",
-                system_prompt,
-                "",
-                f"Current question to enhance: {question}",
-                ""
-            ]
-            if context:
-                prompt_parts.append("Context from previous answers:\n" + context)
-                prompt_parts.append("")
-            if rag_content:
-                prompt_parts.append("Additional context from RAG files:\n" + "\n".join(rag_content))
-                prompt_parts.append("")
-            prompt_parts.append(
-                "Please enhance this question to be more engaging, specific, and helpful. "
-                "Make it conversational and encouraging. Return only the enhanced question, nothing else."
-            )
-            prompt = "\n".join(prompt_parts)
+            rag_context = await self._retrieve_rag(module, question, context)
+            prompt = self._build_enhance_prompt(module, question, context, rag_context)
+            
+            # Caching is only sound when the completion is deterministic
+            deterministic = settings.chatbot_deterministic_questions
+            key = None
+            if deterministic:
+                key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+                cached = self._cached_enhancement(key)
+                if cached:
+                    return cached
 
-            # Use AI service manager for content generation
-            enhanced = await self.ai_manager.generate_content(
-                prompt=prompt,
-                temperature=0.7,
-                max_tokens=500,
-                service="openai"  # Prefer OpenAI for question enhancement
-            )
+            temperature = 0.0 if deterministic else 0.7
+            try:
+                # Use AI service manager for content generation
+                enhanced = await self._generate_limited(
+                    prompt=prompt,
+                    temperature=temperature,
+                    max_tokens=500,
+                    service="openai",  # Prefer OpenAI for question enhancement
+                    cache_key=f"enhance:{module.module_id}"
+                )
+            except Exception as e:
+                if not self.client:
+                    raise
+                logger.warning(f"AI service manager failed, enhancing question directly: {e}")
+                response = await self.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=[
+                        {"role": "system", "content": module.static_prefix},
+                        {"role": "user", "content": self._build_enhance_tail(question, context, rag_context)}
+                    ],
+                    temperature=temperature,
+                    max_tokens=500
+                )
+                enhanced = response.choices[0].message.content
+            
+            if key and enhanced:
+                self._store_enhancement(key, enhanced)
             
             return enhanced if enhanced else question
             
@@ -615,6 +1234,250 @@ class ChatbotService:
             logger.error(f"Error enhancing question: {e}")
             return question
     
+    @asynccontextmanager
+    async def _llm_slot(self, prompt: str, max_tokens: int):
+        """Hold a concurrency slot for one LLM call once the request and token budgets allow it."""
+        async with self._llm_sem, self._rate_limiter:
+            # Rough token estimate: ~4 characters per prompt token plus the whole completion budget
+            await self._token_bucket.acquire(len(prompt) // 4 + max_tokens)
+            yield
+    
+    async def _generate_limited(self, **kwargs) -> str:
+        """Call ai_manager.generate under the concurrency and rate limits, retrying with jitter."""
+        for attempt in range(self._LLM_MAX_ATTEMPTS):
+            try:
+                async with self._llm_slot(kwargs["prompt"], kwargs.get("max_tokens", 2000)):
+                    return await self.ai_manager.generate(**kwargs)
+            except Exception as e:
+                if attempt == self._LLM_MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(30, 2 ** (attempt + 1)))
+                logger.warning(f"LLM call failed ({e}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self._LLM_MAX_ATTEMPTS})")
+                await asyncio.sleep(delay)
+    
+    async def _enhance_question_stream(
+        self,
+        module: LoadedModule,
+        question: str,
+        context: str = ""
+    ) -> AsyncIterator[str]:
+        """Stream the enhanced question token by token, falling back to the plain question."""
+        rag_context = await self._retrieve_rag(module, question, context)
+        deterministic = settings.chatbot_deterministic_questions
+        key = None
+        if deterministic:
+            prompt = self._build_enhance_prompt(module, question, context, rag_context)
+            key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+            cached = self._cached_enhancement(key)
+            if cached:
+                yield cached
+                return
+        
+        if not self.client:
+            yield question
+            return
+        
+        buffer = []
+        tail = self._build_enhance_tail(question, context, rag_context)
+        try:
+            async with self._llm_slot(module.static_prefix + tail, 500):
+                stream = await self.client.chat.completions.create(
+                    model=settings.openai_model,
+                    messages=[
+                        {"role": "system", "content": module.static_prefix},
+                        {"role": "user", "content": tail}
+                    ],
+                    temperature=0.0 if deterministic else 0.7,
+                    max_tokens=500,
+                    stream=True
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        buffer.append(delta)
+                        yield delta
+        except Exception as e:
+            logger.error(f"Error streaming enhanced question: {e}")
+            if not buffer:
+                yield question
+            return
+        
+        if not buffer:
+            yield question
+        elif key:
+            self._store_enhancement(key, "".join(buffer))
+    
+    def _start_prefetch(self, prefetch_key: str, tasks: Dict[int, asyncio.Task]):
+        """Add background enhancements to a session, first dropping idle or excess sessions.
+        
+        A task for a question that already has one replaces it, since it was started with newer answers.
+        """
+        now = time.monotonic()
+        entry = self._prefetch.pop(prefetch_key, None)
+        while self._prefetch:
+            oldest_key, (last_used, _) = next(iter(self._prefetch.items()))
+            if len(self._prefetch) < self._PREFETCH_SESSIONS and now - last_used < self._PREFETCH_TTL:
+                break
+            self._drop_prefetch(oldest_key)
+        merged = entry[1] if entry else {}
+        for index, task in tasks.items():
+            replaced = merged.pop(index, None)
+            if replaced is not None:
+                self._discard_task(replaced)
+            merged[index] = task
+        if merged:
+            self._prefetch[prefetch_key] = (now, merged)
+    
+    def _take_prefetched(self, prefetch_key: str, index: int) -> Optional[asyncio.Task]:
+        """Remove and return the background enhancement for a question, if one was started."""
+        entry = self._prefetch.get(prefetch_key)
+        if entry is None:
+            return None
+        tasks = entry[1]
+        task = tasks.pop(index, None)
+        if tasks:
+            self._prefetch[prefetch_key] = (time.monotonic(), tasks)
+            self._prefetch.move_to_end(prefetch_key)
+        else:
+            del self._prefetch[prefetch_key]
+        return task
+    
+    def _drop_prefetch(self, prefetch_key: str):
+        """Forget a session's background enhancements, cancelling any still running."""
+        entry = self._prefetch.pop(prefetch_key, None)
+        if entry is None:
+            return
+        for task in entry[1].values():
+            self._discard_task(task)
+    
+    @staticmethod
+    def _discard_task(task: asyncio.Task):
+        """Cancel an unused background enhancement, or consume its failure if it already finished."""
+        if task.done():
+            if not task.cancelled():
+                task.exception()  # Retrieved, so an unused failure isn't logged at GC
+        else:
+            task.cancel()
+    
+    async def _prefetch_question(self, module: LoadedModule, question: str, context: str = "") -> str:
+        """Enhance a question ahead of time, bounded so concurrent sessions don't flood the API."""
+        async with self._prefetch_sem:
+            return await self._enhance_question(module, question, context)
+    
+    async def enhance_module_batch(self, module_id: str, poll_interval: float = 30.0) -> Dict[int, str]:
+        """Enhance every question of a module through the OpenAI Batch API (half price, separate limits).
+        
+        Meant for offline regeneration (see enhance_questions.py), e.g. after editing a system
+        prompt; completion can take up to the 24h batch window. Results are persisted under the
+        upload dir, where get_next_question in every worker picks them up.
+        """
+        if module_id not in self.modules:
+            raise ValueError(f"Module {module_id} not found")
+        if not self.client:
+            raise Exception("OpenAI client not available")
+        
+        module = await self._ensure_loaded(module_id)
+        rag_contexts = await asyncio.gather(*(self._retrieve_rag(module, q) for q in module.questions))
+        lines = [
+            json.dumps({
+                "custom_id": f"{module_id}:{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": settings.openai_model,
+                    "messages": [
+                        {"role": "user", "content": self._build_enhance_prompt(module, question, rag_context=rag_context)}
+                    ],
+                    "temperature": 0.7,
+                    "max_tokens": 500
+                }
+            })
+            for i, (question, rag_context) in enumerate(zip(module.questions, rag_contexts))
+        ]
+        
+        batch_file = await self.client.files.create(
+            file=("enhance_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted enhancement batch {batch.id} for {module_id}")
+        
+        while batch.status not in {"completed", "failed", "expired", "cancelled"}:
+            await asyncio.sleep(poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            raise Exception(f"Enhancement batch {batch.id} for {module_id} ended with status {batch.status}")
+        
+        output = await self.client.files.content(batch.output_file_id)
+        enhanced = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            try:
+                index = int(result["custom_id"].rsplit(":", 1)[1])
+                content = result["response"]["body"]["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError, ValueError):
+                logger.warning(f"Skipping malformed batch result for {module_id}: {result.get('custom_id')}")
+                continue
+            if content:
+                enhanced[index] = content.strip()
+        
+        await asyncio.to_thread(self._store_batched_questions, module, enhanced)
+        logger.info(f"Stored {len(enhanced)} batch-enhanced questions for {module_id}")
+        return enhanced
+    
+    def _batch_path(self, module_id: str) -> Path:
+        """Where a module's batch-enhanced questions are persisted."""
+        return Path(settings.upload_dir) / "enhanced_questions" / f"{module_id}.json"
+    
+    def _batch_digest(self, module: LoadedModule) -> str:
+        """Fingerprint the inputs of a module's enhancements, so results for an edited prompt are ignored."""
+        return hashlib.blake2b(
+            repr((settings.openai_model, module.prompt_template, module.questions)).encode("utf-8"), digest_size=16
+        ).hexdigest()
+    
+    def _store_batched_questions(self, module: LoadedModule, enhanced: Dict[int, str]):
+        """Atomically write a module's batch-enhanced questions."""
+        path = self._batch_path(module.module_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({"digest": self._batch_digest(module), "questions": enhanced}), encoding="utf-8"
+        )
+        os.replace(tmp, path)
+    
+    async def _batched_questions(self, module: LoadedModule) -> Dict[int, str]:
+        """Return the persisted batch-enhanced questions for a module, if any match its current prompt."""
+        path = self._batch_path(module.module_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        
+        cached = self._enhanced_questions.get(module.module_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        questions = {}
+        try:
+            data = json.loads(await asyncio.to_thread(path.read_text, encoding="utf-8"))
+            if data.get("digest") == self._batch_digest(module):
+                questions = {int(index): text for index, text in data["questions"].items()}
+            else:
+                logger.info(f"Ignoring batch-enhanced questions for {module.module_id} from an older prompt")
+        except Exception as e:
+            logger.warning(f"Could not read batch-enhanced questions {path}: {e}")
+        self._enhanced_questions[module.module_id] = (mtime, questions)
+        return questions
+    
     async def generate_module_summary(
         self, 
         module_id: str, 
@@ -624,25 +1487,16 @@ class ChatbotService:
         if module_id not in self.modules:
             raise ValueError(f"Module {module_id} not found")
         
-        module = self.modules[module_id]
+        module = await self._ensure_loaded(module_id)
+        
+        # Same answers against the same template summarize the same way (retries, navigating back)
+        key = self._summary_key({"m": module_id, "a": answers, "v": module.output_template})
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
         
         try:
-            # Create a focused prompt that follows the template exactly
-            template_part = module['output_template'] if module['output_template'] else ""
-            rag_part = ("\n\nAdditional context:\n" + "\n".join(module['rag_content'])) if module['rag_content'] else ""
-            
-            prompt = f"""You are an expert AI assistant. The user has completed {module['name']}.
-
-User's answers:
-{chr(10).join([f"Q{i+1}: {answer}" for i, answer in enumerate(answers.values())])}
-
-{rag_part}
-
-IMPORTANT: Generate a summary that EXACTLY follows this template format:
-
-{template_part}
-
-Fill in the template with the user's actual answers. Keep it concise and professional. Use the exact structure and emojis from the template."""
+            prompt = self._build_summary_prompt(module, answers)
 
             # Add retry logic with exponential backoff for rate limiting
             max_retries = 3
@@ -651,39 +1505,134 @@ Fill in the template with the user's actual answers. Keep it concise and profess
             for attempt in range(max_retries):
                 try:
                     # Use AI service manager for content generation
-                    summary = await self.ai_manager.generate_content(
-                        prompt=prompt,
-                        temperature=0.3,  # Lower temperature for more consistent formatting
-                        max_tokens=1500,  # Reduced for more concise output
-                        service="openai"
-                    )
+                    async with self._llm_slot(prompt, 1500):
+                        summary = await self.ai_manager.generate(
+                            prompt=prompt,
+                            temperature=0.3,  # Lower temperature for more consistent formatting
+                            max_tokens=1500,  # Reduced for more concise output
+                            service="openai",
+                            cache_key=f"summary:{module_id}"
+                        )
                     
-                    return {
-                        "module_name": module["name"],
-                        "module_id": module_id,
-                        "summary": summary,
-                        "answers": answers,
-                        "completion_message": f"✅ {module['name']} completed! Here's your summary:"
-                    }
+                    result = self._summary_result(module, answers, summary)
+                    self._store_summary(key, copy.deepcopy(result))
+                    return result
                     
-                except Exception as e:
-                    if "429" in str(e) and attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)
-                        logger.warning(f"Rate limited, retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        raise e
+                except APIStatusError as e:
+                    # RateLimitError is the 429 APIStatusError; anything else is not worth retrying
+                    if e.status_code != 429 or attempt == max_retries - 1:
+                        raise
+                    # Honor the server's Retry-After, otherwise back off with jitter so callers
+                    # sharing the quota don't retry in lockstep
+                    delay = _retry_after(e)
+                    if delay is None:
+                        delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+                    logger.warning("Rate limited, retrying in %.1f seconds... (attempt %d/%d)", delay, attempt + 1, max_retries)
+                    await asyncio.sleep(delay)
             
         except Exception as e:
-            logger.error(f"Error generating module summary: {e}")
-            return {
-                "module_name": module["name"],
-                "module_id": module_id,
-                "summary": f"✅ {module['name']} Summary\n\nModule completed with {len(answers)} answers.",
-                "answers": answers,
-                "completion_message": f"✅ {module['name']} completed!"
-            }
+            logger.error("Error generating module summary: %s", e)
+            return self._summary_fallback(module, answers)
+    
+    async def stream_module_summary(
+        self,
+        module_id: str,
+        answers: Dict[str, str]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a module summary as {"delta": ...} chunks, ending with the full summary dict."""
+        if module_id not in self.modules:
+            raise ValueError(f"Module {module_id} not found")
+        
+        module = await self._ensure_loaded(module_id)
+        key = self._summary_key({"m": module_id, "a": answers, "v": module.output_template})
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            yield {"delta": cached["summary"]}
+            yield copy.deepcopy(cached)
+            return
+        
+        buffer = []
+        try:
+            prompt = self._build_summary_prompt(module, answers)
+            async with self._llm_slot(prompt, 1500):
+                async for delta in self.ai_manager.generate(
+                    prompt=prompt,
+                    temperature=0.3,
+                    max_tokens=1500,
+                    service="openai",
+                    cache_key=f"summary:{module_id}",
+                    stream=True
+                ):
+                    buffer.append(delta)
+                    yield {"delta": delta}
+        except Exception as e:
+            logger.error("Error streaming module summary: %s", e)
+            if not buffer:
+                fallback = self._summary_fallback(module, answers)
+                yield {"delta": fallback["summary"]}
+                yield fallback
+                return
+            # Keep what already reached the user, but flag it so a truncated summary isn't cached or saved
+            partial = self._summary_result(module, answers, "".join(buffer))
+            partial["partial"] = True
+            yield partial
+            return
+        
+        result = self._summary_result(module, answers, "".join(buffer))
+        self._store_summary(key, copy.deepcopy(result))
+        yield result
+    
+    def _build_summary_prompt(self, module: LoadedModule, answers: Dict[str, str]) -> str:
+        """Build the module summary prompt around the answers."""
+        # Only the answers vary per call and go last; the byte-identical template/RAG prefix
+        # comes first so provider-side prompt caching can reuse it across users
+        parts = [self._summary_prefix(module)]
+        values = answers.values()
+        if len(values) <= len(_Q_PREFIXES):
+            parts.extend(map(str.__add__, _Q_PREFIXES, values))
+        else:
+            parts.extend(f"Q{i+1}: {answer}" for i, answer in enumerate(values))
+        parts.append("")
+        parts.append(_SUMMARY_SUFFIX)
+        # One join sizes and copies the whole prompt once
+        return "\n".join(parts)
+    
+    def _summary_result(self, module: LoadedModule, answers: Dict[str, str], summary: str) -> Dict[str, Any]:
+        """Wrap a generated summary in the module summary response."""
+        return {
+            "module_name": module.name,
+            "module_id": module.module_id,
+            "summary": summary,
+            "answers": answers,
+            "completion_message": f"✅ {module.name} completed! Here's your summary:"
+        }
+    
+    def _summary_fallback(self, module: LoadedModule, answers: Dict[str, str]) -> Dict[str, Any]:
+        """Summary response used when generation fails."""
+        return {
+            "module_name": module.name,
+            "module_id": module.module_id,
+            "summary": f"✅ {module.name} Summary\n\nModule completed with {len(answers)} answers.",
+            "answers": answers,
+            "completion_message": f"✅ {module.name} completed!",
+            "fallback": True
+        }
+    
+    def _summary_prefix(self, module: LoadedModule) -> str:
+        """Return the module's summary prompt prefix, memoized for the most recently used modules."""
+        # Built on demand rather than stored on the module so compressed RAG stays compressed
+        return _build_summary_prefix(module.name, module.output_template, module.rag_blob)
+    
+    def _summary_key(self, inputs: Dict[str, Any]) -> str:
+        """Digest a summary's inputs into a cache key."""
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _store_summary(self, key: str, summary: Any):
+        """Cache a generated summary, evicting the oldest entry once full."""
+        if len(self._summary_cache) >= self._SUMMARY_CACHE_SIZE:
+            self._summary_cache.pop(next(iter(self._summary_cache)))
+        self._summary_cache[key] = summary
     
     async def check_module_completion_ready(
         self, 
@@ -694,74 +1643,93 @@ Fill in the template with the user's actual answers. Keep it concise and profess
         if module_id not in self.modules:
             return False
         
-        questions = self.modules[module_id]["questions"]
+        questions = self.modules[module_id].questions
         return current_question >= len(questions)
     
     def get_next_module(self, current_module_id: str) -> Optional[str]:
         """Get the next module in the sequence."""
-        module_ids = list(self.modules.keys())
-        try:
-            current_index = module_ids.index(current_module_id)
-            if current_index + 1 < len(module_ids):
-                return module_ids[current_index + 1]
-        except ValueError:
-            pass
-        return None
+        return self._next_module.get(current_module_id)
     
     async def generate_combined_summary(self, completed_modules: dict) -> str:
         """Generate a combined summary for all completed modules."""
         try:
-            # Create a comprehensive prompt for combining all module summaries
-            combined_prompt = """
-            You are an expert business strategist. Below are summaries from different modules of a business development process.
-            Please create a comprehensive, well-structured summary that ties everything together.
-            
-            Module Summaries:
-            """
-            
-            for module_id, module_data in completed_modules.items():
-                if isinstance(module_data, dict):
-                    if "summary" in module_data:
-                        # New format from All GPTs mode
-                        combined_prompt += f"\n\n## {module_data.get('module_name', 'Module')}\n{module_data['summary']}"
-                    else:
-                        # Old format from traditional Q&A
-                        combined_prompt += f"\n\n{str(module_data)}"
-                else:
-                    combined_prompt += f"\n\n{str(module_data)}"
+            key = self._summary_key({"combined": completed_modules})
+            cached = self._summary_cache.get(key)
+            if cached is not None:
+                return cached
             
-            combined_prompt += """
-            
-            Please create a comprehensive summary that:
-            1. Synthesizes all the information into a cohesive business strategy
-            2. Highlights key insights and actionable recommendations
-            3. Shows how all the pieces work together
-            4. Is written in a professional, engaging tone
-            5. Is structured with clear sections and bullet points where appropriate
-            6. Includes a table of contents for easy navigation
-            
-            Format the response as a complete business strategy document with:
-            - Executive Summary
-            - Key Findings from Each Module
-            - Strategic Recommendations
-            - Action Plan
-            - Next Steps
-            
-            Make it comprehensive and actionable for business owners.
-            """
-            
-            # Use AI service manager for the combined summary
-            response = await self.ai_manager.generate_text(
-                prompt=combined_prompt,
+            # Use AI service manager for the combined summary; errors raise so they are never cached
+            summary = await self._generate_limited(
+                prompt=await self._build_combined_prompt(completed_modules),
                 max_tokens=3000,
                 temperature=0.7
             )
+            if not summary:
+                return "Failed to generate combined summary"
             
-            return response.get("text", "Failed to generate combined summary")
+            self._store_summary(key, summary)
+            return summary
             
         except Exception as e:
-            logger.error(f"Error generating combined summary: {e}")
-            return f"Error generating combined summary: {str(e)}"
+            logger.error("Error generating combined summary: %s", e)
+            return f"Error generating combined summary: {e}"
+
+    async def stream_combined_summary(self, completed_modules: dict) -> AsyncIterator[str]:
+        """Stream the combined summary for all completed modules as it is generated.
+        
+        Raises once generation fails or yields nothing, after any deltas already produced,
+        so callers can tell a truncated summary from a complete one.
+        """
+        key = self._summary_key({"combined": completed_modules})
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        buffer = []
+        try:
+            # Built before taking an LLM slot, the map step makes its own LLM calls
+            prompt = await self._build_combined_prompt(completed_modules)
+            async with self._llm_slot(prompt, 3000):
+                async for delta in self.ai_manager.generate(
+                    prompt=prompt,
+                    max_tokens=3000,
+                    temperature=0.7,
+                    stream=True
+                ):
+                    buffer.append(delta)
+                    yield delta
+        except Exception as e:
+            logger.error("Error streaming combined summary: %s", e)
+            raise
+        
+        if not buffer:
+            raise Exception("Failed to generate combined summary")
+        self._store_summary(key, "".join(buffer))
+    
+    async def _module_section(self, module_id: str, module_data: Any) -> str:
+        """Render one completed module for the combined summary, summarizing raw answers first."""
+        if isinstance(module_data, dict):
+            if "summary" in module_data:
+                # New format from All GPTs mode
+                return f"## {module_data.get('module_name', 'Module')}\n{module_data['summary']}"
+            if module_id in self.modules:
+                # Old format from traditional Q&A: reduce the answers to the module's summary
+                summary_data = await self.generate_module_summary(module_id, module_data)
+                if not summary_data.get("fallback"):
+                    return f"## {summary_data['module_name']}\n{summary_data['summary']}"
+                # The placeholder carries none of the answers; let the combiner see them raw instead
+        return str(module_data)
+    
+    async def _build_combined_prompt(self, completed_modules: dict) -> str:
+        """Build the prompt that combines every completed module's summary."""
+        # Map: modules without a summary yet are summarized concurrently, so the combiner
+        # only ever sees short per-module summaries
+        sections = await asyncio.gather(*(
+            self._module_section(module_id, module_data)
+            for module_id, module_data in completed_modules.items()
+        ))
+        return "\n\n".join([_COMBINED_HEADER, *sections, _COMBINED_FOOTER])
 
     async def generate_welcome_message(self, module_id: str) -> str:
         """Generate a friendly welcome message for starting a conversational chat."""
@@ -769,35 +1737,38 @@ Fill in the template with the user's actual answers. Keep it concise and profess
             if module_id not in self.modules:
                 return "Hi there! How can I assist you today?"
             
-            module_info = self.modules[module_id]
-            module_name = module_info["name"]
+            welcome = self._welcome_templates[module_id]
+            if not self.dynamic_welcome:
+                return welcome
             
-            # Generate concise welcome message based on module
-            if "Offer Clarifier" in module_name:
-                return "Hi 👋 I'm here to help you clarify your business offer! Let's get started!"
-            elif "Avatar" in module_name:
-                return "Hi 👋 I'm here to help you create your customer avatar! Let's get started!"
-            elif "Trigger" in module_name:
-                return "Hi 👋 I'm here to help you identify your customer triggers! Let's get started!"
-            elif "EPO" in module_name:
-                return "Hi 👋 I'm here to help you build your EPO! Let's get started!"
-            elif "SCAMPER" in module_name:
-                return "Hi 👋 I'm here to help you synthesize ideas with SCAMPER! Let's get started!"
-            elif "Concept" in module_name:
-                return "Hi 👋 I'm here to help you craft your concept! Let's get started!"
-            elif "Hook" in module_name:
-                return "Hi 👋 I'm here to help you create compelling hooks! Let's get started!"
-            elif "Campaign" in module_name:
-                return "Hi 👋 I'm here to help you generate campaign concepts! Let's get started!"
-            elif "Ideation" in module_name:
-                return "Hi 👋 I'm here to help you with ideation! Let's get started!"
-            else:
-                return "Hi 👋 I'm here to help you with your business strategy! Let's get started!"
+            module_info = self.modules[module_id]
+            try:
+                generated = await self._generate_limited(
+                    prompt=(
+                        "Write a short, friendly one-sentence welcome for a user starting the "
+                        f"\"{module_info.name}\" module ({module_info.description}). "
+                        "Return only the welcome message."
+                    ),
+                    temperature=0.8,
+                    max_tokens=150,
+                    service="openai"
+                )
+            except Exception as e:
+                logger.warning("Could not generate welcome message, using the static one: %s", e)
+                return welcome
+            return generated.strip() or welcome
             
         except Exception as e:
-            logger.error(f"Error generating welcome message: {e}")
+            logger.error("Error generating welcome message: %s", e)
             return "Hi 👋 I'm here to help! Just let me know what you need support with today."
 
+    def _static_welcome(self, module_name: str) -> str:
+        """Pick the greeting for the first welcome keyword in the module name."""
+        for keyword, message in self._WELCOME_MESSAGES:
+            if keyword in module_name:
+                return message
+        return self._DEFAULT_WELCOME
+    
     async def process_conversational_message(
         self,
         module_id: str,
@@ -810,6 +1781,7 @@ Fill in the template with the user's actual answers. Keep it concise and profess
         user_id: str = None
     ) -> Dict[str, Any]:
         """Process a conversational message with advanced memory management and context awareness."""
+        questions: Tuple[str, ...] = ()
         try:
             questions = self.get_module_questions(module_id)
 
@@ -841,17 +1813,16 @@ Fill in the template with the user's actual answers. Keep it concise and profess
                     session_id=session_id,
                     module_id=module_id,
                     user_id=user_id,  # Add user_id
-                    user_message=user_message,
-                    module_questions=questions
+                    user_message=user_message
                 )
 
             # Fallback to original logic if no database access
             return await self._process_conversational_message_fallback(
-                module_id, current_question, previous_answers, user_message
+                module_id, current_question, previous_answers, user_message, questions
             )
 
         except Exception as e:
-            logger.error(f"Error processing conversational message: {e}")
+            logger.error("Error processing conversational message: %s", e)
             return {
                 "message": "I'm having trouble processing that. Could you please rephrase your response?",
                 "is_question": True,
@@ -864,11 +1835,11 @@ Fill in the template with the user's actual answers. Keep it concise and profess
         module_id: str, 
         current_question: int, 
         previous_answers: Dict[str, str], 
-        user_message: str
+        user_message: str,
+        questions: Tuple[str, ...]
     ) -> Dict[str, Any]:
         """Fallback conversational message processing without database."""
         try:
-            questions = self.get_module_questions(module_id)
             
             # Check if module is complete
             if current_question >= len(questions):
@@ -919,7 +1890,7 @@ Fill in the template with the user's actual answers. Keep it concise and profess
                         }
             
             # Check if user wants to edit summary
-            if any(keyword in user_message.lower() for keyword in ["edit", "update", "change", "modify", "summary"]):
+            if _EDIT_RE.search(user_message):
                 if previous_answers:
                     return {
                         "message": "I'd be happy to help you edit the summary! What would you like to change?",
@@ -967,7 +1938,8 @@ Fill in the template with the user's actual answers. Keep it concise and profess
             else:
                 # Invalid answer, ask for clarification
                 clarification_message = await self._generate_clarification_message(
-                    module_id, current_question, user_message, validation_result["message"]
+                    module_id, current_question, user_message, validation_result["message"],
+                    code=validation_result.get("code"), question=questions[current_question]
                 )
                 
                 return {
@@ -978,7 +1950,7 @@ Fill in the template with the user's actual answers. Keep it concise and profess
                 }
                 
         except Exception as e:
-            logger.error(f"Error processing conversational message fallback: {e}")
+            logger.error("Error processing conversational message fallback: %s", e)
             return {
                 "message": "I'm having trouble processing that. Could you please rephrase your response?",
                 "is_question": True,
@@ -996,20 +1968,10 @@ Fill in the template with the user's actual answers. Keep it concise and profess
         """Generate a concise, natural transition message between questions."""
         try:
             # Simple, direct transitions without AI generation for consistency
-            transition_templates = [
-                f"Perfect! {next_question}",
-                f"Great! Now, {next_question}",
-                f"Excellent! {next_question}",
-                f"Got it! {next_question}",
-                f"Thanks! {next_question}"
-            ]
-            
-            # Use a simple template instead of AI generation for consistency
-            import random
-            return random.choice(transition_templates)
+            return random.choice(_TRANSITION_OPENERS) + next_question
             
         except Exception as e:
-            logger.error(f"Error generating natural transition: {e}")
+            logger.error("Error generating natural transition: %s", e)
             return f"Great! {next_question}"
 
     async def _generate_clarification_message(
@@ -1017,10 +1979,17 @@ Fill in the template with the user's actual answers. Keep it concise and profess
         module_id: str, 
         current_question: int, 
         user_message: str, 
-        validation_error: str
+        validation_error: str,
+        code: Optional[str] = None,
+        question: str = ""
     ) -> str:
         """Generate a concise clarification message when validation fails."""
         try:
+            # Known validation failures get a fixed reply that restates the question
+            template = self._CLARIFICATION_TEMPLATES.get(code)
+            if template:
+                return template.format(message=validation_error, question=question).strip()
+            
             # Simple, direct clarification messages
             clarification_templates = [
                 f"Could you please {validation_error}?",
@@ -1029,11 +1998,10 @@ Fill in the template with the user's actual answers. Keep it concise and profess
                 f"I need a bit more detail. Could you {validation_error}?"
             ]
             
-            import random
             return random.choice(clarification_templates)
             
         except Exception as e:
-            logger.error(f"Error generating clarification message: {e}")
+            logger.error("Error generating clarification message: %s", e)
             return f"Could you please {validation_error}?"
 
 
@@ -3,29 +3,152 @@ Conversation Service for Advanced AI Chatbot
 Implements memory management, context awareness, and natural language processing
 """
 
+import asyncio
 import logging
 import json
+import math
 import re
-from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timezone
+from collections import ChainMap, OrderedDict, deque
+from functools import lru_cache
+from itertools import takewhile
+from typing import Callable, Dict, List, Optional, Any, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import JSON, select, update, and_, cast, func, literal
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.orm import selectinload
 
 from models import ConversationMemory, CrossModuleMemory, ConversationMessage, GPTModeSession
 from services.ai_service_manager import AIServiceManager
 from services.rag_service import RAGService
 
+# Optional import - Aho-Corasick keyword scan for intent detection
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Intent patterns are "\b(kw1|kw2|...)\b" keyword alternations
+_KEYWORD_GROUP_RE = re.compile(r"^\\b\((.*)\)\\b$")
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _norm(vector: List[float]) -> float:
+    return math.sqrt(math.fsum(x * x for x in vector)) or 1.0
+
+
+def _cosine(a: List[float], a_norm: float, b: List[float], b_norm: float) -> float:
+    return math.fsum(x * y for x, y in zip(a, b)) / (a_norm * b_norm)
+
+
+class _PromptFields(dict):
+    """Prompt template fields; dict/list values are JSON-encoded on first use and kept encoded."""
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, sort_keys=True, default=str)
+            self[key] = value
+        return value
+
+
+# Prompt templates, filled with str.format_map; static instructions come first for prompt caching
+_CONTEXT_SUMMARY_PROMPT = (
+    "Update the running summary of this conversation with the new messages. Keep it concise and "
+    "cover the key points, user preferences, and important information that should be remembered for future context.\n"
+    "\n"
+    "Previous summary:\n"
+    "{previous_summary}\n"
+    "\n"
+    "New messages:\n"
+    "{messages_text}\n"
+    "\n"
+    "Updated summary:"
+)
+_WELCOME_PROMPT = (
+    "You are a helpful business consultant. Generate a warm, personalized welcome message "
+    "for starting a conversation. Make it conversational and encouraging. Then ask the first question naturally.\n"
+    "\n"
+    "Context from previous modules: {business_context}\n"
+    "User preferences: {user_preferences}\n"
+    "\n"
+    "Topic of this conversation: {module_id}"
+)
+_QUESTION_PROMPT = (
+    "You are a helpful business consultant. Provide a helpful, contextual answer to the user's question.\n"
+    "If the question is about the current process, guide them back to the current question naturally.\n"
+    "\n"
+    "Business context: {business_context}\n"
+    "Conversation context: {context}\n"
+    "\n"
+    'The user is asking: "{user_message}"'
+)
+_VALIDATION_PROMPT = (
+    "Determine if the user's response is a valid answer to the question. Consider:\n"
+    "1. Does it address the question?\n"
+    "2. Is it relevant and meaningful?\n"
+    "3. Does it provide useful information?\n"
+    "\n"
+    'Respond with "VALID" or "INVALID" and a brief explanation.\n'
+    "\n"
+    'Current question: "{question}"\n'
+    'User\'s response: "{user_message}"'
+)
+_TRANSITION_PROMPT = (
+    "Create a natural, conversational transition to the next question.\n"
+    "Acknowledge their answer briefly and smoothly introduce the next question.\n"
+    "\n"
+    'Next question: "{question}"\n'
+    'The user just answered: "{user_message}"'
+)
+_CLARIFICATION_PROMPT = (
+    "The user's response doesn't seem to fully answer the question.\n"
+    "Create a friendly, helpful clarification request that:\n"
+    "1. Acknowledges their response\n"
+    "2. Explains what kind of information is needed\n"
+    "3. Encourages them to provide more details\n"
+    "\n"
+    'Question: "{question}"\n'
+    'User\'s response: "{user_message}"'
+)
+_COMPLETION_PROMPT = (
+    "Create a detailed, professional summary of the conversation that captures all key points discussed.\n"
+    "\n"
+    "Business context: {business_context}\n"
+    "Conversation context: {context}\n"
+    "\n"
+    "Topic of this conversation: {module_id}"
+)
+
 
 class ConversationService:
     """Advanced conversation service with memory management and context awareness."""
     
-    def __init__(self):
+    _INTENT_CACHE_SIZE = 4096
+    # Messages folded into the running context summary per update
+    _SUMMARY_WINDOW = 5
+    # Each natural-language turn stores the user message and the assistant reply
+    _MESSAGES_PER_TURN = 2
+    # Semantic response cache: scopes kept, entries per scope, and minimum cosine similarity
+    _SEMANTIC_CACHE_SCOPES = 256
+    _SEMANTIC_CACHE_ENTRIES = 32
+    _SEMANTIC_CACHE_THRESHOLD = 0.9
+    # Embedded texts kept, so repeated short replies ("hi", "skip", "yes") are embedded once
+    _EMBEDDING_CACHE_SIZE = 2048
+    
+    def __init__(self, questions_loader: Optional[Callable[[str], Sequence[str]]] = None):
         self.ai_service = AIServiceManager()
         self.rag_service = RAGService()
         
+        # module_id -> questions, resolved once per module through questions_loader
+        self._questions_loader = questions_loader
+        self._module_questions: Dict[str, Tuple[str, ...]] = {}
+        
         # Intent patterns for natural language understanding
         self.intent_patterns = {
             "greeting": [
@@ -53,6 +176,124 @@ class ConversationService:
                 r"\b(don't know|not sure|no idea)\b"
             ]
         }
+        # (intent, compiled pattern) in scoring order; ties keep the earlier pattern
+        self._intent_regexes = [
+            (intent, re.compile(pattern))
+            for intent, patterns in self.intent_patterns.items()
+            for pattern in patterns
+        ]
+        self._keyword_automaton = self._build_keyword_automaton() if AHOCORASICK_AVAILABLE else None
+        # Short replies ("hi", "skip", "next") repeat a lot, so memoize per message text
+        self._detect_intent = lru_cache(maxsize=self._INTENT_CACHE_SIZE)(self._scan_intent)
+        self._semantic_cache: OrderedDict = OrderedDict()
+        # text -> (embedding, norm), least recently used first
+        self._embedding_cache: "OrderedDict[str, Tuple[List[float], float]]" = OrderedDict()
+    
+    def _build_keyword_automaton(self):
+        """Build an Aho-Corasick automaton mapping every keyword to its (pattern, alternative) slots."""
+        keyword_slots: Dict[str, List[Tuple[int, int]]] = {}
+        for pattern_index, (_, regex) in enumerate(self._intent_regexes):
+            keywords = _KEYWORD_GROUP_RE.match(regex.pattern).group(1).split("|")
+            for alternative, keyword in enumerate(keywords):
+                keyword_slots.setdefault(keyword, []).append((pattern_index, alternative))
+        
+        automaton = ahocorasick.Automaton()
+        for keyword, slots in keyword_slots.items():
+            automaton.add_word(keyword, (tuple(slots), len(keyword)))
+        automaton.make_automaton()
+        return automaton
+    
+    async def _embed(self, text: str) -> Tuple[List[float], float]:
+        """Embed text (with its norm), reusing embeddings of recently seen texts."""
+        key = text.strip()
+        cached = self._embedding_cache.get(key)
+        if cached is not None:
+            self._embedding_cache.move_to_end(key)
+            return cached
+        
+        vector = await self.ai_service.create_embedding(key)
+        cached = self._embedding_cache[key] = (vector, _norm(vector))
+        if len(self._embedding_cache) > self._EMBEDDING_CACHE_SIZE:
+            self._embedding_cache.popitem(last=False)
+        return cached
+    
+    async def _cached_generate(
+        self,
+        prompt: str,
+        *,
+        scope: tuple,
+        query: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """Generate content, reusing an earlier response from the same scope.
+        
+        Prompts built from the same template and context share a scope. With a query, a
+        response is reused when the query's embedding is close enough to a cached one;
+        without one, the scope must match exactly.
+        """
+        scope_key = (scope, tuple(sorted(kwargs.items())))
+        entries = self._semantic_cache.get(scope_key)
+        if entries is not None:
+            self._semantic_cache.move_to_end(scope_key)
+        
+        vector = None
+        vector_norm = 1.0
+        if query is None:
+            if entries:
+                return entries[-1][2]
+        else:
+            try:
+                vector, vector_norm = await self._embed(query)
+            except Exception as e:
+                logger.warning("Semantic cache lookup skipped: %s", e)
+            if vector is not None and entries:
+                for cached_vector, cached_norm, response in entries:
+                    if _cosine(vector, vector_norm, cached_vector, cached_norm) >= self._SEMANTIC_CACHE_THRESHOLD:
+                        return response
+        
+        response = await self.ai_service.generate_content(prompt=prompt, **kwargs)
+        
+        if query is None or vector is not None:
+            if entries is None:
+                entries = self._semantic_cache[scope_key] = deque(maxlen=self._SEMANTIC_CACHE_ENTRIES)
+                if len(self._semantic_cache) > self._SEMANTIC_CACHE_SCOPES:
+                    self._semantic_cache.popitem(last=False)
+            entries.append((vector, vector_norm, response))
+        return response
+    
+    async def _get_or_insert(
+        self,
+        db: AsyncSession,
+        model,
+        lookup,
+        values: dict,
+        conflict_columns: List[str]
+    ):
+        """Return the row matching lookup, inserting values when there is none.
+        
+        The insert is ON CONFLICT DO NOTHING ... RETURNING, so a concurrent request that
+        created the row first turns it into a no-op and the winner's row is selected instead.
+        """
+        query = select(model).where(lookup)
+        result = await db.execute(query)
+        existing = result.scalar_one_or_none()
+        
+        if existing:
+            return existing
+        
+        result = await db.execute(
+            pg_insert(model)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=conflict_columns)
+            .returning(model)
+        )
+        created = result.scalar_one_or_none()
+        await db.commit()
+        
+        if created is None:
+            result = await db.execute(query)
+            created = result.scalar_one()
+        return created
     
     async def create_conversation_memory(
         self, 
@@ -64,45 +305,33 @@ class ConversationService:
     ) -> ConversationMemory:
         """Create a new conversation memory for a session."""
         try:
-            # Check if memory already exists for this user
-            result = await db.execute(
-                select(ConversationMemory).where(
-                    and_(
-                        ConversationMemory.project_id == project_id,
-                        ConversationMemory.session_id == session_id,
-                        ConversationMemory.module_id == module_id,
-                        ConversationMemory.user_id == user_id  # Add user filter
-                    )
-                )
+            return await self._get_or_insert(
+                db,
+                ConversationMemory,
+                and_(
+                    ConversationMemory.project_id == project_id,
+                    ConversationMemory.session_id == session_id,
+                    ConversationMemory.module_id == module_id,
+                    ConversationMemory.user_id == user_id  # Add user filter
+                ),
+                {
+                    "project_id": project_id,
+                    "session_id": session_id,
+                    "module_id": module_id,
+                    "user_id": user_id,
+                    "conversation_history": [],
+                    "context_summary": "",
+                    "user_profile": {},
+                    "conversation_state": {
+                        "current_question": 0,
+                        "questions_answered": 0,
+                        "total_questions": 0,
+                        "conversation_flow": "welcome",
+                        "last_intent": None
+                    }
+                },
+                ["project_id", "session_id", "module_id", "user_id"]
             )
-            existing_memory = result.scalar_one_or_none()
-            
-            if existing_memory:
-                return existing_memory
-            
-            # Create new memory
-            memory = ConversationMemory(
-                project_id=project_id,
-                session_id=session_id,
-                module_id=module_id,
-                user_id=user_id,  # Add user_id
-                conversation_history=[],
-                context_summary="",
-                user_profile={},
-                conversation_state={
-                    "current_question": 0,
-                    "questions_answered": 0,
-                    "total_questions": 0,
-                    "conversation_flow": "welcome",
-                    "last_intent": None
-                }
-            )
-            
-            db.add(memory)
-            await db.commit()
-            await db.refresh(memory)
-            
-            return memory
             
         except Exception as e:
             logger.error(f"Error creating conversation memory: {e}")
@@ -117,39 +346,27 @@ class ConversationService:
     ) -> CrossModuleMemory:
         """Get or create cross-module memory for a project."""
         try:
-            # Check if cross-module memory exists for this user
-            result = await db.execute(
-                select(CrossModuleMemory).where(
-                    and_(
-                        CrossModuleMemory.project_id == project_id,
-                        CrossModuleMemory.user_id == user_id  # Add user filter
-                    )
-                )
-            )
-            existing_memory = result.scalar_one_or_none()
-            
-            if existing_memory:
-                return existing_memory
-            
-            # Create new cross-module memory
-            memory = CrossModuleMemory(
-                project_id=project_id,
-                user_id=user_id,  # Add user_id
-                business_context={},
-                user_preferences={},
-                project_goals={},
-                key_insights=[],
-                completed_modules=[],
-                module_outputs={},
-                context_embeddings=[]
+            return await self._get_or_insert(
+                db,
+                CrossModuleMemory,
+                and_(
+                    CrossModuleMemory.project_id == project_id,
+                    CrossModuleMemory.user_id == user_id  # Add user filter
+                ),
+                {
+                    "project_id": project_id,
+                    "user_id": user_id,
+                    "business_context": {},
+                    "user_preferences": {},
+                    "project_goals": {},
+                    "key_insights": [],
+                    "completed_modules": [],
+                    "module_outputs": {},
+                    "context_embeddings": []
+                },
+                ["project_id", "user_id"]
             )
             
-            db.add(memory)
-            await db.commit()
-            await db.refresh(memory)
-            
-            return memory
-            
         except Exception as e:
             logger.error(f"Error getting or creating cross-module memory: {e}")
             await db.rollback()
@@ -162,9 +379,10 @@ class ConversationService:
         role: str, 
         content: str, 
         message_type: str = "text",
-        context_data: dict = None
+        context_data: dict = None,
+        commit: bool = True
     ) -> ConversationMessage:
-        """Add a message to conversation memory."""
+        """Add a message to conversation memory. With commit=False the caller commits."""
         try:
             # Detect intent
             intent, confidence = self._detect_intent(content)
@@ -184,8 +402,9 @@ class ConversationService:
             )
             
             db.add(message)
-            await db.commit()
-            await db.refresh(message)
+            if commit:
+                await db.commit()
+                await db.refresh(message)
             
             return message
             
@@ -194,23 +413,97 @@ class ConversationService:
             await db.rollback()
             raise
     
-    def _detect_intent(self, text: str) -> Tuple[str, float]:
-        """Detect the intent of a user message."""
+    async def _increment_message_count(
+        self,
+        db: AsyncSession,
+        memory_id: str,
+        count: int = 1
+    ) -> int:
+        """Atomically bump a memory's stored message count and return the new total."""
+        result = await db.execute(
+            update(ConversationMemory)
+            .where(ConversationMemory.id == memory_id)
+            .values(message_count=ConversationMemory.message_count + count)
+            .returning(ConversationMemory.message_count)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one()
+    
+    def _scan_intent(self, text: str) -> Tuple[str, float]:
+        """Detect the intent of a user message (uncached; use _detect_intent).
+        
+        Confidence is the best single pattern's hit count over the word count.
+        """
         text_lower = text.lower()
+        if self._keyword_automaton is not None:
+            pattern_counts = self._count_keyword_matches(text_lower)
+        else:
+            pattern_counts = [len(regex.findall(text_lower)) for _, regex in self._intent_regexes]
+        
         max_confidence = 0.0
         detected_intent = "general"
-        
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, text_lower)
-                if matches:
-                    confidence = len(matches) / len(text_lower.split())
-                    if confidence > max_confidence:
-                        max_confidence = confidence
-                        detected_intent = intent
+        best_hits = max(pattern_counts, default=0)
+        if best_hits:
+            word_count = len(text_lower.split())
+            for (intent, _), hits in zip(self._intent_regexes, pattern_counts):
+                if hits == best_hits:
+                    max_confidence = hits / word_count
+                    detected_intent = intent
+                    break
         
         return detected_intent, max_confidence
     
+    def _count_keyword_matches(self, text_lower: str) -> List[int]:
+        """Per-pattern hit counts in one Aho-Corasick pass, equal to re.findall on each pattern.
+        
+        findall takes the leftmost match, preferring earlier alternatives at the same start,
+        then resumes after it; whole-word hits are replayed per pattern in that order.
+        """
+        last = len(text_lower) - 1
+        candidates: List[List[Tuple[int, int, int]]] = [[] for _ in self._intent_regexes]
+        for end, (slots, length) in self._keyword_automaton.iter(text_lower):
+            start = end - length + 1
+            if start > 0 and _is_word_char(text_lower[start - 1]):
+                continue
+            if end < last and _is_word_char(text_lower[end + 1]):
+                continue
+            for pattern_index, alternative in slots:
+                candidates[pattern_index].append((start, alternative, end))
+        
+        counts = []
+        for matches in candidates:
+            hits = 0
+            resume = 0
+            for start, _, end in sorted(matches):
+                if start >= resume:
+                    hits += 1
+                    resume = end + 1
+            counts.append(hits)
+        return counts
+    
+    async def _load_memory_with_messages(
+        self,
+        db: AsyncSession,
+        memory_id: str,
+        max_messages: int
+    ) -> Tuple[Optional[ConversationMemory], List[ConversationMessage]]:
+        """Fetch a memory and its most recent messages (newest first) in one round-trip."""
+        result = await db.execute(
+            select(ConversationMemory, ConversationMessage)
+            .outerjoin(
+                ConversationMessage,
+                ConversationMessage.conversation_memory_id == ConversationMemory.id
+            )
+            .where(ConversationMemory.id == memory_id)
+            .order_by(ConversationMessage.created_at.desc())
+            .limit(max_messages)
+        )
+        rows = result.all()
+        
+        if not rows:
+            return None, []
+        return rows[0][0], [message for _, message in rows if message is not None]
+    
     async def get_conversation_context(
         self, 
         db: AsyncSession, 
@@ -219,39 +512,49 @@ class ConversationService:
     ) -> Dict[str, Any]:
         """Get conversation context for AI processing."""
         try:
-            # Get recent messages
+            # Only the columns used below, memory fields repeated on each recent message row
             result = await db.execute(
-                select(ConversationMessage)
-                .where(ConversationMessage.conversation_memory_id == memory_id)
+                select(
+                    ConversationMemory.context_summary,
+                    ConversationMemory.conversation_state,
+                    ConversationMemory.user_profile,
+                    ConversationMessage.role,
+                    ConversationMessage.content,
+                    ConversationMessage.intent,
+                    ConversationMessage.created_at
+                )
+                .select_from(ConversationMemory)
+                .outerjoin(
+                    ConversationMessage,
+                    ConversationMessage.conversation_memory_id == ConversationMemory.id
+                )
+                .where(ConversationMemory.id == memory_id)
                 .order_by(ConversationMessage.created_at.desc())
                 .limit(max_messages)
             )
-            messages = result.scalars().all()
+            rows = result.all()
             
-            # Get memory object
-            result = await db.execute(
-                select(ConversationMemory).where(ConversationMemory.id == memory_id)
-            )
-            memory = result.scalar_one_or_none()
-            
-            if not memory:
+            if not rows:
                 return {"messages": [], "context": "", "state": {}}
             
             # Format messages for AI context
-            formatted_messages = []
-            for msg in reversed(messages):  # Reverse to get chronological order
-                formatted_messages.append({
-                    "role": msg.role,
-                    "content": msg.content,
-                    "intent": msg.intent,
-                    "timestamp": msg.created_at.isoformat()
-                })
+            formatted_messages = [
+                {
+                    "role": row.role,
+                    "content": row.content,
+                    "intent": row.intent,
+                    "timestamp": row.created_at.isoformat()
+                }
+                for row in reversed(rows)  # Reverse to get chronological order
+                if row.role is not None
+            ]
             
+            memory_row = rows[0]
             return {
                 "messages": formatted_messages,
-                "context": memory.context_summary,
-                "state": memory.conversation_state,
-                "user_profile": memory.user_profile
+                "context": memory_row.context_summary,
+                "state": memory_row.conversation_state,
+                "user_profile": memory_row.user_profile
             }
             
         except Exception as e:
@@ -262,67 +565,78 @@ class ConversationService:
         self, 
         db: AsyncSession, 
         memory_id: str, 
-        state_updates: dict
+        state_updates: dict,
+        commit: bool = True
     ):
-        """Update conversation state."""
+        """Merge state_updates into the stored conversation state server-side, without loading it.
+        
+        With commit=False the caller commits, and errors are re-raised instead of swallowed.
+        """
         try:
-            result = await db.execute(
-                select(ConversationMemory).where(ConversationMemory.id == memory_id)
+            current_state = func.coalesce(
+                cast(ConversationMemory.conversation_state, JSONB), literal({}, JSONB)
             )
-            memory = result.scalar_one_or_none()
-            
-            if memory:
-                memory.conversation_state.update(state_updates)
-                memory.last_updated = datetime.now(timezone.utc)
+            merged_state = current_state.op("||")(literal(state_updates, JSONB))
+            await db.execute(
+                update(ConversationMemory)
+                .where(ConversationMemory.id == memory_id)
+                .values(conversation_state=cast(merged_state, JSON))
+                .execution_options(synchronize_session=False)
+            )
+            if commit:
                 await db.commit()
                 
         except Exception as e:
             logger.error(f"Error updating conversation state: {e}")
             await db.rollback()
+            if not commit:
+                raise
     
     async def generate_context_summary(
         self, 
         db: AsyncSession, 
-        memory_id: str
+        memory_id: str,
+        commit: bool = True
     ) -> str:
         """Generate a summary of conversation context for memory management."""
         try:
-            context = await self.get_conversation_context(db, memory_id, max_messages=20)
+            # The summary is rolled forward: previous summary plus the messages since it was made.
+            # Turns add two messages, so one more than the window may have arrived since then.
+            memory, messages = await self._load_memory_with_messages(
+                db, memory_id, self._SUMMARY_WINDOW + 1
+            )
             
-            if not context["messages"]:
+            if not memory:
                 return ""
             
+            new_messages = list(takewhile(
+                lambda msg: msg.id != memory.last_summarized_message_id, messages
+            ))
+            if not new_messages:
+                return memory.context_summary
+            
             # Create summary prompt
             messages_text = "\n".join([
-                f"{msg['role']}: {msg['content']}" 
-                for msg in context["messages"][-10:]  # Last 10 messages
+                f"{msg.role}: {msg.content}" 
+                for msg in reversed(new_messages)
             ])
             
-            summary_prompt = f"""
-            Based on the following conversation, create a concise summary of the key points, 
-            user preferences, and important information that should be remembered for future context.
-            
-            Conversation:
-            {messages_text}
-            
-            Summary:
-            """
+            summary_prompt = _CONTEXT_SUMMARY_PROMPT.format_map({
+                "previous_summary": memory.context_summary or "(none yet)",
+                "messages_text": messages_text
+            })
             
             summary = await self.ai_service.generate_content(
                 prompt=summary_prompt,
                 temperature=0.3,
-                max_tokens=200
+                max_tokens=200,
+                cache_key="conversation-summary"
             )
             
             # Update memory with new summary
-            result = await db.execute(
-                select(ConversationMemory).where(ConversationMemory.id == memory_id)
-            )
-            memory = result.scalar_one_or_none()
-            
-            if memory:
-                memory.context_summary = summary
-                memory.last_updated = datetime.now(timezone.utc)
+            memory.context_summary = summary
+            memory.last_summarized_message_id = new_messages[0].id
+            if commit:
                 await db.commit()
             
             return summary
@@ -338,10 +652,10 @@ class ConversationService:
         session_id: str, 
         module_id: str, 
         user_id: str, # Add user_id parameter
-        user_message: str,
-        module_questions: List[str]
+        user_message: str
     ) -> Dict[str, Any]:
         """Process a natural language message with full context awareness."""
+        module_questions = self._get_module_questions(module_id)
         try:
             # Get or create conversation memory
             memory = await self.create_conversation_memory(db, project_id, session_id, module_id, user_id)
@@ -349,16 +663,22 @@ class ConversationService:
             # Get cross-module memory
             cross_memory = await self.get_or_create_cross_module_memory(db, project_id, user_id)
             
-            # Add user message to memory
-            await self.add_message_to_memory(
-                db, memory.id, "user", user_message, "text"
+            # Add user message to memory (intent is detected while storing it)
+            # The whole turn is written in one transaction, committed at the end
+            user_entry = await self.add_message_to_memory(
+                db, memory.id, "user", user_message, "text", commit=False
             )
+            intent = user_entry.intent
+            # Sessions don't autoflush; the context read below must see this message
+            await db.flush()
             
             # Get conversation context
-            context = await self.get_conversation_context(db, memory.id)
-            
-            # Detect intent
-            intent, confidence = self._detect_intent(user_message)
+            # Also the prompt fields for this turn; cross-module dicts are JSON-encoded once, on first use
+            context = _PromptFields(await self.get_conversation_context(db, memory.id))
+            context["business_context"] = cross_memory.business_context
+            context["user_preferences"] = cross_memory.user_preferences
+            context["module_id"] = module_id
+            context["cache_key"] = f"{project_id}:{module_id}"
             
             # Update conversation state
             current_state = memory.conversation_state
@@ -385,25 +705,32 @@ class ConversationService:
             
             # Add assistant response to memory
             await self.add_message_to_memory(
-                db, memory.id, "assistant", response["message"], "response"
+                db, memory.id, "assistant", response["message"], "response", commit=False
             )
+            # Flush so the summary below covers (and watermarks) this turn's messages
+            await db.flush()
             
             # Update conversation state
             await self.update_conversation_state(db, memory.id, {
                 "current_question": response.get("current_question", current_question),
                 "last_intent": intent,
                 "conversation_flow": response.get("flow", "normal")
-            })
+            }, commit=False)
             
-            # Generate context summary if needed (every 5 messages)
-            message_count = len(context["messages"])
-            if message_count % 5 == 0:
-                await self.generate_context_summary(db, memory.id)
+            # Generate context summary if this turn crossed a multiple of the summary window
+            message_count = await self._increment_message_count(
+                db, memory.id, self._MESSAGES_PER_TURN
+            )
+            previous_count = message_count - self._MESSAGES_PER_TURN
+            if message_count // self._SUMMARY_WINDOW != previous_count // self._SUMMARY_WINDOW:
+                await self.generate_context_summary(db, memory.id, commit=False)
             
+            await db.commit()
             return response
             
         except Exception as e:
             logger.error(f"Error processing natural message: {e}")
+            await db.rollback()
             return {
                 "message": "I'm having trouble processing that. Could you please rephrase?",
                 "is_question": True,
@@ -415,25 +742,19 @@ class ConversationService:
         self, 
         db: AsyncSession, 
         memory: ConversationMemory, 
-        module_questions: List[str], 
+        module_questions: Sequence[str], 
         context: dict, 
         cross_memory: CrossModuleMemory
     ) -> Dict[str, Any]:
         """Handle greeting and start conversation."""
         # Generate personalized welcome message
-        welcome_prompt = f"""
-        You are a helpful business consultant. Generate a warm, personalized welcome message 
-        for starting a conversation about {memory.module_id}.
-        
-        Context from previous modules: {cross_memory.business_context}
-        User preferences: {cross_memory.user_preferences}
-        
-        Make it conversational and encouraging. Then ask the first question naturally.
-        """
+        welcome_prompt = _WELCOME_PROMPT.format_map(context)
         
-        welcome_message = await self.ai_service.generate_content(
-            prompt=welcome_prompt,
-            temperature=0.7
+        welcome_message = await self._cached_generate(
+            welcome_prompt,
+            scope=("greeting", welcome_prompt),
+            temperature=0.7,
+            cache_key=context["cache_key"]
         )
         
         first_question = module_questions[0] if module_questions else ""
@@ -455,19 +776,14 @@ class ConversationService:
     ) -> Dict[str, Any]:
         """Handle when user asks a question."""
         # Generate contextual answer
-        answer_prompt = f"""
-        You are a helpful business consultant. The user is asking: "{user_message}"
+        answer_prompt = _QUESTION_PROMPT.format_map(ChainMap({"user_message": user_message}, context))
         
-        Conversation context: {context['context']}
-        Business context: {cross_memory.business_context}
-        
-        Provide a helpful, contextual answer. If the question is about the current process,
-        guide them back to the current question naturally.
-        """
-        
-        answer = await self.ai_service.generate_content(
-            prompt=answer_prompt,
-            temperature=0.7
+        answer = await self._cached_generate(
+            answer_prompt,
+            scope=("question", context['business_context'], context['context']),
+            query=user_message,
+            temperature=0.7,
+            cache_key=context["cache_key"]
         )
         
         # Get current question
@@ -508,7 +824,7 @@ class ConversationService:
         self, 
         db: AsyncSession, 
         memory: ConversationMemory, 
-        module_questions: List[str], 
+        module_questions: Sequence[str], 
         context: dict
     ) -> Dict[str, Any]:
         """Handle skip requests."""
@@ -536,7 +852,7 @@ class ConversationService:
         db: AsyncSession, 
         memory: ConversationMemory, 
         user_message: str, 
-        module_questions: List[str], 
+        module_questions: Sequence[str], 
         context: dict, 
         cross_memory: CrossModuleMemory
     ) -> Dict[str, Any]:
@@ -549,46 +865,49 @@ class ConversationService:
             return await self._generate_completion_summary(db, memory, context, cross_memory)
         
         # Validate answer using AI
-        validation_prompt = f"""
-        Current question: "{module_questions[current_question]}"
-        User's response: "{user_message}"
+        validation_prompt = _VALIDATION_PROMPT.format_map({
+            "question": module_questions[current_question],
+            "user_message": user_message
+        })
         
-        Determine if this is a valid answer to the question. Consider:
-        1. Does it address the question?
-        2. Is it relevant and meaningful?
-        3. Does it provide useful information?
+        validation_task = asyncio.create_task(self.ai_service.generate_content(
+            prompt=validation_prompt,
+            temperature=0.3,
+            cache_key=context["cache_key"]
+        ))
         
-        Respond with "VALID" or "INVALID" and a brief explanation.
-        """
+        next_question_idx = current_question + 1
+        transition_task = None
+        if next_question_idx < len(module_questions):
+            # Draft the transition while the answer is validated; dropped if it turns out invalid
+            transition_prompt = _TRANSITION_PROMPT.format_map({
+                "question": module_questions[next_question_idx],
+                "user_message": user_message
+            })
+            
+            transition_task = asyncio.create_task(self.ai_service.generate_content(
+                prompt=transition_prompt,
+                temperature=0.7,
+                cache_key=context["cache_key"]
+            ))
         
-        validation_result = await self.ai_service.generate_content(
-            prompt=validation_prompt,
-            temperature=0.3
-        )
+        try:
+            validation_result = (await validation_task).upper()
+        except Exception:
+            if transition_task:
+                transition_task.cancel()
+            raise
         
-        is_valid = "VALID" in validation_result.upper()
+        # "VALID" is also a substring of "INVALID"
+        is_valid = "VALID" in validation_result and "INVALID" not in validation_result
         
         if is_valid:
             # Valid answer, move to next question
-            next_question_idx = current_question + 1
-            
-            if next_question_idx >= len(module_questions):
+            if transition_task is None:
                 # Last question answered
                 return await self._generate_completion_summary(db, memory, context, cross_memory)
             else:
-                # Generate natural transition
-                transition_prompt = f"""
-                The user just answered: "{user_message}"
-                Next question: "{module_questions[next_question_idx]}"
-                
-                Create a natural, conversational transition to the next question.
-                Acknowledge their answer briefly and smoothly introduce the next question.
-                """
-                
-                transition = await self.ai_service.generate_content(
-                    prompt=transition_prompt,
-                    temperature=0.7
-                )
+                transition = await transition_task
                 
                 return {
                     "message": transition,
@@ -597,19 +916,19 @@ class ConversationService:
                     "flow": "transition"
                 }
         else:
-            # Invalid answer, ask for clarification
-            clarification_prompt = f"""
-            The user's response "{user_message}" doesn't seem to fully answer the question: "{module_questions[current_question]}"
+            if transition_task:
+                transition_task.cancel()
             
-            Create a friendly, helpful clarification request that:
-            1. Acknowledges their response
-            2. Explains what kind of information is needed
-            3. Encourages them to provide more details
-            """
+            # Invalid answer, ask for clarification
+            clarification_prompt = _CLARIFICATION_PROMPT.format_map({
+                "question": module_questions[current_question],
+                "user_message": user_message
+            })
             
             clarification = await self.ai_service.generate_content(
                 prompt=clarification_prompt,
-                temperature=0.7
+                temperature=0.7,
+                cache_key=context["cache_key"]
             )
             
             return {
@@ -627,18 +946,13 @@ class ConversationService:
         cross_memory: CrossModuleMemory
     ) -> Dict[str, Any]:
         """Generate completion summary."""
-        summary_prompt = f"""
-        Generate a comprehensive summary of the conversation for {memory.module_id}.
-        
-        Conversation context: {context['context']}
-        Business context: {cross_memory.business_context}
-        
-        Create a detailed, professional summary that captures all key points discussed.
-        """
+        summary_prompt = _COMPLETION_PROMPT.format_map(context)
         
-        summary = await self.ai_service.generate_content(
-            prompt=summary_prompt,
-            temperature=0.5
+        summary = await self._cached_generate(
+            summary_prompt,
+            scope=("completion", summary_prompt),
+            temperature=0.5,
+            cache_key=context["cache_key"]
         )
         
         return {
@@ -649,8 +963,15 @@ class ConversationService:
             "flow": "complete"
         }
     
-    def _get_module_questions(self, module_id: str) -> List[str]:
-        """Get questions for a module from the chatbot service."""
-        # This should be implemented to get questions from your module configuration
-        # For now, returning empty list - this will be passed from the chatbot service
-        return [] 
\ No newline at end of file
+    def _get_module_questions(self, module_id: str) -> Tuple[str, ...]:
+        """Get questions for a module, loading them once per module."""
+        questions = self._module_questions.get(module_id)
+        if questions is None:
+            questions = ()
+            if self._questions_loader is not None:
+                try:
+                    questions = tuple(self._questions_loader(module_id))
+                except Exception as e:
+                    logger.warning("No questions for module %s: %s", module_id, e)
+            self._module_questions[module_id] = questions
+        return questions
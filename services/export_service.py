@@ -2,29 +2,196 @@
 Export service for generating documents in various formats.
 """
 import os
-import json
+import io
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from functools import partial
+from typing import Dict, Any, Iterable, Iterator, Optional
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from xml.sax.saxutils import escape
+import docx
 from docx import Document
 from docx.shared import Inches
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 import logging
+import orjson
 
 from config import settings
+from models import ExportFormat
 
 logger = logging.getLogger(__name__)
 
+# PDF styles are plain configuration, built once per process
+_PDF_STYLES = getSampleStyleSheet()
+_PDF_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_PDF_STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    alignment=1  # Center alignment
+)
+_PDF_PHASE_TITLE_STYLE = ParagraphStyle(
+    'PhaseTitle',
+    parent=_PDF_STYLES['Heading2'],
+    fontSize=16,
+    spaceBefore=20,
+    spaceAfter=10
+)
+_PDF_NORMAL_STYLE = _PDF_STYLES['Normal']
+_PDF_ITALIC_STYLE = _PDF_STYLES['Italic']
+
+# PDF worker pool; see _pdf_pool and shutdown_pdf_pool
+_PDF_POOL: Optional[ProcessPoolExecutor] = None
+
+# Set once settings.upload_dir has been created in this process
+_UPLOAD_READY = False
+
+# Export files are written through a 1 MiB buffer instead of the default 8 KiB
+_WRITE_BUFFER = 1 << 20
+
+# python-docx's built-in template, read once so each export skips the open/stat of the package
+with open(os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx'), 'rb') as _template:
+    _DOCX_TEMPLATE_BYTES = _template.read()
+
+# File extension per export format
+_EXPORT_EXTENSIONS = {
+    ExportFormat.PDF: "pdf",
+    ExportFormat.WORD: "docx",
+    ExportFormat.JSON: "json",
+}
+
+# Compact orjson encoder for export pieces; default=str covers types orjson can't encode
+_dumps_json = partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS, default=str)
+
+
+def _pdf_text(text: Any) -> str:
+    """Escape user or AI text for a Paragraph so stray <, > or & can't break the markup."""
+    return escape(str(text)).replace("\n", "<br/>")
+
+
+def _pdf_phase_flowables(phase: Dict[str, Any]) -> Iterator[Flowable]:
+    """Yield the PDF flowables for one phase."""
+    normal = _PDF_NORMAL_STYLE
+    italic = _PDF_ITALIC_STYLE
+    
+    # Phase title
+    yield Paragraph(f"Phase {phase['phase_number']}: {_pdf_text(phase['title'])}", _PDF_PHASE_TITLE_STYLE)
+    
+    # Phase description
+    if phase.get('description'):
+        yield Paragraph(f"<i>{_pdf_text(phase['description'])}</i>", italic)
+        yield Spacer(1, 10)
+    
+    # User input
+    if phase.get('user_input'):
+        yield Paragraph("<b>Input:</b>", normal)
+        yield Paragraph(_pdf_text(phase['user_input']), normal)
+        yield Spacer(1, 10)
+    
+    # AI response
+    if phase.get('ai_response'):
+        yield Paragraph("<b>Response:</b>", normal)
+        yield Paragraph(_pdf_text(phase['ai_response']), normal)
+    else:
+        yield Paragraph("<i>Phase not completed</i>", italic)
+    
+    yield Spacer(1, 20)
+
+
+def _add_word_paragraph(body, section_properties, text: str, style_id: Optional[str] = None, italic: bool = False) -> None:
+    """Insert a w:p before the body's sectPr (or at the end), like Document.add_paragraph."""
+    paragraph = OxmlElement('w:p')
+    if style_id:
+        properties = OxmlElement('w:pPr')
+        style = OxmlElement('w:pStyle')
+        style.set(qn('w:val'), style_id)
+        properties.append(style)
+        paragraph.append(properties)
+    if text:
+        run = OxmlElement('w:r')
+        if italic:
+            run_properties = OxmlElement('w:rPr')
+            run_properties.append(OxmlElement('w:i'))
+            run.append(run_properties)
+        run.text = text  # Same \n -> <w:br/> and \t -> <w:tab/> handling as Run.text
+        paragraph.append(run)
+    
+    if section_properties is not None:
+        section_properties.addprevious(paragraph)
+    else:
+        body.append(paragraph)
+
+
+def _pdf_pool() -> Optional[ProcessPoolExecutor]:
+    """Worker processes for PDF layout, started on the first PDF export.
+    
+    Workers are spawned, not forked, so they don't inherit the server's event loop, sockets
+    and threads. Returns None inside daemonic processes (e.g. Celery prefork workers), which
+    may not start children.
+    """
+    global _PDF_POOL
+    if _PDF_POOL is None and not multiprocessing.current_process().daemon:
+        _PDF_POOL = ProcessPoolExecutor(
+            max_workers=settings.export_pdf_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _PDF_POOL
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF worker processes, if any were started (called on app shutdown)."""
+    global _PDF_POOL
+    pool, _PDF_POOL = _PDF_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
 
 class ExportService:
     """Service for exporting projects to various formats."""
     
     @staticmethod
     def ensure_upload_directory():
-        """Ensure upload directory exists."""
+        """Ensure upload directory exists (created at most once per process)."""
+        global _UPLOAD_READY
+        if _UPLOAD_READY:
+            return
         os.makedirs(settings.upload_dir, exist_ok=True)
+        _UPLOAD_READY = True
+    
+    @staticmethod
+    def _build_pdf(project_data: Dict[str, Any], file_path: str) -> None:
+        """Lay out and write the PDF (blocking; runs in the PDF worker pool)."""
+        story = []
+        styles = _PDF_STYLES
+        title_style = _PDF_TITLE_STYLE
+        
+        # Add title
+        story.append(Paragraph(_pdf_text(project_data['title']), title_style))
+        story.append(Spacer(1, 20))
+        
+        # Add description
+        if project_data.get('description'):
+            story.append(Paragraph(f"<b>Description:</b> {_pdf_text(project_data['description'])}", styles['Normal']))
+            story.append(Spacer(1, 20))
+        
+        # Add metadata
+        story.append(Paragraph(f"<b>Created:</b> {project_data['created_at']}", styles['Normal']))
+        story.append(Paragraph(f"<b>Owner:</b> {_pdf_text(project_data['owner']['full_name'])}", styles['Normal']))
+        story.append(Spacer(1, 30))
+        
+        # Add phases
+        for phase in project_data['phases']:
+            story.extend(_pdf_phase_flowables(phase))
+        
+        # Build PDF
+        with open(file_path, 'wb', buffering=_WRITE_BUFFER) as f:
+            SimpleDocTemplate(f, pagesize=letter).build(story)
     
     @staticmethod
     async def export_to_pdf(project_data: Dict[str, Any], file_path: str) -> str:
@@ -32,69 +199,13 @@ class ExportService:
         try:
             ExportService.ensure_upload_directory()
             
-            # Create PDF document
-            doc = SimpleDocTemplate(file_path, pagesize=letter)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=1  # Center alignment
-            )
-            
-            phase_title_style = ParagraphStyle(
-                'PhaseTitle',
-                parent=styles['Heading2'],
-                fontSize=16,
-                spaceBefore=20,
-                spaceAfter=10
-            )
-            
-            # Add title
-            story.append(Paragraph(project_data['title'], title_style))
-            story.append(Spacer(1, 20))
-            
-            # Add description
-            if project_data.get('description'):
-                story.append(Paragraph(f"<b>Description:</b> {project_data['description']}", styles['Normal']))
-                story.append(Spacer(1, 20))
-            
-            # Add metadata
-            story.append(Paragraph(f"<b>Created:</b> {project_data['created_at']}", styles['Normal']))
-            story.append(Paragraph(f"<b>Owner:</b> {project_data['owner']['full_name']}", styles['Normal']))
-            story.append(Spacer(1, 30))
-            
-            # Add phases
-            for phase in project_data['phases']:
-                # Phase title
-                story.append(Paragraph(f"Phase {phase['phase_number']}: {phase['title']}", phase_title_style))
-                
-                # Phase description
-                if phase.get('description'):
-                    story.append(Paragraph(f"<i>{phase['description']}</i>", styles['Italic']))
-                    story.append(Spacer(1, 10))
-                
-                # User input
-                if phase.get('user_input'):
-                    story.append(Paragraph("<b>Input:</b>", styles['Normal']))
-                    story.append(Paragraph(phase['user_input'], styles['Normal']))
-                    story.append(Spacer(1, 10))
-                
-                # AI response
-                if phase.get('ai_response'):
-                    story.append(Paragraph("<b>Response:</b>", styles['Normal']))
-                    story.append(Paragraph(phase['ai_response'], styles['Normal']))
-                else:
-                    story.append(Paragraph("<i>Phase not completed</i>", styles['Italic']))
-                
-                story.append(Spacer(1, 20))
-            
-            # Build PDF
-            doc.build(story)
+            # reportlab layout is pure Python and holds the GIL, so it gets its own process
+            pool = _pdf_pool()
+            if pool is None:
+                await asyncio.to_thread(ExportService._build_pdf, project_data, file_path)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(pool, ExportService._build_pdf, project_data, file_path)
             
             logger.info(f"PDF export completed: {file_path}")
             return file_path
@@ -104,55 +215,63 @@ class ExportService:
             raise Exception(f"Failed to export to PDF: {str(e)}")
     
     @staticmethod
-    async def export_to_word(project_data: Dict[str, Any], file_path: str) -> str:
-        """Export project to Word format."""
-        try:
-            ExportService.ensure_upload_directory()
+    def _build_word(project_data: Dict[str, Any], file_path: str) -> None:
+        """Build and save the Word document (blocking)."""
+        # Create Word document from the cached default template
+        doc = Document(io.BytesIO(_DOCX_TEMPLATE_BYTES))
+        
+        # Title
+        title = doc.add_heading(project_data['title'], 0)
+        from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+        title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        
+        # Description
+        if project_data.get('description'):
+            doc.add_paragraph(f"Description: {project_data['description']}")
+        
+        # Metadata
+        doc.add_paragraph(f"Created: {project_data['created_at']}")
+        doc.add_paragraph(f"Owner: {project_data['owner']['full_name']}")
+        doc.add_paragraph("")  # Empty line
+        
+        # Phases, inserted as raw OXML: add_paragraph rescans the body for sectPr on every call
+        body = doc.element.body
+        add = partial(_add_word_paragraph, body, body.sectPr)
+        heading_1 = doc.styles['Heading 1'].style_id
+        heading_2 = doc.styles['Heading 2'].style_id
+        for phase in project_data['phases']:
+            # Phase heading
+            add(f"Phase {phase['phase_number']}: {phase['title']}", heading_1)
             
-            # Create Word document
-            doc = Document()
+            # Phase description
+            if phase.get('description'):
+                add(phase['description'], italic=True)
             
-            # Title
-            title = doc.add_heading(project_data['title'], 0)
-            from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-            title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            # User input
+            if phase.get('user_input'):
+                add("Input:", heading_2)
+                add(phase['user_input'])
             
-            # Description
-            if project_data.get('description'):
-                doc.add_paragraph(f"Description: {project_data['description']}")
+            # AI response
+            if phase.get('ai_response'):
+                add("Response:", heading_2)
+                add(phase['ai_response'])
+            else:
+                add("Phase not completed", italic=True)
             
-            # Metadata
-            doc.add_paragraph(f"Created: {project_data['created_at']}")
-            doc.add_paragraph(f"Owner: {project_data['owner']['full_name']}")
-            doc.add_paragraph("")  # Empty line
-            
-            # Phases
-            for phase in project_data['phases']:
-                # Phase heading
-                doc.add_heading(f"Phase {phase['phase_number']}: {phase['title']}", 1)
-                
-                # Phase description
-                if phase.get('description'):
-                    p = doc.add_paragraph()
-                    p.add_run(phase['description']).italic = True
-                
-                # User input
-                if phase.get('user_input'):
-                    doc.add_paragraph("Input:", style='Heading 2')
-                    doc.add_paragraph(phase['user_input'])
-                
-                # AI response
-                if phase.get('ai_response'):
-                    doc.add_paragraph("Response:", style='Heading 2')
-                    doc.add_paragraph(phase['ai_response'])
-                else:
-                    p = doc.add_paragraph()
-                    p.add_run("Phase not completed").italic = True
-                
-                doc.add_paragraph("")  # Empty line
+            add("")  # Empty line
+        
+        # Save document
+        with open(file_path, 'wb', buffering=_WRITE_BUFFER) as f:
+            doc.save(f)
+    
+    @staticmethod
+    async def export_to_word(project_data: Dict[str, Any], file_path: str) -> str:
+        """Export project to Word format."""
+        try:
+            ExportService.ensure_upload_directory()
             
-            # Save document
-            doc.save(file_path)
+            await asyncio.to_thread(ExportService._build_word, project_data, file_path)
             
             logger.info(f"Word export completed: {file_path}")
             return file_path
@@ -161,25 +280,41 @@ class ExportService:
             logger.error(f"Word export error: {e}")
             raise Exception(f"Failed to export to Word: {str(e)}")
     
+    @staticmethod
+    def _write_json(project_data: Dict[str, Any], file_path: str) -> None:
+        """Serialize and write the JSON export (blocking).
+        
+        Phases are encoded and written one at a time, one per line, so memory for the
+        encoded output stays at a single phase however large the project is.
+        """
+        export_info = {
+            "exported_at": datetime.now().isoformat(),
+            "format": "json",
+            "version": "1.0"
+        }
+        project_fields = {key: value for key, value in project_data.items() if key != 'phases'}
+        project_head = _dumps_json(project_fields)[:-1]  # Left open for "phases"
+        
+        # Write JSON file (orjson emits UTF-8 bytes directly)
+        with open(file_path, 'wb', buffering=_WRITE_BUFFER) as f:
+            f.write(b'{"export_info":')
+            f.write(_dumps_json(export_info))
+            f.write(b',"project":')
+            f.write(project_head)
+            f.write(b',"phases":[\n' if project_fields else b'"phases":[\n')
+            for index, phase in enumerate(project_data.get('phases') or ()):
+                if index:
+                    f.write(b',\n')
+                f.write(_dumps_json(phase))
+            f.write(b'\n]}}\n')
+    
     @staticmethod
     async def export_to_json(project_data: Dict[str, Any], file_path: str) -> str:
         """Export project to JSON format."""
         try:
             ExportService.ensure_upload_directory()
             
-            # Prepare export data
-            export_data = {
-                "export_info": {
-                    "exported_at": datetime.now().isoformat(),
-                    "format": "json",
-                    "version": "1.0"
-                },
-                "project": project_data
-            }
-            
-            # Write JSON file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False, default=str)
+            await asyncio.to_thread(ExportService._write_json, project_data, file_path)
             
             logger.info(f"JSON export completed: {file_path}")
             return file_path
@@ -188,9 +323,28 @@ class ExportService:
             logger.error(f"JSON export error: {e}")
             raise Exception(f"Failed to export to JSON: {str(e)}")
     
+    @staticmethod
+    async def export_all(project_data: Dict[str, Any], export_id: str, formats: Iterable[str]) -> Dict[str, str]:
+        """Export project to several formats concurrently; returns the file path per format.
+        
+        Only the requested formats are built. PDF layout runs in the PDF worker pool and
+        Word/JSON in threads, so the formats overlap instead of running back to back.
+        """
+        exporters = {
+            ExportFormat.PDF: ExportService.export_to_pdf,
+            ExportFormat.WORD: ExportService.export_to_word,
+            ExportFormat.JSON: ExportService.export_to_json,
+        }
+        requested = [ExportFormat(fmt) for fmt in dict.fromkeys(formats)]
+        
+        paths = await asyncio.gather(*(
+            exporters[fmt](project_data, ExportService.get_export_file_path(export_id, _EXPORT_EXTENSIONS[fmt]))
+            for fmt in requested
+        ))
+        return {fmt.value: path for fmt, path in zip(requested, paths)}
+    
     @staticmethod
     def get_export_file_path(export_id: str, format: str) -> str:
         """Generate file path for export."""
-        ExportService.ensure_upload_directory()
         filename = f"export_{export_id}.{format}"
         return os.path.join(settings.upload_dir, filename)
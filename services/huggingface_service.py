@@ -2,25 +2,28 @@
 Hugging Face service for model inference and API integration.
 """
 import os
+import copy
+import asyncio
+import importlib.util
 import logging
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, NamedTuple, Tuple
 
 # Optional imports - handle missing dependencies gracefully
 try:
-    from huggingface_hub import InferenceClient
+    from huggingface_hub import AsyncInferenceClient
     HUGGINGFACE_HUB_AVAILABLE = True
 except ImportError:
     HUGGINGFACE_HUB_AVAILABLE = False
-    InferenceClient = None
+    AsyncInferenceClient = None
 
 try:
-    from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+    from transformers import AutoTokenizer, AutoModelForCausalLM
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
     AutoTokenizer = None
     AutoModelForCausalLM = None
-    pipeline = None
 
 try:
     import torch
@@ -33,6 +36,22 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Local generate_text calls arriving within this window share one model.generate batch
+_BATCH_WINDOW_SECONDS = 0.005
+_MAX_BATCH_SIZE = 16
+
+# Attention KV caches kept for recently used system prompts (each holds a full prefill)
+_PREFIX_CACHE_SIZE = 8
+
+
+class _LocalRequest(NamedTuple):
+    """A local generate_text call waiting for the batcher."""
+    prompt: str
+    system_prompt: Optional[str]
+    max_length: int
+    temperature: float
+    future: asyncio.Future
+
 
 class HuggingFaceService:
     """Service for Hugging Face model interactions."""
@@ -41,7 +60,17 @@ class HuggingFaceService:
         self.client = None
         self.tokenizer = None
         self.model = None
-        self.pipeline = None
+        
+        # The local model is loaded on first use_local request, not at startup
+        self._model_lock = asyncio.Lock()
+        self._local_model_attempted = False
+        
+        # Local requests waiting for the batcher
+        self._pending: List[_LocalRequest] = []
+        self._batch_task: Optional[asyncio.Task] = None
+        
+        # system prompt -> (input ids, KV cache after prefilling it); only the batcher thread touches it
+        self._prefix_cache: OrderedDict = OrderedDict()
         
         # Check if dependencies are available
         if not HUGGINGFACE_HUB_AVAILABLE:
@@ -56,14 +85,25 @@ class HuggingFaceService:
         # Initialize Hugging Face client if API token is provided and dependencies are available
         if settings.hf_api_token and HUGGINGFACE_HUB_AVAILABLE:
             try:
-                self.client = InferenceClient(token=settings.hf_api_token)
+                # Async client so Inference API calls don't block the event loop
+                self.client = AsyncInferenceClient(token=settings.hf_api_token, timeout=30)
                 logger.info("Hugging Face Inference Client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Hugging Face client: {e}")
+    
+    async def _ensure_local_model(self):
+        """Load the local model on first use; concurrent callers wait for the same load."""
+        if self._local_model_attempted:
+            return
+        if not (settings.hf_model_name and TRANSFORMERS_AVAILABLE and TORCH_AVAILABLE):
+            return
         
-        # Load local model if specified and dependencies are available
-        if settings.hf_model_name and TRANSFORMERS_AVAILABLE and TORCH_AVAILABLE:
-            self._load_local_model()
+        async with self._model_lock:
+            if self._local_model_attempted:
+                return
+            # Weight loading blocks for seconds to minutes; keep it off the event loop
+            await asyncio.to_thread(self._load_local_model)
+            self._local_model_attempted = True
     
     def _load_local_model(self):
         """Load a local Hugging Face model."""
@@ -75,27 +115,167 @@ class HuggingFaceService:
             logger.info(f"Loading local model: {settings.hf_model_name}")
             
             # Load tokenizer and model
-            self.tokenizer = AutoTokenizer.from_pretrained(settings.hf_model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
+            # Rust-backed fast tokenizer; left padding so batched prompts end where generation starts
+            self.tokenizer = AutoTokenizer.from_pretrained(settings.hf_model_name, use_fast=True, padding_side="left")
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+            self.model = self._load_causal_lm()
+            
+            logger.info("Local model loaded successfully")
+            
+        except Exception as e:
+            logger.error(f"Failed to load local model: {e}")
+    
+    def _load_causal_lm(self):
+        """Load the causal LM with the fastest dtype/attention the host supports.
+        
+        bfloat16 and Flash Attention 2 need a recent CUDA GPU (and the flash_attn package);
+        anything they fail on falls back to float16 with PyTorch's SDPA attention.
+        """
+        cuda = torch.cuda.is_available()
+        dtype = torch.bfloat16 if cuda and torch.cuda.is_bf16_supported() else torch.float16
+        attn_implementation = "sdpa"
+        if cuda and importlib.util.find_spec("flash_attn") is not None:
+            attn_implementation = "flash_attention_2"
+        
+        try:
+            model = AutoModelForCausalLM.from_pretrained(
+                settings.hf_model_name,
+                torch_dtype=dtype,
+                device_map="auto",
+                attn_implementation=attn_implementation,
+                low_cpu_mem_usage=True
+            )
+        except Exception as e:
+            logger.warning(f"Optimized model load failed ({dtype}, {attn_implementation}), retrying with float16: {e}")
+            model = AutoModelForCausalLM.from_pretrained(
                 settings.hf_model_name,
                 torch_dtype=torch.float16,
                 device_map="auto"
             )
+        
+        # Compile forward in place so generate() runs the compiled graph
+        if cuda and hasattr(torch, "compile"):
+            try:
+                model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False)
+            except Exception as e:
+                logger.warning(f"torch.compile unavailable, using eager model: {e}")
+        
+        return model
+    
+    async def _generate_local(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_length: int,
+        temperature: float
+    ) -> str:
+        """Queue a prompt for the local batcher and wait for its text."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_LocalRequest(prompt, system_prompt, max_length, temperature, future))
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._run_batches())
+        return await future
+    
+    async def _run_batches(self):
+        """Drain queued local requests, one model.generate per batch of matching settings."""
+        while self._pending:
+            # Give concurrent callers a moment to join the batch
+            await asyncio.sleep(_BATCH_WINDOW_SECONDS)
+            pending, self._pending = self._pending, []
             
-            # Create pipeline
-            self.pipeline = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                max_length=2048,
-                temperature=0.7,
-                do_sample=True
-            )
-            
-            logger.info("Local model loaded successfully")
+            groups: Dict[Tuple[Optional[str], int, float], List[_LocalRequest]] = {}
+            for request in pending:
+                groups.setdefault((request.system_prompt, request.max_length, request.temperature), []).append(request)
             
-        except Exception as e:
-            logger.error(f"Failed to load local model: {e}")
+            for (system_prompt, max_length, temperature), requests in groups.items():
+                for start in range(0, len(requests), _MAX_BATCH_SIZE):
+                    batch = requests[start:start + _MAX_BATCH_SIZE]
+                    prompts = [request.prompt for request in batch]
+                    try:
+                        if system_prompt:
+                            texts = await asyncio.to_thread(
+                                self._generate_with_prefix, system_prompt, prompts, max_length, temperature
+                            )
+                        else:
+                            texts = await asyncio.to_thread(self._generate_batch, prompts, max_length, temperature)
+                    except Exception as e:
+                        for request in batch:
+                            if not request.future.done():
+                                request.future.set_exception(e)
+                    else:
+                        for request, text in zip(batch, texts):
+                            if not request.future.done():
+                                request.future.set_result(text)
+    
+    def _generate_batch(self, prompts: List[str], max_length: int, temperature: float) -> List[str]:
+        """Generate for a padded batch of prompts (blocking); each result is prompt + continuation."""
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                max_length=max_length,
+                temperature=temperature,
+                do_sample=True,
+                use_cache=True,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        
+        prompt_length = inputs["input_ids"].shape[1]
+        continuations = self.tokenizer.batch_decode(output_ids[:, prompt_length:], skip_special_tokens=True)
+        return [prompt + continuation for prompt, continuation in zip(prompts, continuations)]
+    
+    def _prefix_state(self, system_prompt: str):
+        """Token ids and prefilled KV cache for a system prompt, computed once per LRU lifetime."""
+        state = self._prefix_cache.get(system_prompt)
+        if state is not None:
+            self._prefix_cache.move_to_end(system_prompt)
+            return state
+        
+        prefix_ids = self.tokenizer(system_prompt, return_tensors="pt").input_ids.to(self.model.device)
+        with torch.inference_mode():
+            past_key_values = self.model(input_ids=prefix_ids, use_cache=True).past_key_values
+        
+        state = (prefix_ids, past_key_values)
+        self._prefix_cache[system_prompt] = state
+        if len(self._prefix_cache) > _PREFIX_CACHE_SIZE:
+            self._prefix_cache.popitem(last=False)
+        return state
+    
+    def _generate_with_prefix(
+        self,
+        system_prompt: str,
+        prompts: List[str],
+        max_length: int,
+        temperature: float
+    ) -> List[str]:
+        """Generate after a cached system-prompt prefill (blocking); each result is prompt + continuation.
+        
+        Prompts run one at a time: left padding a batch would put pad tokens between the
+        cached prefix and each prompt.
+        """
+        prefix_ids, prefix_cache = self._prefix_state(system_prompt)
+        
+        texts = []
+        for prompt in prompts:
+            prompt_ids = self.tokenizer(prompt, return_tensors="pt", add_special_tokens=False).input_ids
+            input_ids = torch.cat([prefix_ids, prompt_ids.to(prefix_ids.device)], dim=-1)
+            with torch.inference_mode():
+                # generate() appends to the cache it is given, so each prompt gets its own copy;
+                # only the prompt tokens past the cached prefix are prefilled
+                output_ids = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    past_key_values=copy.deepcopy(prefix_cache),
+                    max_length=max_length,
+                    temperature=temperature,
+                    do_sample=True,
+                    use_cache=True,
+                    pad_token_id=self.tokenizer.pad_token_id
+                )
+            continuation = self.tokenizer.decode(output_ids[0, input_ids.shape[1]:], skip_special_tokens=True)
+            texts.append(prompt + continuation)
+        return texts
     
     async def generate_text(
         self,
@@ -103,25 +283,25 @@ class HuggingFaceService:
         model_name: Optional[str] = None,
         max_length: int = 2048,
         temperature: float = 0.7,
-        use_local: bool = False
+        use_local: bool = False,
+        system_prompt: Optional[str] = None
     ) -> str:
-        """Generate text using Hugging Face models."""
+        """Generate text using Hugging Face models.
+        
+        A system_prompt is prepended to the prompt; locally its KV cache is reused across requests.
+        """
         try:
-            if use_local and self.pipeline and TRANSFORMERS_AVAILABLE:
-                # Use local model
-                result = self.pipeline(
-                    prompt,
-                    max_length=max_length,
-                    temperature=temperature,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
-                return result[0]['generated_text']
+            if use_local and self.model is None:
+                await self._ensure_local_model()
+            
+            if use_local and self.model is not None and TRANSFORMERS_AVAILABLE:
+                # Use local model, batched with concurrent local requests
+                return await self._generate_local(prompt, system_prompt, max_length, temperature)
             
             elif self.client and model_name and HUGGINGFACE_HUB_AVAILABLE:
                 # Use Hugging Face Inference API
-                result = self.client.text_generation(
-                    prompt,
+                result = await self.client.text_generation(
+                    f"{system_prompt}{prompt}" if system_prompt else prompt,
                     model=model_name,
                     max_new_tokens=max_length,
                     temperature=temperature,
@@ -145,7 +325,7 @@ class HuggingFaceService:
         try:
             if self.client and HUGGINGFACE_HUB_AVAILABLE:
                 # Use Hugging Face Inference API
-                result = self.client.feature_extraction(
+                result = await self.client.feature_extraction(
                     text,
                     model=model_name
                 )
@@ -165,7 +345,7 @@ class HuggingFaceService:
         """Classify text using Hugging Face models."""
         try:
             if self.client and HUGGINGFACE_HUB_AVAILABLE:
-                result = self.client.text_classification(
+                result = await self.client.text_classification(
                     text,
                     model=model_name
                 )
@@ -187,7 +367,7 @@ class HuggingFaceService:
         """Translate text using Hugging Face models."""
         try:
             if self.client and HUGGINGFACE_HUB_AVAILABLE:
-                result = self.client.translation(
+                result = await self.client.translation(
                     text,
                     model=model_name
                 )
@@ -206,7 +386,7 @@ class HuggingFaceService:
         if self.client and HUGGINGFACE_HUB_AVAILABLE:
             models.append("Hugging Face Inference API (remote)")
         
-        if self.pipeline and TRANSFORMERS_AVAILABLE:
+        if self.model is not None and TRANSFORMERS_AVAILABLE:
             models.append(f"Local model: {settings.hf_model_name}")
         
         if not models:
@@ -214,18 +394,30 @@ class HuggingFaceService:
         
         return models
     
+    def _local_model_available(self) -> bool:
+        """Whether the local model is loaded, or configured and not yet tried (it loads on first use)."""
+        if self.model is not None:
+            return True
+        return (
+            not self._local_model_attempted
+            and bool(settings.hf_model_name)
+            and TRANSFORMERS_AVAILABLE
+            and TORCH_AVAILABLE
+        )
+    
     def get_service_status(self) -> Dict[str, Any]:
         """Get service status and configuration."""
         return {
             "service": "huggingface",
-            "status": "available" if (self.client or self.pipeline) else "unavailable",
+            "status": "available" if (self.client or self._local_model_available()) else "unavailable",
             "dependencies": {
                 "huggingface_hub": HUGGINGFACE_HUB_AVAILABLE,
                 "transformers": TRANSFORMERS_AVAILABLE,
                 "torch": TORCH_AVAILABLE
             },
             "client_initialized": self.client is not None,
-            "local_model_loaded": self.pipeline is not None,
+            "local_model_loaded": self.model is not None,
+            "local_model_available": self._local_model_available(),
             "api_token_configured": bool(settings.hf_api_token),
             "local_model_configured": bool(settings.hf_model_name),
             "available_models": self.get_available_models()
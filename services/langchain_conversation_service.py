@@ -6,8 +6,8 @@ Implements conversation memory, RAG retrieval, and context-aware responses
 import logging
 import json
 import asyncio
+from functools import lru_cache
 from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timezone
 from pathlib import Path
 import os
 
@@ -30,6 +30,16 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=None)
+def _list_text_files(directory: str) -> Tuple[Path, ...]:
+    """List the .txt files of a GPT FINAL FLOW subdirectory, scanning it only once."""
+    path = Path(directory)
+    if not path.exists():
+        return ()
+    return tuple(sorted(path.glob("*.txt")))
+
+
 class LangChainConversationService:
     """Advanced conversation service with LangChain memory and RAG capabilities."""
     
@@ -78,11 +88,11 @@ class LangChainConversationService:
             documents = []
             
             # Load system prompts - prioritize conversational versions
-            system_prompt_path = module_path / "System Prompt"
-            if system_prompt_path.exists():
+            system_prompt_files = _list_text_files(str(module_path / "System Prompt"))
+            if system_prompt_files:
                 # First, look for conversational prompts
-                conversational_prompts = list(system_prompt_path.glob("*Conversational*.txt"))
-                regular_prompts = list(system_prompt_path.glob("*.txt"))
+                conversational_prompts = [p for p in system_prompt_files if "Conversational" in p.name]
+                regular_prompts = list(system_prompt_files)
                 
                 # Filter out conversational prompts from regular prompts to avoid duplication
                 if conversational_prompts:
@@ -108,34 +118,30 @@ class LangChainConversationService:
                         ))
             
             # Load RAG content
-            rag_path = module_path / "RAG"
-            if rag_path.exists():
-                for file_path in rag_path.glob("*.txt"):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        documents.append(Document(
-                            page_content=content,
-                            metadata={
-                                "source": str(file_path),
-                                "type": "rag_content",
-                                "module": module_id
-                            }
-                        ))
+            for file_path in _list_text_files(str(module_path / "RAG")):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                    documents.append(Document(
+                        page_content=content,
+                        metadata={
+                            "source": str(file_path),
+                            "type": "rag_content",
+                            "module": module_id
+                        }
+                    ))
             
             # Load output templates
-            output_path = module_path / "Output template"
-            if output_path.exists():
-                for file_path in output_path.glob("*.txt"):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        documents.append(Document(
-                            page_content=content,
-                            metadata={
-                                "source": str(file_path),
-                                "type": "output_template",
-                                "module": module_id
-                            }
-                        ))
+            for file_path in _list_text_files(str(module_path / "Output template")):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                    documents.append(Document(
+                        page_content=content,
+                        metadata={
+                            "source": str(file_path),
+                            "type": "output_template",
+                            "module": module_id
+                        }
+                    ))
             
             logger.info(f"Loaded {len(documents)} documents for module {module_id}")
             return documents
@@ -474,7 +480,6 @@ Please respond in a warm, conversational way that helps them think through their
                 {"role": "user", "content": user_message},
                 {"role": "assistant", "content": response}
             ]
-            memory.last_updated = datetime.now(timezone.utc)
             
             await db.commit()
             
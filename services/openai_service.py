@@ -3,56 +3,76 @@ OpenAI service for content generation and embeddings.
 """
 import json
 import os
-from typing import List, Tuple
-from openai import OpenAI
+from typing import AsyncIterator, List, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI
 import logging
 
 from config import settings
 
+# Optional import - HTTP/2 needs the h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by every request, so short calls reuse warm keep-alive connections
+_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+_SYSTEM_MESSAGE = """You are an expert AI assistant helping users create comprehensive documents through a 14-phase structured workflow. 
+
+Your responses should be:
+- Professional and well-structured
+- Comprehensive yet concise
+- Tailored to the specific phase and user input
+- Building upon previous phases when context is provided
+
+Always provide actionable, detailed content that helps move the document creation process forward."""
+
+
+def _build_messages(prompt: str, context: str) -> List[dict]:
+    """Build the chat messages for a content request, with previous-phase context if any."""
+    user_message = prompt
+    if context:
+        user_message = "Context from previous phases:\n" + context + "\n\nCurrent phase request:\n" + prompt
+    return [
+        {"role": "system", "content": _SYSTEM_MESSAGE},
+        {"role": "user", "content": user_message}
+    ]
+
 
 class OpenAIService:
     """Service for OpenAI API interactions."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        # Every call is awaited, so requests never block the event loop
+        self.async_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=_POOL_LIMITS)
+        )
     
     async def generate_content(
         self,
         prompt: str,
         context: str = "",
         temperature: float = 0.7,
-        max_tokens: int = 2000
+        max_tokens: int = 2000,
+        cache_key: Optional[str] = None
     ) -> str:
         """Generate content using OpenAI GPT model."""
         try:
-            # Build system message
-            system_message = """You are an expert AI assistant helping users create comprehensive documents through a 14-phase structured workflow. 
-
-Your responses should be:
-- Professional and well-structured
-- Comprehensive yet concise
-- Tailored to the specific phase and user input
-- Building upon previous phases when context is provided
-
-Always provide actionable, detailed content that helps move the document creation process forward."""
-
-            # Build user message
-            user_message = prompt
-            if context:
-                user_message = "Context from previous phases:\n" + context + "\n\nCurrent phase request:\n" + prompt
-            
             # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
             # do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
+            response = await self.async_client.chat.completions.create(
                 model=settings.openai_model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
+                messages=_build_messages(prompt, context),
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                # Route requests sharing a static prompt prefix to the same prompt cache
+                extra_body={"prompt_cache_key": cache_key} if cache_key else None
             )
             
             content = response.choices[0].message.content
@@ -60,7 +80,34 @@ Always provide actionable, detailed content that helps move the document creatio
             
         except Exception as e:
             logger.error(f"OpenAI content generation error: {e}")
-            raise Exception(f"Failed to generate content: {str(e)}")
+            raise
+    
+    async def stream_content(
+        self,
+        prompt: str,
+        context: str = "",
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        cache_key: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream generated content token by token using OpenAI GPT model."""
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=settings.openai_model,
+                messages=_build_messages(prompt, context),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                extra_body={"prompt_cache_key": cache_key} if cache_key else None
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+            
+        except Exception as e:
+            logger.error(f"OpenAI content streaming error: {e}")
+            raise
     
     async def create_embedding(self, text: str) -> List[float]:
         """Create embedding for text using OpenAI embedding model."""
@@ -70,7 +117,7 @@ Always provide actionable, detailed content that helps move the document creatio
             if len(cleaned_text) > 8000:  # Rough token limit
                 cleaned_text = cleaned_text[:8000]
             
-            response = self.client.embeddings.create(
+            response = await self.async_client.embeddings.create(
                 model=settings.embedding_model,
                 input=cleaned_text
             )
@@ -79,7 +126,7 @@ Always provide actionable, detailed content that helps move the document creatio
             
         except Exception as e:
             logger.error(f"OpenAI embedding error: {e}")
-            raise Exception(f"Failed to create embedding: {str(e)}")
+            raise
     
     async def analyze_content_structure(self, content: str) -> dict:
         """Analyze content structure and extract key information."""
@@ -100,7 +147,7 @@ Provide analysis in this JSON format:
 
             # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
             # do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
+            response = await self.async_client.chat.completions.create(
                 model=settings.openai_model,
                 messages=[
                     {"role": "user", "content": prompt}
@@ -270,6 +270,91 @@ async def migrate_user_isolation():
         print(f"❌ Error during user isolation migration: {e}")
         raise
 
+async def migrate_conversation_memory():
+    """Add conversation memory columns and constraints introduced after the initial schema."""
+    try:
+        engine = create_async_engine()
+        
+        async with engine.begin() as conn:
+            print("🔄 Migrating conversation memory columns...")
+            await conn.execute(text("""
+                ALTER TABLE conversation_memory 
+                ADD COLUMN IF NOT EXISTS last_summarized_message_id VARCHAR(36),
+                ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+                ALTER COLUMN last_updated SET DEFAULT now()
+            """))
+            # Backfill counts for memories created before the column existed
+            await conn.execute(text("""
+                UPDATE conversation_memory cm
+                SET message_count = counts.total
+                FROM (
+                    SELECT conversation_memory_id, COUNT(*) AS total
+                    FROM conversation_messages
+                    GROUP BY conversation_memory_id
+                ) counts
+                WHERE counts.conversation_memory_id = cm.id
+                AND cm.message_count = 0
+            """))
+            print("✅ Conversation memory columns are up to date")
+        
+        # Check and add unique constraint backing the conversation memory upsert
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
+                SELECT constraint_name 
+                FROM information_schema.table_constraints 
+                WHERE table_name = 'conversation_memory' 
+                AND constraint_type = 'UNIQUE' 
+                AND constraint_name = 'uq_conversation_memory_scope'
+            """))
+            if not result.fetchone():
+                # Older databases can hold several memories per scope; keep the most recently
+                # updated one, move the others' messages onto it and drop them
+                await conn.execute(text("""
+                    CREATE TEMP TABLE conversation_memory_duplicates ON COMMIT DROP AS
+                    SELECT id, keep_id
+                    FROM (
+                        SELECT id, FIRST_VALUE(id) OVER (
+                            PARTITION BY project_id, session_id, module_id, user_id
+                            ORDER BY last_updated DESC NULLS LAST, created_at DESC NULLS LAST, id DESC
+                        ) AS keep_id
+                        FROM conversation_memory
+                    ) ranked
+                    WHERE id <> keep_id
+                """))
+                await conn.execute(text("""
+                    UPDATE conversation_messages m
+                    SET conversation_memory_id = d.keep_id
+                    FROM conversation_memory_duplicates d
+                    WHERE m.conversation_memory_id = d.id
+                """))
+                await conn.execute(text("""
+                    UPDATE conversation_memory cm
+                    SET message_count = (
+                        SELECT COUNT(*) FROM conversation_messages m
+                        WHERE m.conversation_memory_id = cm.id
+                    )
+                    WHERE cm.id IN (SELECT keep_id FROM conversation_memory_duplicates)
+                """))
+                result = await conn.execute(text("""
+                    DELETE FROM conversation_memory
+                    WHERE id IN (SELECT id FROM conversation_memory_duplicates)
+                """))
+                if result.rowcount:
+                    print(f"✅ Merged {result.rowcount} duplicate conversation memories")
+                
+                await conn.execute(text("""
+                    ALTER TABLE conversation_memory 
+                    ADD CONSTRAINT uq_conversation_memory_scope 
+                    UNIQUE (project_id, session_id, module_id, user_id)
+                """))
+                print("✅ Added unique constraint for conversation_memory")
+            else:
+                print("ℹ️  Unique constraint for conversation_memory already exists")
+            
+    except Exception as e:
+        print(f"❌ Error migrating conversation memory: {e}")
+        raise
+
 async def fix_enum_types():
     """Fix enum type issues in the database."""
     try:
@@ -441,6 +526,9 @@ async def main():
             # Run user isolation migration
             await migrate_user_isolation()
             
+            # Add newer conversation memory columns
+            await migrate_conversation_memory()
+            
             # Show database info
             await show_database_info()
         else:
@@ -63,8 +63,9 @@ def install_dependencies():
     """Install Python dependencies."""
     print("📦 Installing dependencies...")
     try:
+        # pip output is never shown, so discard it instead of buffering it in pipes
         subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                      check=True, capture_output=True)
+                      check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         print("✅ Dependencies installed successfully")
         return True
     except subprocess.CalledProcessError as e:
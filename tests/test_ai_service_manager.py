@@ -0,0 +1,32 @@
+"""
+AIServiceManager results must not share mutable state between callers.
+"""
+import asyncio
+
+from services.ai_service_manager import AIServiceManager
+
+
+def test_fallback_analysis_is_fresh_per_call():
+    manager = AIServiceManager()
+    
+    first = asyncio.run(manager.analyze_content_structure("two words", service="missing"))
+    first["key_points"].append("mutated")
+    first["topics"].append("mutated")
+    second = asyncio.run(manager.analyze_content_structure("three words here", service="missing"))
+    
+    assert second["key_points"] == []
+    assert second["topics"] == []
+    assert second["word_count"] == 3
+    assert second["summary"] == "Analysis failed"
+
+
+def test_status_is_not_shared_between_callers():
+    manager = AIServiceManager()
+    
+    status = manager.get_service_status()
+    status["openai"]["available"] = "mutated"
+    services = manager.get_available_services()
+    services.append("mutated")
+    
+    assert manager.get_service_status()["openai"]["available"] != "mutated"
+    assert "mutated" not in manager.get_available_services()
@@ -0,0 +1,126 @@
+"""
+Server-Sent Event endpoints: the streamed next question, streamed summaries and what they save.
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from database import get_async_db
+from dependencies import get_current_active_user
+from routers import assistant
+
+
+def test_sse_frames():
+    assert assistant._sse({"delta": "Hi"}) == b'data: {"delta":"Hi"}\n\n'
+    assert assistant._sse({"done": True}, "end") == b'event: end\ndata: {"done":true}\n\n'
+
+
+def test_next_question_stream_sends_deltas_then_end_event(monkeypatch):
+    service = assistant.chatbot_service
+    
+    async def stream(module_id, current_question, answers):
+        for delta in ("What is ", "your offer?"):
+            yield delta
+    
+    monkeypatch.setattr(service, "modules", {"offer": SimpleNamespace(name="Offer Clarifier")}, raising=False)
+    monkeypatch.setattr(service, "stream_next_question", stream)
+    monkeypatch.setattr(service, "get_module_questions", lambda module_id: ["Q1", "Q2"])
+    monkeypatch.setattr(service, "_get_validation_rules", lambda module_id, index: {"required": True})
+    
+    mode_session = SimpleNamespace(current_question=1, answers={"0": "An answer"})
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = mode_session
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    
+    app = FastAPI()
+    app.include_router(assistant.router)
+    app.dependency_overrides[get_async_db] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id="user-1")
+    
+    with TestClient(app) as client:
+        response = client.get("/projects/project-1/modes/Offer Clarifier/next-question/stream")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = response.content.split(b"\n\n")[:-1]
+    assert frames[:2] == [b'data: {"delta":"What is "}', b'data: {"delta":"your offer?"}']
+    event, data = frames[2].split(b"\n")
+    assert event == b"event: end"
+    assert orjson.loads(data[len(b"data: "):]) == {
+        "done": False,
+        "module_id": "offer",
+        "module_name": "Offer Clarifier",
+        "total_questions": 2,
+        "question_number": 1,
+        "validation_rules": {"required": True},
+    }
+
+
+def _client(db):
+    app = FastAPI()
+    app.include_router(assistant.router)
+    app.dependency_overrides[get_async_db] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id="user-1")
+    return TestClient(app)
+
+
+def _db_returning(row):
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = row
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+def _end_event(response):
+    event, data = response.content.split(b"\n\n")[-2].split(b"\n")
+    assert event == b"event: end"
+    return orjson.loads(data[len(b"data: "):])
+
+
+def test_partial_mode_summary_is_not_saved(monkeypatch):
+    service = assistant.chatbot_service
+    
+    async def stream(module_id, answers):
+        yield {"delta": "Half a sum"}
+        yield {"summary": "Half a sum", "partial": True}
+    
+    monkeypatch.setattr(service, "modules", {"offer": SimpleNamespace(name="Offer Clarifier")}, raising=False)
+    monkeypatch.setattr(service, "stream_module_summary", stream)
+    session_factory = MagicMock()
+    monkeypatch.setattr(assistant, "AsyncSessionLocal", session_factory)
+    
+    with _client(_db_returning(SimpleNamespace(id="session-1", answers={}))) as client:
+        response = client.get("/projects/project-1/modes/Offer Clarifier/summary/stream")
+    
+    assert _end_event(response)["partial"] is True
+    session_factory.assert_not_called()
+
+
+def test_failed_combined_summary_is_not_saved(monkeypatch):
+    service = assistant.chatbot_service
+    
+    async def stream(completed_modules):
+        yield "Half a sum"
+        raise Exception("connection reset")
+    
+    monkeypatch.setattr(service, "stream_combined_summary", stream)
+    session_factory = MagicMock()
+    monkeypatch.setattr(assistant, "AsyncSessionLocal", session_factory)
+    
+    with _client(_db_returning(SimpleNamespace(id="project-1"))) as client:
+        response = client.post("/projects/project-1/combined-summary/stream", json={"offer": {"summary": "S"}})
+    
+    end = _end_event(response)
+    assert end["success"] is False
+    assert end["partial"] is True
+    session_factory.assert_not_called()
@@ -0,0 +1,200 @@
+"""
+ChatbotService helpers that guard on-disk caches and per-session state.
+"""
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain")
+
+from services import chatbot_service
+
+
+def test_owned_by_process_user(tmp_path):
+    own = tmp_path / "index.pkl"
+    own.write_bytes(b"")
+    assert chatbot_service._owned_by_process_user(tmp_path, own)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid") or os.getuid() != 0, reason="needs root to chown")
+def test_foreign_file_is_not_trusted(tmp_path):
+    foreign = tmp_path / "index.pkl"
+    foreign.write_bytes(b"")
+    os.chown(foreign, 12345, 12345)
+    assert not chatbot_service._owned_by_process_user(tmp_path, foreign)
+
+
+def _prefetch_service():
+    service = chatbot_service.ChatbotService.__new__(chatbot_service.ChatbotService)
+    service._prefetch = chatbot_service.OrderedDict()
+    return service
+
+
+def test_prefetch_sessions_are_capped_and_cancelled():
+    async def scenario():
+        service = _prefetch_service()
+        service._PREFETCH_SESSIONS = 2
+        never = asyncio.Event()
+        first = asyncio.create_task(never.wait())
+        service._start_prefetch("m:s1", {1: first})
+        service._start_prefetch("m:s2", {1: asyncio.create_task(never.wait())})
+        service._start_prefetch("m:s3", {1: asyncio.create_task(never.wait())})
+        await asyncio.sleep(0)
+        
+        assert list(service._prefetch) == ["m:s2", "m:s3"]
+        assert first.cancelled()
+        for key in list(service._prefetch):
+            service._drop_prefetch(key)
+    
+    asyncio.run(scenario())
+
+
+def test_idle_prefetch_sessions_expire(monkeypatch):
+    async def scenario():
+        service = _prefetch_service()
+        clock = [1000.0]
+        monkeypatch.setattr(chatbot_service.time, "monotonic", lambda: clock[0])
+        done = asyncio.get_running_loop().create_future()
+        done.set_result("enhanced")
+        service._start_prefetch("m:idle", {1: done})
+        
+        clock[0] += service._PREFETCH_TTL + 1
+        service._start_prefetch("m:fresh", {})
+        assert "m:idle" not in service._prefetch
+    
+    asyncio.run(scenario())
+
+
+def test_consumed_prefetch_sessions_are_removed():
+    async def scenario():
+        service = _prefetch_service()
+        task = asyncio.create_task(asyncio.sleep(0, result="enhanced"))
+        service._start_prefetch("m:s1", {1: task})
+        
+        assert service._take_prefetched("m:s1", 1) is task
+        assert await task == "enhanced"
+        assert "m:s1" not in service._prefetch
+        assert service._take_prefetched("m:s1", 2) is None
+    
+    asyncio.run(scenario())
+
+
+def test_next_question_is_prefetched_with_answer_context(tmp_path, monkeypatch):
+    monkeypatch.setattr(chatbot_service.settings, "upload_dir", str(tmp_path))
+    
+    async def scenario():
+        service = _prefetch_service()
+        module = SimpleNamespace(
+            module_id="m", name="Module", questions=["Q0", "Q1", "Q2"], system_prompt="prompt"
+        )
+        calls = []
+        
+        async def ensure_loaded(module_id):
+            return module
+        
+        async def build_context(module_id, answers):
+            return " | ".join((answers or {}).values())
+        
+        async def enhance(module, question, context=""):
+            calls.append((question, context))
+            return "enhanced " + question
+        
+        service.modules = {"m": module}
+        service._enhanced_questions = {}
+        service._prefetch_sem = asyncio.Semaphore(10)
+        service._ensure_loaded = ensure_loaded
+        service._build_context = build_context
+        service._enhance_question = enhance
+        service._get_validation_rules = lambda module_id, index: {}
+        
+        first = await service.get_next_question("m", 0, {}, session_id="s")
+        await asyncio.sleep(0)
+        assert first["question"] == "enhanced Q0"
+        assert list(service._prefetch["m:s"][1]) == [1]
+        
+        second = await service.get_next_question("m", 1, {"q0": "a0"}, session_id="s")
+        await asyncio.sleep(0)
+        assert second["question"] == "enhanced Q1"
+        assert ("Q2", "a0") in calls
+        assert ("Q1", "") in calls
+        service._drop_prefetch("m:s")
+    
+    asyncio.run(scenario())
+
+
+def test_failed_module_summary_falls_back_to_raw_answers():
+    async def scenario():
+        service = _prefetch_service()
+        module = SimpleNamespace(name="Module", module_id="m")
+        service.modules = {"m": module}
+        
+        async def failing_summary(module_id, answers):
+            return service._summary_fallback(module, answers)
+        
+        service.generate_module_summary = failing_summary
+        section = await service._module_section("m", {"q1": "our launch plan"})
+        assert "our launch plan" in section
+    
+    asyncio.run(scenario())
+
+
+def test_preload_keeps_modules_already_loaded():
+    async def scenario():
+        service = _prefetch_service()
+        service._configs = {"a": {}, "b": {}}
+        already = SimpleNamespace(module_id="a")
+        service._loaded = {"a": already}
+        
+        async def read_module(module_id):
+            return SimpleNamespace(module_id=module_id)
+        
+        service._read_module = read_module
+        await service.preload()
+        
+        assert service._loaded["a"] is already
+        assert service._loaded["b"].module_id == "b"
+    
+    asyncio.run(scenario())
+
+
+def test_batch_enhancements_are_read_back_for_the_same_prompt(tmp_path, monkeypatch):
+    monkeypatch.setattr(chatbot_service.settings, "upload_dir", str(tmp_path))
+    service = _prefetch_service()
+    service._enhanced_questions = {}
+    module = SimpleNamespace(module_id="m", prompt_template="prompt %s", questions=["Q0", "Q1"])
+    
+    service._store_batched_questions(module, {0: "enhanced Q0", 1: "enhanced Q1"})
+    assert asyncio.run(service._batched_questions(module)) == {0: "enhanced Q0", 1: "enhanced Q1"}
+    
+    # A restarted worker with an edited prompt must not serve enhancements of the old one
+    restarted = _prefetch_service()
+    restarted._enhanced_questions = {}
+    edited = SimpleNamespace(module_id="m", prompt_template="edited %s", questions=["Q0", "Q1"])
+    assert asyncio.run(restarted._batched_questions(edited)) == {}
+
+
+def test_embeddings_client_is_created_on_first_use(monkeypatch):
+    created = []
+    monkeypatch.setattr(chatbot_service, "OpenAIEmbeddings", lambda **kwargs: created.append(kwargs) or object())
+    service = _prefetch_service()
+    service._embeddings = None
+    
+    first = service._get_embeddings()
+    assert service._get_embeddings() is first
+    assert len(created) == 1
+
+
+def test_only_typed_transient_errors_are_retried():
+    request = chatbot_service.httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    
+    def status_error(code):
+        response = chatbot_service.httpx.Response(code, request=request)
+        return chatbot_service.APIStatusError("error", response=response, body=None)
+    
+    assert chatbot_service._is_retryable(status_error(503))
+    assert chatbot_service._is_retryable(chatbot_service.APIConnectionError(request=request))
+    assert not chatbot_service._is_retryable(status_error(400))
+    assert not chatbot_service._is_retryable(Exception("Invalid value 429 for max_tokens"))
@@ -0,0 +1,36 @@
+"""
+Answer validation: the model's verdict decides between moving on and asking for clarification.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from services.conversation_service import ConversationService
+
+
+def _answer(verdict):
+    service = ConversationService()
+    
+    async def generate_content(prompt, **kwargs):
+        if prompt.startswith("Determine"):
+            return verdict
+        if prompt.startswith("Create a natural"):
+            return "transition"
+        return "clarification"
+    
+    service.ai_service = SimpleNamespace(generate_content=generate_content)
+    memory = SimpleNamespace(conversation_state={"current_question": 0})
+    return asyncio.run(service._handle_potential_answer(
+        None, memory, "we sell shoes", ["What do you sell?", "Who buys it?"], {"cache_key": "test"}, None
+    ))
+
+
+def test_valid_answer_moves_to_next_question():
+    response = _answer("VALID - it names the product")
+    assert response["flow"] == "transition"
+    assert response["current_question"] == 1
+
+
+def test_invalid_answer_asks_for_clarification():
+    response = _answer("INVALID - it does not answer the question")
+    assert response["flow"] == "clarification"
+    assert response["current_question"] == 0
@@ -0,0 +1,55 @@
+"""
+Intent detection must score exactly like the original per-pattern findall loop.
+"""
+import pytest
+
+from services import conversation_service
+from services.conversation_service import ConversationService
+
+CASES = [
+    ("Hi, can you help?", ("greeting", 0.25)),
+    ("skip this, I don't know", ("answer", 0.2)),
+    ("Can you explain that again?", ("question", 0.2)),
+    ("hello", ("greeting", 1.0)),
+    ("What is this about?", ("question", 0.25)),
+    ("I want to change my answer", ("answer", 1 / 3)),
+    ("next", ("skip", 1.0)),
+    ("let's go", ("greeting", 0.5)),
+    ("The plan is fine", ("general", 0.0)),
+    ("", ("general", 0.0)),
+]
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ConversationService()
+
+
+def _regex_only(service, text):
+    automaton, service._keyword_automaton = service._keyword_automaton, None
+    try:
+        return service._scan_intent(text)
+    finally:
+        service._keyword_automaton = automaton
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_regex_scoring_matches_baseline(service, text, expected):
+    intent, confidence = _regex_only(service, text)
+    assert intent == expected[0]
+    assert confidence == pytest.approx(expected[1])
+
+
+@pytest.mark.skipif(not conversation_service.AHOCORASICK_AVAILABLE, reason="pyahocorasick not installed")
+@pytest.mark.parametrize("text", [text for text, _ in CASES] + [
+    "can you explain what you mean, i don't understand",
+    "clarify clarify, hi hello hey",
+    "it's it is my our we i",
+    "HELP me edit the wrong, incorrect part",
+])
+def test_keyword_automaton_matches_regex(service, text):
+    assert service._keyword_automaton is not None
+    assert service._scan_intent(text) == _regex_only(service, text)
+    assert service._count_keyword_matches(text.lower()) == [
+        len(regex.findall(text.lower())) for _, regex in service._intent_regexes
+    ]
@@ -0,0 +1,120 @@
+"""
+Conversation memory persistence against a disposable PostgreSQL database named by
+TEST_DATABASE_URL (upserts and JSONB merges are PostgreSQL-specific). All tables are recreated.
+"""
+import asyncio
+import os
+import uuid
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import database
+from models import Base, ConversationMemory, Project, User
+from services.conversation_service import ConversationService
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+def _run(scenario):
+    """Run scenario(service, db, project_id, user_id) on a fresh schema with the app's session settings."""
+    async def runner():
+        engine = database.create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(
+            bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        try:
+            async with session_factory() as db:
+                user = User(email=f"{uuid.uuid4()}@example.com", hashed_password="x", full_name="Test User")
+                db.add(user)
+                await db.flush()
+                project = Project(title="Test Project", owner_id=user.id)
+                db.add(project)
+                await db.commit()
+                
+                service = ConversationService()
+                service.ai_service.generate_content = AsyncMock()
+                return await scenario(service, db, project.id, user.id)
+        finally:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await engine.dispose()
+    
+    return asyncio.run(runner())
+
+
+def test_create_conversation_memory_upserts_one_row_per_scope():
+    async def scenario(service, db, project_id, user_id):
+        first = await service.create_conversation_memory(db, project_id, "session-1", "module-1", user_id)
+        second = await service.create_conversation_memory(db, project_id, "session-1", "module-1", user_id)
+        other = await service.create_conversation_memory(db, project_id, "session-2", "module-1", user_id)
+        rows = await db.scalar(select(func.count()).select_from(ConversationMemory))
+        return first.id, second.id, other.id, rows
+    
+    first_id, second_id, other_id, rows = _run(scenario)
+    
+    assert first_id == second_id
+    assert other_id != first_id
+    assert rows == 2
+
+
+def test_update_conversation_state_merges_keys():
+    async def scenario(service, db, project_id, user_id):
+        memory = await service.create_conversation_memory(db, project_id, "session-1", "module-1", user_id)
+        await service.update_conversation_state(db, memory.id, {"current_question": 1, "flow": "welcome"})
+        await service.update_conversation_state(db, memory.id, {"current_question": 2, "last_intent": "answer"})
+        return await db.scalar(
+            select(ConversationMemory.conversation_state).where(ConversationMemory.id == memory.id)
+        )
+    
+    state = _run(scenario)
+    
+    # Later keys win, earlier and initial keys are kept
+    assert state["current_question"] == 2
+    assert state["flow"] == "welcome"
+    assert state["last_intent"] == "answer"
+    assert state["questions_answered"] == 0
+
+
+def test_context_summary_rolls_forward_from_its_watermark():
+    async def scenario(service, db, project_id, user_id):
+        memory = await service.create_conversation_memory(db, project_id, "session-1", "module-1", user_id)
+        generate = service.ai_service.generate_content
+        
+        for content in ("first", "second"):
+            await service.add_message_to_memory(db, memory.id, "user", content)
+        generate.return_value = "summary one"
+        first = await service.generate_context_summary(db, memory.id)
+        first_prompt = generate.call_args.kwargs["prompt"]
+        
+        newest = await service.add_message_to_memory(db, memory.id, "assistant", "third")
+        generate.return_value = "summary two"
+        second = await service.generate_context_summary(db, memory.id)
+        second_prompt = generate.call_args.kwargs["prompt"]
+        
+        calls = generate.await_count
+        unchanged = await service.generate_context_summary(db, memory.id)
+        stored = (await db.execute(
+            select(ConversationMemory.context_summary, ConversationMemory.last_summarized_message_id)
+            .where(ConversationMemory.id == memory.id)
+        )).one()
+        return first, first_prompt, second, second_prompt, calls, generate.await_count, unchanged, stored, newest.id
+    
+    first, first_prompt, second, second_prompt, calls, calls_after, unchanged, stored, newest_id = _run(scenario)
+    
+    assert first == "summary one"
+    assert "user: first" in first_prompt and "user: second" in first_prompt
+    assert second == "summary two"
+    assert "summary one" in second_prompt
+    assert "assistant: third" in second_prompt
+    assert "user: first" not in second_prompt
+    assert calls_after == calls  # Nothing new since the watermark, so no LLM call
+    assert unchanged == "summary two"
+    assert tuple(stored) == ("summary two", newest_id)
@@ -0,0 +1,46 @@
+"""
+One chat turn is written in a single transaction; reads within the turn must see its messages.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from services.conversation_service import ConversationService
+
+
+def _recording_session(calls):
+    db = MagicMock()
+    db.add.side_effect = lambda message: calls.append(f"add:{message.role}")
+    db.flush = AsyncMock(side_effect=lambda: calls.append("flush"))
+    db.commit = AsyncMock(side_effect=lambda: calls.append("commit"))
+    db.rollback = AsyncMock()
+    return db
+
+
+def test_turn_is_flushed_before_context_and_summary():
+    service = ConversationService()
+    calls = []
+    db = _recording_session(calls)
+    memory = SimpleNamespace(id="memory-1", conversation_state={"current_question": 0})
+    cross_memory = SimpleNamespace(business_context={}, user_preferences={})
+    
+    service.create_conversation_memory = AsyncMock(return_value=memory)
+    service.get_or_create_cross_module_memory = AsyncMock(return_value=cross_memory)
+    service.get_conversation_context = AsyncMock(
+        side_effect=lambda *args, **kwargs: calls.append("context") or {"messages": [], "context": "", "state": {}}
+    )
+    service._handle_greeting = AsyncMock(return_value={"message": "Welcome!", "current_question": 0})
+    service.update_conversation_state = AsyncMock()
+    service._increment_message_count = AsyncMock(return_value=service._SUMMARY_WINDOW)
+    service.generate_context_summary = AsyncMock(side_effect=lambda *args, **kwargs: calls.append("summary"))
+    
+    response = asyncio.run(service.process_natural_message(
+        db, "project-1", "session-1", "module-1", "user-1", "hello"
+    ))
+    
+    assert response["message"] == "Welcome!"
+    assert calls == [
+        "add:user", "flush", "context",
+        "add:assistant", "flush", "summary",
+        "commit",
+    ]
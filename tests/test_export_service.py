@@ -0,0 +1,113 @@
+"""
+Project exports: PDF worker pool lifecycle and the files each format writes.
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from services import export_service
+from services.export_service import ExportService
+
+
+@pytest.fixture
+def project_data():
+    return {
+        "title": "Acme & Co",
+        "description": "Launch <plan>",
+        "created_at": datetime(2024, 1, 1),
+        "owner": {"full_name": "Ada Lovelace"},
+        "phases": [
+            {
+                "phase_number": 1,
+                "title": "Offer",
+                "description": "Clarify the offer",
+                "user_input": "line one\nline <b>two</b> & more",
+                "ai_response": "A clear offer.",
+            },
+            {
+                "phase_number": 2,
+                "title": "Avatar",
+                "description": "",
+                "user_input": "",
+                "ai_response": None,
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service.settings, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(export_service, "_UPLOAD_READY", False)
+    return tmp_path
+
+
+def test_pdf_export_uses_a_spawned_worker_pool(project_data, upload_dir):
+    path = str(upload_dir / "export.pdf")
+    try:
+        asyncio.run(ExportService.export_to_pdf(project_data, path))
+        pool = export_service._PDF_POOL
+        assert pool is not None
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        export_service.shutdown_pdf_pool()
+    
+    assert export_service._PDF_POOL is None
+    with open(path, "rb") as f:
+        assert f.read(5) == b"%PDF-"
+
+
+def test_pdf_export_runs_in_a_thread_inside_daemonic_workers(project_data, upload_dir, monkeypatch):
+    monkeypatch.setattr(export_service.multiprocessing, "current_process", lambda: SimpleNamespace(daemon=True))
+    path = str(upload_dir / "export.pdf")
+    
+    asyncio.run(ExportService.export_to_pdf(project_data, path))
+    
+    assert export_service._PDF_POOL is None
+    with open(path, "rb") as f:
+        assert f.read(5) == b"%PDF-"
+
+
+def test_json_export_round_trips(project_data, upload_dir):
+    import json
+    
+    path = str(upload_dir / "export.json")
+    asyncio.run(ExportService.export_to_json(project_data, path))
+    
+    with open(path, encoding="utf-8") as f:
+        exported = json.load(f)
+    assert exported["export_info"]["format"] == "json"
+    assert exported["project"]["title"] == "Acme & Co"
+    assert exported["project"]["created_at"] == "2024-01-01T00:00:00"
+    assert exported["project"]["phases"] == project_data["phases"]
+
+
+def test_word_export_writes_phases_in_order(project_data, upload_dir):
+    from docx import Document
+    
+    path = str(upload_dir / "export.docx")
+    asyncio.run(ExportService.export_to_word(project_data, path))
+    
+    paragraphs = [(p.style.name, p.text, [run.italic for run in p.runs]) for p in Document(path).paragraphs]
+    assert paragraphs[0][:2] == ("Title", "Acme & Co")
+    phase = paragraphs.index(("Heading 1", "Phase 1: Offer", [None]))
+    assert paragraphs[phase + 1:phase + 6] == [
+        ("Normal", "Clarify the offer", [True]),
+        ("Heading 2", "Input:", [None]),
+        ("Normal", "line one\nline <b>two</b> & more", [None]),
+        ("Heading 2", "Response:", [None]),
+        ("Normal", "A clear offer.", [None]),
+    ]
+    assert ("Normal", "Phase not completed", [True]) in paragraphs
+
+
+def test_export_all_builds_only_requested_formats(project_data, upload_dir):
+    paths = asyncio.run(ExportService.export_all(project_data, "abc", ["word", "json", "word"]))
+    
+    assert paths == {
+        "word": str(upload_dir / "export_abc.docx"),
+        "json": str(upload_dir / "export_abc.json"),
+    }
+    assert sorted(p.name for p in upload_dir.iterdir()) == ["export_abc.docx", "export_abc.json"]
@@ -0,0 +1,24 @@
+"""
+The local model loads on first use, so status must not report a configured model as unavailable.
+"""
+from services import huggingface_service
+from services.huggingface_service import HuggingFaceService
+
+
+def test_configured_local_model_is_available_before_first_use(monkeypatch):
+    monkeypatch.setattr(huggingface_service.settings, "hf_api_token", "")
+    monkeypatch.setattr(huggingface_service.settings, "hf_model_name", "gpt2")
+    monkeypatch.setattr(huggingface_service, "TRANSFORMERS_AVAILABLE", True)
+    monkeypatch.setattr(huggingface_service, "TORCH_AVAILABLE", True)
+    service = HuggingFaceService()
+    
+    status = service.get_service_status()
+    assert status["status"] == "available"
+    assert status["local_model_available"] is True
+    assert status["local_model_loaded"] is False
+    
+    # A load that was tried and failed leaves the model unavailable
+    service._local_model_attempted = True
+    status = service.get_service_status()
+    assert status["status"] == "unavailable"
+    assert status["local_model_available"] is False
@@ -0,0 +1,38 @@
+"""
+OpenAIService requests must overlap instead of blocking the event loop.
+"""
+import asyncio
+import time
+
+import httpx
+
+from services.openai_service import OpenAIService
+
+
+class _SlowTransport(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request):
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, json={
+            "id": "test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]
+        })
+
+
+def test_generate_content_calls_run_concurrently():
+    service = OpenAIService()
+    service.async_client = service.async_client.with_options(
+        http_client=httpx.AsyncClient(transport=_SlowTransport())
+    )
+    
+    async def run():
+        started = time.monotonic()
+        results = await asyncio.gather(*(service.generate_content("hi") for _ in range(5)))
+        return results, time.monotonic() - started
+    
+    results, elapsed = asyncio.run(run())
+    
+    assert results == ["ok"] * 5
+    assert elapsed < 1.0
@@ -0,0 +1,87 @@
+"""
+Schema migrations, run against a disposable PostgreSQL database named by TEST_DATABASE_URL
+(e.g. postgresql+asyncpg://postgres@localhost/unitedassistant_test). Tables used here are dropped.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import text
+
+import database
+import setup_database
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+LEGACY_SCHEMA = [
+    "DROP TABLE IF EXISTS conversation_messages",
+    "DROP TABLE IF EXISTS conversation_memory",
+    """
+    CREATE TABLE conversation_memory (
+        id VARCHAR(36) PRIMARY KEY,
+        project_id VARCHAR(36) NOT NULL,
+        user_id VARCHAR(36) NOT NULL,
+        session_id VARCHAR(36) NOT NULL,
+        module_id VARCHAR(255) NOT NULL,
+        context_summary TEXT,
+        last_updated TIMESTAMPTZ,
+        created_at TIMESTAMPTZ
+    )
+    """,
+    """
+    CREATE TABLE conversation_messages (
+        id VARCHAR(36) PRIMARY KEY,
+        conversation_memory_id VARCHAR(36) NOT NULL REFERENCES conversation_memory(id),
+        content TEXT
+    )
+    """,
+    """
+    INSERT INTO conversation_memory VALUES
+        ('dup-old', 'p', 'u', 's', 'm', 'old', now() - interval '2 days', now() - interval '3 days'),
+        ('dup-new', 'p', 'u', 's', 'm', 'new', now() - interval '1 day', now() - interval '3 days'),
+        ('dup-null', 'p', 'u', 's', 'm', 'oldest', NULL, now() - interval '5 days'),
+        ('solo', 'p', 'u', 's2', 'm', 'solo', now(), now())
+    """,
+    """
+    INSERT INTO conversation_messages VALUES
+        ('m1', 'dup-old', 'a'), ('m2', 'dup-new', 'b'), ('m3', 'dup-null', 'c'),
+        ('m4', 'solo', 'd'), ('m5', 'dup-old', 'e')
+    """,
+]
+
+
+def test_migration_merges_duplicate_memories_before_adding_the_constraint(monkeypatch):
+    monkeypatch.setattr(setup_database, "create_async_engine", lambda: database.create_async_engine(TEST_DATABASE_URL))
+    
+    async def scenario():
+        engine = database.create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+        
+        await setup_database.migrate_conversation_memory()
+        await setup_database.migrate_conversation_memory()  # Idempotent
+        
+        async with engine.connect() as conn:
+            memories = (await conn.execute(text(
+                "SELECT id, context_summary, message_count FROM conversation_memory ORDER BY id"
+            ))).all()
+            owners = (await conn.execute(text(
+                "SELECT DISTINCT conversation_memory_id FROM conversation_messages ORDER BY 1"
+            ))).scalars().all()
+            constraint = (await conn.execute(text(
+                "SELECT 1 FROM pg_constraint WHERE conname = 'uq_conversation_memory_scope'"
+            ))).scalar()
+            await conn.execute(text("DROP TABLE conversation_messages"))
+            await conn.execute(text("DROP TABLE conversation_memory"))
+            await conn.commit()
+        await engine.dispose()
+        return memories, owners, constraint
+    
+    memories, owners, constraint = asyncio.run(scenario())
+    
+    assert [tuple(row) for row in memories] == [("dup-new", "new", 4), ("solo", "solo", 1)]
+    assert owners == ["dup-new", "solo"]
+    assert constraint == 1
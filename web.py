@@ -17,6 +17,8 @@ API_VERSION = "v1"
 class UnifiedAssistantClient:
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url
+        # API prefix is fixed per client, so build it once instead of per request
+        self.api_url = f"{base_url}/api/{API_VERSION}"
         self.auth_token = None
         self.session = requests.Session()
     
@@ -34,7 +36,7 @@ class UnifiedAssistantClient:
     
     def register_user(self, email: str, password: str, full_name: str) -> Dict:
         """Register a new user."""
-        url = f"{self.base_url}/api/{API_VERSION}/auth/register"
+        url = f"{self.api_url}/auth/register"
         data = {
             "email": email,
             "password": password,
@@ -48,17 +50,17 @@ class UnifiedAssistantClient:
     
     def login_user(self, email: str, password: str) -> Dict:
         """Login user and get access token."""
-        url = f"{self.base_url}/api/{API_VERSION}/auth/login"
+        url = f"{self.api_url}/auth/login"
         data = {"email": email, "password": password}
         response = self.session.post(url, json=data)
+        result = response.json()
         if response.status_code == 200:
-            result = response.json()
             self.set_auth_token(result["access_token"])
-        return response.json()
+        return result
     
     def get_projects(self) -> List[Dict]:
         """Get all projects for the authenticated user."""
-        url = f"{self.base_url}/api/{API_VERSION}/projects/"
+        url = f"{self.api_url}/projects/"
         response = self.session.get(url)
         if response.status_code == 200:
             return response.json()
@@ -66,14 +68,14 @@ class UnifiedAssistantClient:
     
     def create_project(self, title: str, description: str = "") -> Dict:
         """Create a new project."""
-        url = f"{self.base_url}/api/{API_VERSION}/projects/"
+        url = f"{self.api_url}/projects/"
         data = {"title": title, "description": description}
         response = self.session.post(url, json=data)
         return response.json()
     
     def get_available_modes(self) -> List[Dict]:
         """Get all available assistant modes."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/modes"
+        url = f"{self.api_url}/assistant/modes"
         response = self.session.get(url)
         if response.status_code == 200:
             return response.json().get("modules", [])
@@ -81,52 +83,52 @@ class UnifiedAssistantClient:
     
     def start_mode_session(self, project_id: str, mode_name: str) -> Dict:
         """Start a mode session for a project."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/modes/start"
+        url = f"{self.api_url}/assistant/projects/{project_id}/modes/start"
         data = {"mode_name": mode_name}
         response = self.session.post(url, json=data)
         return response.json()
     
     def get_next_question(self, project_id: str, mode_name: str) -> Dict:
         """Get the next question for a mode session."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/modes/{mode_name}/next-question"
+        url = f"{self.api_url}/assistant/projects/{project_id}/modes/{mode_name}/next-question"
         response = self.session.get(url)
         return response.json()
     
     def submit_answer(self, project_id: str, mode_name: str, answer: str) -> Dict:
         """Submit an answer for the current question."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/modes/{mode_name}/answer"
+        url = f"{self.api_url}/assistant/projects/{project_id}/modes/{mode_name}/answer"
         data = {"answer": answer}
         response = self.session.post(url, json=data)
         return response.json()
     
     def skip_question(self, project_id: str, mode_name: str, reason: str = "") -> Dict:
         """Skip the current question."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/modes/{mode_name}/skip"
+        url = f"{self.api_url}/assistant/projects/{project_id}/modes/{mode_name}/skip"
         data = {"reason": reason}
         response = self.session.post(url, json=data)
         return response.json()
     
     def get_mode_summary(self, project_id: str, mode_name: str) -> Dict:
         """Get summary for a completed mode."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/modes/{mode_name}/summary"
+        url = f"{self.api_url}/assistant/projects/{project_id}/modes/{mode_name}/summary"
         response = self.session.get(url)
         return response.json()
     
     def get_project_progress(self, project_id: str) -> Dict:
         """Get overall project progress."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/progress"
+        url = f"{self.api_url}/assistant/projects/{project_id}/progress"
         response = self.session.get(url)
         return response.json()
     
     def export_project(self, project_id: str, format_type: str = "json") -> Dict:
         """Export project data."""
-        url = f"{self.base_url}/api/{API_VERSION}/exports/projects/{project_id}/export"
+        url = f"{self.api_url}/exports/projects/{project_id}/export"
         data = {"format": format_type}
         response = self.session.post(url, json=data)
         return response.json()
 
     def get_module_questions(self, module_id: str) -> List[str]:
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/modules/{module_id}/info"
+        url = f"{self.api_url}/assistant/modules/{module_id}/info"
         response = self.session.get(url)
         if response.status_code == 200:
             return response.json().get("questions", [])
@@ -134,7 +136,7 @@ class UnifiedAssistantClient:
     
     def get_combined_summary(self, project_id: str, completed_modules: dict) -> Dict:
         """Get combined summary for all completed modules."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/combined-summary"
+        url = f"{self.api_url}/assistant/projects/{project_id}/combined-summary"
         try:
             response = self.session.post(url, json=completed_modules)
             if response.status_code == 200:
@@ -154,7 +156,7 @@ class UnifiedAssistantClient:
     
     def get_project_summaries(self, project_id: str) -> Dict:
         """Get all saved summaries for a project."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/summaries"
+        url = f"{self.api_url}/assistant/projects/{project_id}/summaries"
         try:
             response = self.session.get(url)
             if response.status_code == 200:
@@ -166,7 +168,7 @@ class UnifiedAssistantClient:
     
     def get_project_summary(self, project_id: str, summary_id: str) -> Dict:
         """Get a specific saved summary."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/summaries/{summary_id}"
+        url = f"{self.api_url}/assistant/projects/{project_id}/summaries/{summary_id}"
         try:
             response = self.session.get(url)
             if response.status_code == 200:
@@ -179,28 +181,28 @@ class UnifiedAssistantClient:
     # New conversational chat methods
     def start_conversational_chat(self, project_id: str, mode_name: str) -> Dict:
         """Start a conversational chat session."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/chat/start"
+        url = f"{self.api_url}/assistant/projects/{project_id}/chat/start"
         data = {"mode_name": mode_name}
         response = self.session.post(url, json=data)
         return response.json()
     
     def send_chat_message(self, project_id: str, session_id: str, message: str) -> Dict:
         """Send a message in the conversational chat."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/chat/message"
+        url = f"{self.api_url}/assistant/projects/{project_id}/chat/message"
         data = {"session_id": session_id, "message": message}
         response = self.session.post(url, json=data)
         return response.json()
     
     def get_chat_summary(self, project_id: str, session_id: str) -> Dict:
         """Get summary for the current chat session."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/chat/summary"
+        url = f"{self.api_url}/assistant/projects/{project_id}/chat/summary"
         data = {"session_id": session_id}
         response = self.session.post(url, json=data)
         return response.json()
     
     def edit_chat_summary(self, project_id: str, session_id: str, edited_summary: str) -> Dict:
         """Edit the summary for the current chat session."""
-        url = f"{self.base_url}/api/{API_VERSION}/assistant/projects/{project_id}/chat/edit-summary"
+        url = f"{self.api_url}/assistant/projects/{project_id}/chat/edit-summary"
         data = {"session_id": session_id, "edited_summary": edited_summary}
         response = self.session.post(url, json=data)
         return response.json()